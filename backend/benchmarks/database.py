@@ -0,0 +1,33 @@
+"""Helpers for benchmarks that need Django and a throwaway database"""
+
+import os
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(sqlite_file=None):
+    """
+    Create a fresh test database for the configured backend (DATABASE_URL
+    or the SQLite fallback) and destroy it afterwards
+
+    Args:
+        sqlite_file: Put a SQLite test database in this file instead of in
+            memory, to include disk writes in the timings
+    """
+    from django.db import connection
+
+    if sqlite_file and connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = sqlite_file
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,185 @@
+"""
+Show query plans and timings for the hot FileRecord/ActivityLog queries
+with and without the indexes added in core migration 0004
+
+Usage (from the backend folder):
+    python -m benchmarks.queries --rows 1000000
+    DATABASE_URL=postgres://... python -m benchmarks.queries
+
+Seeds a throwaway test database, so existing data is never touched.
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.database import setup_django, benchmark_database
+
+TRIGRAM_INDEX = "core_file_filename_trgm_idx"
+WORDS = ["report", "drawing", "invoice", "minutes", "scan", "photo", "budget"]
+EXTENSIONS = ["pdf", "docx", "xlsx", "dwg", "jpg", "txt"]
+
+
+def seed(rows, projects, batch_size=10000):
+    from django.utils import timezone
+    from core.models import Project, FileRecord, Directory, ActivityLog
+
+    rng = random.Random(42)
+    project_ids = [
+        Project.objects.create(name=f"Project {i}", folder_path=f"/srv/p{i}").pk
+        for i in range(projects)
+    ]
+    now = timezone.now()
+
+    directories = {}
+
+    def directory(project_id, path):
+        key = (project_id, path)
+        if key not in directories:
+            parent = None
+            if path != ".":
+                parent = directory(project_id, os.path.dirname(path) or ".")
+            directories[key] = Directory.objects.create(
+                project_id=project_id,
+                parent=parent,
+                name=os.path.basename(path) if path != "." else "",
+                path=path,
+            )
+        return directories[key]
+
+    batch = []
+    for i in range(rows):
+        name = f"{rng.choice(WORDS)}_{i}.{rng.choice(EXTENSIONS)}"
+        project_id = project_ids[i % projects]
+        batch.append(
+            FileRecord(
+                project_id=project_id,
+                directory=directory(
+                    project_id, os.path.join(f"dir{i % 97}", f"sub{i % 13}")
+                ),
+                filename=name,
+                size=rng.randint(0, 10_000_000),
+                last_modified=now,
+            )
+        )
+        if len(batch) == batch_size:
+            FileRecord.objects.bulk_create(batch)
+            batch = []
+    FileRecord.objects.bulk_create(batch)
+
+    logs = ActivityLog.objects.bulk_create(
+        [
+            ActivityLog(project_id=project_ids[i % projects], files_added=i % 7)
+            for i in range(max(rows // 10, 1))
+        ],
+        batch_size=batch_size,
+    )
+    # timestamp is auto_now_add, so spread it over the past afterwards
+    if logs[0].pk is None:
+        logs = list(ActivityLog.objects.only("id"))
+    for offset, log in enumerate(logs):
+        log.timestamp = now - timedelta(hours=offset // projects)
+    ActivityLog.objects.bulk_update(logs, ["timestamp"], batch_size=1000)
+
+    return project_ids[0]
+
+
+def hot_queries(project_id):
+    from django.db.models import Count
+    from django.utils import timezone
+    from core.models import FileRecord, ActivityLog
+
+    now = timezone.now()
+    return {
+        "files filename__icontains": FileRecord.objects.filter(
+            project_id=project_id, filename__icontains="invoice"
+        ),
+        "activity date range": ActivityLog.objects.filter(
+            project_id=project_id,
+            timestamp__gte=now - timedelta(days=30),
+            timestamp__lte=now,
+        ).order_by("timestamp"),
+        "duplicate sizes": FileRecord.objects.values("size")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by(),
+    }
+
+
+def toggle_indexes(connection, enabled):
+    """Drop or recreate the indexes added by core migration 0004"""
+    from core.models import FileRecord, ActivityLog
+
+    with connection.schema_editor() as schema_editor:
+        for model in (FileRecord, ActivityLog):
+            for index in model._meta.indexes:
+                if enabled:
+                    schema_editor.add_index(model, index)
+                else:
+                    schema_editor.remove_index(model, index)
+
+        if connection.vendor == "postgresql":
+            if enabled:
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                schema_editor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON core_filerecord "
+                    "USING gin (UPPER(filename) gin_trgm_ops)"
+                )
+            else:
+                schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def measure(queries, repeat):
+    results = {}
+    for label, queryset in queries.items():
+        plan = queryset.explain()
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            # Fresh clone each time; a QuerySet caches its results
+            list(queryset.all())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[label] = (plan, best)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    with benchmark_database() as connection:
+        started = time.perf_counter()
+        project_id = seed(args.rows, args.projects)
+        print(
+            f"Seeded {args.rows} files on {connection.vendor} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        toggle_indexes(connection, enabled=False)
+        before = measure(hot_queries(project_id), args.repeat)
+        toggle_indexes(connection, enabled=True)
+        after = measure(hot_queries(project_id), args.repeat)
+
+    for label in before:
+        print(f"\n=== {label}")
+        for name, (plan, elapsed) in (
+            ("before", before[label]),
+            ("after", after[label]),
+        ):
+            print(f"--- {name}: {elapsed * 1000:.1f} ms")
+            print(plan)
+
+
+if __name__ == "__main__":
+    main()
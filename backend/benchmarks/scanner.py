@@ -0,0 +1,318 @@
+"""
+Benchmark project scans on synthetic trees: cold, warm and churn rescans
+
+Usage (from the backend folder):
+    python -m benchmarks.scanner --files 20000 --fanout 8 --depth 3
+    python -m benchmarks.scanner --output after.json --compare before.json
+    python -m benchmarks.scanner --files 200000 --low-memory
+    DATABASE_URL=postgres://... python -m benchmarks.scanner --projects 4 --workers 4
+
+Scenarios, each repeated --repeat times:
+    cold    first scan of the tree into an empty project
+    warm    rescan with nothing changed
+    churn   rescan after --churn percent of the files were modified, deleted
+            or added (a third each)
+
+Trees and churn come from a seeded random generator, so runs with the same
+arguments scan the same files. Timed runs are untraced; one extra run per
+scenario measures peak Python memory with tracemalloc. Scans go into a
+throwaway test database of the configured backend (in a temporary file for
+SQLite), so existing data is never touched.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.database import setup_django, benchmark_database
+from benchmarks.walker import build_tree
+
+SCENARIOS = ["cold", "warm", "churn"]
+
+# Metrics compared by --compare; higher is worse for all of them
+COMPARED_METRICS = ["seconds", "query_count", "peak_memory_bytes"]
+
+
+def apply_churn(root, percent, rng):
+    """
+    Modify, delete and add files, a third of percent of the files each
+
+    Returns:
+        int: Number of files changed
+    """
+    from utils.file_walker import walk_files
+
+    paths = sorted(entry.path for entry in walk_files(root, stat_files=False))
+    changes = len(paths) * percent // 100
+    chosen = rng.sample(paths, min(changes, len(paths)))
+    third = len(chosen) // 3
+
+    for rel_path in chosen[:third]:
+        full_path = os.path.join(root, rel_path)
+        with open(full_path, "ab") as f:
+            f.write(b"churn")
+        # Move the mtime clearly past the last scan, whatever the timer
+        # resolution of the filesystem
+        stat_info = os.stat(full_path)
+        os.utime(full_path, (stat_info.st_atime, stat_info.st_mtime + 10))
+
+    for rel_path in chosen[third : 2 * third]:
+        os.remove(os.path.join(root, rel_path))
+
+    for i, rel_path in enumerate(chosen[2 * third :]):
+        folder = os.path.dirname(os.path.join(root, rel_path))
+        with open(os.path.join(folder, f"added{rng.random():.8f}_{i}.txt"), "wb") as f:
+            f.write(b"x" * rng.randint(0, 511))
+
+    return len(chosen)
+
+
+class ScannerBenchmark:
+    """Runs the scenarios against projects in a throwaway database"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.root = tempfile.mkdtemp(prefix="scanner-bench-")
+        self.projects = []
+
+    def setup(self):
+        from core.models import ProjectsRoot, Project
+
+        root = ProjectsRoot.objects.create(
+            name="Benchmark", path=self.root, auto_discover=False
+        )
+        files_per_project = self.args.files // self.args.projects
+        for i in range(self.args.projects):
+            folder = os.path.join(self.root, f"project{i}")
+            build_tree(folder, files_per_project, self.args.fanout, self.args.depth)
+            self.projects.append(
+                Project.objects.create(
+                    name=f"project{i}", root=root, folder_path=folder
+                )
+            )
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def prepare(self, scenario):
+        """Bring the database and tree into the scenario's starting state"""
+        from core.models import FileRecord, Directory
+
+        if scenario == "cold":
+            FileRecord.objects.all().delete()
+            Directory.objects.all().delete()
+        elif scenario == "churn":
+            for project in self.projects:
+                apply_churn(project.folder_path, self.args.churn, self.rng)
+
+    def scan(self):
+        """
+        Scan every project
+
+        Returns:
+            list: The ScanRuns recorded by the scan
+        """
+        from core.models import ScanRun
+        from core.services.folder_monitor import FolderMonitor, ProjectsMonitor
+
+        if len(self.projects) == 1:
+            monitor = FolderMonitor(
+                self.projects[0], incremental=self.args.incremental, hash_files=False
+            )
+            monitor.scan_folder()
+            return [monitor.scan_run]
+
+        last_run = ScanRun.objects.order_by("-pk").values_list("pk", flat=True).first()
+        results = ProjectsMonitor().scan_all_projects(
+            workers=self.args.workers,
+            incremental=self.args.incremental,
+            hash_files=False,
+        )
+        if results["errors"]:
+            raise RuntimeError(results["errors"])
+        return list(ScanRun.objects.filter(pk__gt=last_run or 0))
+
+    def run_scenario(self, scenario):
+        timings = []
+        runs = []
+        for _ in range(self.args.repeat):
+            self.prepare(scenario)
+            started = time.perf_counter()
+            runs = self.scan()
+            timings.append(time.perf_counter() - started)
+
+        # One more run to measure memory, since tracing slows everything down
+        self.prepare(scenario)
+        tracemalloc.start()
+        try:
+            self.scan()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        seconds = min(timings)
+        files = sum(run.files_visited for run in runs)
+        visited_bytes = sum(run.bytes_visited for run in runs)
+        return {
+            "seconds": seconds,
+            "median_seconds": statistics.median(timings),
+            "files_visited": files,
+            "stat_calls": sum(run.stat_calls for run in runs),
+            "files_per_second": files / seconds if seconds else None,
+            "bytes_per_second": visited_bytes / seconds if seconds else None,
+            "walk_seconds": sum(run.walk_seconds for run in runs),
+            "diff_seconds": sum(run.diff_seconds for run in runs),
+            "write_seconds": sum(run.write_seconds for run in runs),
+            "query_count": sum(run.query_count for run in runs),
+            "files_added": sum(run.files_added for run in runs),
+            "files_modified": sum(run.files_modified for run in runs),
+            "files_deleted": sum(run.files_deleted for run in runs),
+            "peak_memory_bytes": peak_memory,
+        }
+
+    def run(self):
+        from django.db import connection
+
+        self.setup()
+        results = {}
+        for scenario in SCENARIOS:
+            results[scenario] = self.run_scenario(scenario)
+            print_scenario(scenario, results[scenario])
+
+        return {
+            "meta": {
+                # What was scanned and how, not where results go
+                "arguments": {
+                    key: value
+                    for key, value in vars(self.args).items()
+                    if key not in ("output", "compare", "threshold")
+                },
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "max_rss_kb": (
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                    if resource
+                    else None
+                ),
+            },
+            "scenarios": results,
+        }
+
+
+def print_scenario(scenario, result):
+    print(
+        f"{scenario:<6}{result['seconds']:>9.3f}s"
+        f"{result['files_per_second'] or 0:>11.0f} files/s"
+        f"{result['query_count']:>8} queries"
+        f"{result['peak_memory_bytes'] / 1024**2:>9.1f} MB peak"
+        f"   walk {result['walk_seconds']:.3f}s"
+        f" diff {result['diff_seconds']:.3f}s"
+        f" write {result['write_seconds']:.3f}s"
+    )
+
+
+def compare(results, baseline, threshold):
+    """
+    Print changes against a previous result file
+
+    Returns:
+        bool: True if any metric got worse by more than threshold percent
+    """
+    regressed = False
+    print(f"\nCompared with {baseline['meta'].get('created_at', 'baseline')}:")
+    for key in ("arguments", "database"):
+        if baseline["meta"].get(key) != results["meta"][key]:
+            print(f"  Warning: the runs differ in {key}, so results may not compare")
+    for scenario in SCENARIOS:
+        before = baseline["scenarios"].get(scenario)
+        after = results["scenarios"][scenario]
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(
+                f"  {scenario:<6}{metric:<20}{old:>14.3f} -> {new:<14.3f}{change:+7.1f}%{flag}"
+            )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--churn", type=int, default=5, help="Percent of files")
+    parser.add_argument(
+        "--projects", type=int, default=1, help="Split the files over projects"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="scan_all_projects workers"
+    )
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Scan every project with FolderMonitor.scan_folder_merged()",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Previous JSON results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        help="Percent a metric may get worse before --compare fails",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    if args.low_memory:
+        from django.conf import settings
+
+        settings.SCAN_LOW_MEMORY_FILES = 0
+    benchmark = ScannerBenchmark(args)
+    sqlite_file = os.path.join(benchmark.root, "benchmark.sqlite3")
+    try:
+        with benchmark_database(sqlite_file=sqlite_file):
+            results = benchmark.run()
+    finally:
+        benchmark.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
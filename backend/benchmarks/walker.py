@@ -0,0 +1,131 @@
+"""
+Compare the os.walk based folder walk with utils.file_walker
+
+Usage (from the backend folder):
+    python -m benchmarks.walker --files 20000 --fanout 8 --depth 3
+
+Path-based os.stat calls resolve the full path on every call, which is a
+round trip per file on network filesystems. DirEntry.stat() reuses the
+information from the directory listing where the platform provides it
+(always on Windows, which is how most NAS shares are mounted) and is cached,
+so is_dir() and stat() on the same entry never cost two calls.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from utils.file_walker import WalkStats, walk_files
+
+
+def build_tree(root, files, fanout, depth):
+    """Create a synthetic tree of small files spread over nested folders"""
+    folders = [root]
+    for _ in range(depth):
+        folders = [
+            os.path.join(parent, f"dir{i}") for parent in folders for i in range(fanout)
+        ]
+        for folder in folders:
+            os.makedirs(folder, exist_ok=True)
+
+    for i in range(files):
+        with open(os.path.join(folders[i % len(folders)], f"file{i}.txt"), "wb") as f:
+            f.write(b"x" * (i % 512))
+
+
+def legacy_walk(root, counters):
+    """The walk FolderMonitor used before utils.file_walker"""
+    real_stat = os.stat
+
+    def counting_stat(path, *args, **kwargs):
+        counters["path_stat_calls"] += 1
+        return real_stat(path, *args, **kwargs)
+
+    os.stat = counting_stat
+    try:
+        result = {}
+        for folder, _, files in os.walk(root):
+            for filename in files:
+                full_path = os.path.join(folder, filename)
+                rel_path = os.path.relpath(full_path, root)
+                counters["relpath_calls"] += 1
+                stat_info = os.stat(full_path)
+                result[rel_path] = (stat_info.st_size, stat_info.st_mtime)
+        return result
+    finally:
+        os.stat = real_stat
+
+
+def run(root, repeat):
+    rows = []
+
+    def measure(label, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            counters = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        rows.append((label, best, counters))
+
+    def legacy():
+        counters = {"path_stat_calls": 0, "dir_entry_stat_calls": 0, "relpath_calls": 0}
+        legacy_walk(root, counters)
+        return counters
+
+    def walker(stat_files):
+        def run_walker():
+            stats = WalkStats()
+            for _ in walk_files(root, stat_files=stat_files, stats=stats):
+                pass
+            # Only the root folder is stat'ed by path
+            return {
+                "path_stat_calls": 1,
+                "dir_entry_stat_calls": stats.stat_calls - 1,
+                "relpath_calls": 0,
+            }
+
+        return run_walker
+
+    measure("os.walk + os.stat + relpath", legacy)
+    measure("file_walker", walker(True))
+    measure("file_walker, unchanged folders", walker(False))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--path", help="Walk an existing folder instead of a synthetic tree"
+    )
+    args = parser.parse_args()
+
+    root = args.path
+    if root is None:
+        root = tempfile.mkdtemp(prefix="walker-bench-")
+        build_tree(root, args.files, args.fanout, args.depth)
+
+    try:
+        rows = run(root, args.repeat)
+    finally:
+        if args.path is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'walk':<34}{'seconds':>9}{'os.stat':>10}{'DirEntry':>10}{'relpath':>10}")
+    for label, elapsed, counters in rows:
+        print(
+            f"{label:<34}{elapsed:>9.3f}"
+            f"{counters['path_stat_calls']:>10}"
+            f"{counters['dir_entry_stat_calls']:>10}"
+            f"{counters['relpath_calls']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -133,6 +133,77 @@ else:
 
 # Scanning settings
 SCAN_INTERVAL_MINUTES = config("SCAN_INTERVAL_MINUTES", default=60, cast=int)
+SCAN_BATCH_SIZE = config(
+    "SCAN_BATCH_SIZE", default=1000, cast=int
+)  # Rows per bulk write during scans
+SCAN_WORKERS = config(
+    "SCAN_WORKERS", default=1, cast=int
+)  # Project folders walked concurrently by scan-all
+SCAN_INCREMENTAL = config(
+    "SCAN_INCREMENTAL", default=False, cast=bool
+)  # Skip files in folders unchanged since the last scan
+SCAN_IGNORE_PATTERNS = config(
+    "SCAN_IGNORE_PATTERNS", default="", cast=Csv()
+)  # File and folder name patterns left out of scans, e.g. "~$*,.git"
+SCAN_HASH_FILES = config(
+    "SCAN_HASH_FILES", default=False, cast=bool
+)  # Fill FileRecord.file_hash for new and changed files after each scan
+SCAN_HASH_ALGORITHM = config(
+    "SCAN_HASH_ALGORITHM", default="blake2b"
+)  # md5, sha1, sha256 or blake2b
+SCAN_HASH_WORKERS = config(
+    "SCAN_HASH_WORKERS", default=8, cast=int
+)  # Files read concurrently; hashing is I/O bound
+SCAN_HASH_BYTE_BUDGET = config(
+    "SCAN_HASH_BYTE_BUDGET", default=50 * 1024**3, cast=int
+)  # Bytes hashed per project scan, the rest waits for the next one; 0 = no limit
+SCAN_JOB_STALE_MINUTES = config(
+    "SCAN_JOB_STALE_MINUTES", default=15, cast=int
+)  # Running jobs without a worker heartbeat for this long are queued again
+SCAN_CHECKPOINT_SECONDS = config(
+    "SCAN_CHECKPOINT_SECONDS", default=60, cast=int
+)  # How often a project walk saves its progress so it can be resumed; 0 = never
+SCAN_LOW_MEMORY_FILES = config(
+    "SCAN_LOW_MEMORY_FILES", default=200000, cast=int
+)  # Projects with this many files are scanned in bounded memory, see scan_folder_merged(); 0 = all
+SCAN_MAX_CONCURRENT = config(
+    "SCAN_MAX_CONCURRENT", default=2, cast=int
+)  # Scan jobs the scheduler lets be queued or running at once
+SCAN_JITTER = config(
+    "SCAN_JITTER", default=0.1, cast=float
+)  # Random share of a scan interval by which scheduled scans are moved
+SCAN_FULL_INTERVAL_MINUTES = config(
+    "SCAN_FULL_INTERVAL_MINUTES", default=24 * 60, cast=int
+)  # With SCAN_INCREMENTAL, scheduled scans are full once the last full one is this old; 0 = never
+WATCH_DEBOUNCE_SECONDS = config(
+    "WATCH_DEBOUNCE_SECONDS", default=2.0, cast=float
+)  # Quiet time after the last event on a path before the watcher records it
+WATCH_FLUSH_SECONDS = config(
+    "WATCH_FLUSH_SECONDS", default=60, cast=int
+)  # How often changes seen by the watcher are written as activity logs
+WATCH_RECONCILE_MINUTES = config(
+    "WATCH_RECONCILE_MINUTES", default=24 * 60, cast=int
+)  # Full rescan of watched projects, to catch anything the watcher missed
+FILE_HISTORY_RETENTION_DAYS = config(
+    "FILE_HISTORY_RETENTION_DAYS", default=365, cast=int
+)  # Days file change events are kept, pruned by run_scheduler; 0 = forever
+EXPORT_CHUNK_SIZE = config(
+    "EXPORT_CHUNK_SIZE", default=5000, cast=int
+)  # Files read per database round trip and encoded at a time by inventory exports
+
+# Cache, local memory by default; set CACHE_BACKEND and CACHE_LOCATION to
+# share it between processes, e.g. django.core.cache.backends.redis.RedisCache
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = config(
+    "RESPONSE_CACHE_TIMEOUT", default=300, cast=int
+)  # Seconds project, activity and stats responses are cached; 0 = no caching
 
 # Security settings for production
 if not DEBUG:
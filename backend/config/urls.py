@@ -5,8 +5,9 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/", include("core.urls")),
+    # Before core, whose project routes would take /api/projects/tasks/
     path("api/projects/", include("projects.urls")),
+    path("api/", include("core.urls")),
 ]
 
 # Add static file serving in development
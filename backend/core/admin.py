@@ -1,11 +1,39 @@
 from django.contrib import admin
-from .models import ProjectsRoot, Project, FileRecord, ActivityLog
+from .models import (
+    ProjectsRoot,
+    GlobalStats,
+    Project,
+    FileRecord,
+    Directory,
+    ActivityLog,
+    ScanJob,
+    ScanRun,
+)
 
 
 @admin.register(ProjectsRoot)
 class ProjectsRootAdmin(admin.ModelAdmin):
-    list_display = ("name", "path", "last_scan", "auto_discover")
+    list_display = (
+        "name",
+        "path",
+        "last_scan",
+        "auto_discover",
+        "total_projects",
+        "total_files",
+    )
     search_fields = ("name", "path")
+    readonly_fields = ("total_projects", "active_projects", "total_files", "total_size")
+
+
+@admin.register(GlobalStats)
+class GlobalStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "total_projects",
+        "active_projects",
+        "total_files",
+        "total_size",
+        "updated_at",
+    )
 
 
 @admin.register(Project)
@@ -20,14 +48,26 @@ class ProjectAdmin(admin.ModelAdmin):
         "active",
     )
     list_filter = ("root", "is_auto_discovered", "active")
+    list_select_related = ("root",)
     search_fields = ("name", "folder_path")
 
 
 @admin.register(FileRecord)
 class FileRecordAdmin(admin.ModelAdmin):
-    list_display = ("filename", "project", "size", "last_modified")
+    list_display = ("filename", "project", "directory", "size", "last_modified")
+    list_filter = ("project",)
+    list_select_related = ("project", "directory")
+    search_fields = ("filename", "directory__path")
+    raw_id_fields = ("directory",)
+
+
+@admin.register(Directory)
+class DirectoryAdmin(admin.ModelAdmin):
+    list_display = ("path", "project", "mtime", "entry_count")
     list_filter = ("project",)
-    search_fields = ("filename", "path")
+    list_select_related = ("project",)
+    search_fields = ("path",)
+    raw_id_fields = ("parent",)
 
 
 @admin.register(ActivityLog)
@@ -40,3 +80,36 @@ class ActivityLogAdmin(admin.ModelAdmin):
         "files_deleted",
     )
     list_filter = ("project", "timestamp")
+    list_select_related = ("project",)  # Also used by ActivityLog.__str__
+
+
+@admin.register(ScanJob)
+class ScanJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "project",
+        "root",
+        "status",
+        "requests",
+        "files_seen",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("kind", "status")
+    list_select_related = ("project", "root")
+
+
+@admin.register(ScanRun)
+class ScanRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "project",
+        "started_at",
+        "files_visited",
+        "walk_seconds",
+        "diff_seconds",
+        "write_seconds",
+        "query_count",
+    )
+    list_filter = ("project", "incremental")
+    list_select_related = ("project",)
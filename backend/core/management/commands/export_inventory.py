@@ -0,0 +1,59 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Project
+from core.services.inventory_export import InventoryExport, FORMATS
+
+
+class Command(BaseCommand):
+    help = "Export the file inventory of projects as CSV, NDJSON or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="File to write")
+        parser.add_argument("--project", type=int, help="Only export this project")
+        parser.add_argument(
+            "--root", type=int, help="Only export projects of this projects root"
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            default="csv",
+            help="Parquet needs pyarrow (default: csv)",
+        )
+        parser.add_argument(
+            "--no-gzip",
+            action="store_false",
+            dest="compress",
+            help="Write CSV and NDJSON uncompressed",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Files read and encoded at a time "
+            "(defaults to the EXPORT_CHUNK_SIZE setting)",
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options["project"]:
+            projects = projects.filter(id=options["project"])
+        if options["root"]:
+            projects = projects.filter(root_id=options["root"])
+        if not projects.exists():
+            raise CommandError("No matching projects")
+
+        export = InventoryExport(projects, chunk_size=options["chunk_size"])
+        started = time.perf_counter()
+        try:
+            rows = export.write(
+                options["output"], options["format"], compress=options["compress"]
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {rows} files to {options['output']} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
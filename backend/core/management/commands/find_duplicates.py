@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Project
+from core.services.duplicate_finder import DuplicateFinder
+from utils.file_utils import format_file_size
+
+
+class Command(BaseCommand):
+    help = "Find files with identical content across projects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, help="Only check this project")
+        parser.add_argument(
+            "--root", type=int, help="Only check projects of this projects root"
+        )
+        parser.add_argument(
+            "--min-size",
+            type=int,
+            default=1,
+            help="Ignore files smaller than this many bytes",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Number of clusters to list"
+        )
+        parser.add_argument(
+            "--stored-only",
+            action="store_true",
+            help="Only compare hashes already stored by scans, without "
+            "reading any file",
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options["project"]:
+            projects = projects.filter(id=options["project"])
+        if options["root"]:
+            projects = projects.filter(root_id=options["root"])
+        if not projects.exists():
+            raise CommandError("No matching projects")
+
+        finder = DuplicateFinder(
+            projects=projects,
+            min_size=options["min_size"],
+            read_files=not options["stored_only"],
+            limit=options["limit"],
+        )
+        report = finder.find()
+
+        for cluster in report["clusters"]:
+            self.stdout.write(
+                self.style.NOTICE(
+                    f'{cluster["count"]} copies of {format_file_size(cluster["size"])} '
+                    f'({format_file_size(cluster["reclaimable_bytes"])} reclaimable)'
+                )
+            )
+            for file in cluster["files"]:
+                self.stdout.write(f'  {file["project_name"]}: {file["path"]}')
+
+        if report["projects"]:
+            self.stdout.write(self.style.NOTICE("Reclaimable space per project:"))
+            for project in report["projects"]:
+                self.stdout.write(
+                    f'  {project["name"]}: {project["duplicate_files"]} files, '
+                    f'{format_file_size(project["reclaimable_bytes"])}'
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Found {report["cluster_count"]} duplicate clusters with '
+                f'{report["duplicate_files"]} redundant files, '
+                f'{format_file_size(report["reclaimable_bytes"])} reclaimable.'
+            )
+        )
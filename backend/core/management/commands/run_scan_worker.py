@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.models import ScanJobStatus
+from core.services.scan_jobs import claim_next_job, ScanJobRunner
+
+
+class Command(BaseCommand):
+    help = "Run queued scan jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between checks of an empty queue",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Waiting for scan jobs..."))
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"Running {job}")
+            job = ScanJobRunner(job).run()
+
+            if job.status == ScanJobStatus.COMPLETED:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Scan job #{job.pk} completed: {job.files_seen} files seen"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.ERROR(f"Scan job #{job.pk} failed: {job.error}")
+                )
+
+        self.stdout.write(self.style.SUCCESS("Scan queue is empty."))
@@ -0,0 +1,80 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.services.file_history import prune_file_changes
+from core.services.scan_scheduler import ScanScheduler
+
+PRUNE_INTERVAL_SECONDS = 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue discovery and project scans every SCAN_INTERVAL_MINUTES, "
+        "adapting each project's interval to its activity. The queued jobs "
+        "are run by run_scan_worker. File change history older than "
+        "FILE_HISTORY_RETENTION_DAYS is pruned once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            help="Base minutes between scans (default: SCAN_INTERVAL_MINUTES)",
+        )
+        parser.add_argument(
+            "--max-concurrent",
+            type=int,
+            help="Scan jobs allowed to be queued or running at once",
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            help="Random share of the interval by which scans are moved",
+        )
+        parser.add_argument(
+            "--full-interval",
+            type=int,
+            help="Minutes between full scans of a project when scans are "
+            "incremental (default: SCAN_FULL_INTERVAL_MINUTES)",
+        )
+        parser.add_argument(
+            "--tick",
+            type=float,
+            default=30,
+            help="Seconds between checks for due scans",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Queue the scans that are due now and exit",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ScanScheduler(
+            interval_minutes=options["interval"],
+            max_concurrent=options["max_concurrent"],
+            jitter=options["jitter"],
+            full_interval_minutes=options["full_interval"],
+        )
+        self.stdout.write(
+            self.style.NOTICE(
+                f"Scheduling scans every {scheduler.interval} "
+                f"(at most {scheduler.max_concurrent} at once)"
+            )
+        )
+
+        next_prune = time.monotonic()
+        while True:
+            close_old_connections()
+            for job in scheduler.tick():
+                self.stdout.write(f"Queued {job}")
+
+            if time.monotonic() >= next_prune:
+                pruned = prune_file_changes()
+                if pruned:
+                    self.stdout.write(f"Pruned {pruned} old file changes")
+                next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+
+            if options["once"]:
+                break
+            time.sleep(options["tick"])
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import ProjectsRoot
+from core.models import ProjectsRoot, ScanRun
 from core.services.folder_monitor import ProjectsMonitor
+from core.services.scan_profile import format_scan_run
 
 
 class Command(BaseCommand):
@@ -13,18 +14,53 @@ class Command(BaseCommand):
             action="store_true",
             help="Only discover new projects without scanning files",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of project and root folders to walk concurrently "
+            "(defaults to the SCAN_WORKERS setting)",
+        )
+        parser.add_argument(
+            "--hash",
+            action="store_const",
+            const=True,
+            dest="hash_files",
+            help="Hash new and changed files after the scan",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Print the timings and counters of each project scan",
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--incremental",
+            action="store_const",
+            const=True,
+            dest="incremental",
+            help="Skip files in folders unchanged since the last scan",
+        )
+        mode.add_argument(
+            "--full",
+            action="store_const",
+            const=False,
+            dest="incremental",
+            help="Stat every file, even when SCAN_INCREMENTAL is enabled",
+        )
 
     def handle(self, *args, **options):
         discover_only = options.get("discover_only", False)
+        workers = options.get("workers")
         monitor = ProjectsMonitor()
 
         # First scan all project roots for new projects
         self.stdout.write(
             self.style.NOTICE("Scanning project roots for new projects...")
         )
-        roots = ProjectsRoot.objects.all()
+        roots = list(ProjectsRoot.objects.all())
 
-        if not roots.exists():
+        if not roots:
             self.stdout.write(
                 self.style.WARNING(
                     "No project roots configured. Please add a root folder in the admin panel."
@@ -32,9 +68,10 @@ class Command(BaseCommand):
             )
             return
 
+        discovery = monitor.scan_projects_roots(roots, workers=workers)
         for root in roots:
-            self.stdout.write(f"Scanning root: {root.name} ({root.path})")
-            result = monitor.scan_projects_root(root)
+            self.stdout.write(f"Scanned root: {root.name} ({root.path})")
+            result = discovery[root.name]
 
             if "error" in result:
                 self.stdout.write(
@@ -44,7 +81,8 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'Found {result["new_projects"]} new projects, '
-                        f'{result["removed_projects"]} projects no longer exist'
+                        f'{result["removed_projects"]} projects no longer exist, '
+                        f'{result["reactivated_projects"]} projects are back'
                     )
                 )
 
@@ -57,7 +95,12 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.NOTICE("Scanning individual projects for file changes...")
         )
-        results = monitor.scan_all_projects()
+        scan_started = timezone.now()
+        results = monitor.scan_all_projects(
+            workers=workers,
+            incremental=options.get("incremental"),
+            hash_files=options.get("hash_files"),
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -69,6 +112,17 @@ class Command(BaseCommand):
             )
         )
 
+        if options["verbosity"] > 1:
+            for project in results["projects"]:
+                self.stdout.write(
+                    f'  {project["project"]}: {project["wall_time"]:.2f}s'
+                )
+
+        if options["profile"]:
+            runs = ScanRun.objects.filter(started_at__gte=scan_started)
+            for run in runs.select_related("project").order_by("-walk_seconds"):
+                self.stdout.write(f"  {format_scan_run(run)}")
+
         if results["errors"]:
             self.stdout.write(self.style.WARNING("Errors encountered:"))
             for error in results["errors"]:
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 from core.models import Project
 from core.services.folder_monitor import FolderMonitor
+from core.services.scan_profile import format_scan_run, profile_to
 
 
 class Command(BaseCommand):
@@ -8,6 +9,58 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("project_id", type=int, help="ID of the project to scan")
+        parser.add_argument(
+            "--hash",
+            action="store_const",
+            const=True,
+            dest="hash_files",
+            help="Hash new and changed files after the scan",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Print the scan's timings and counters",
+        )
+        parser.add_argument(
+            "--profile-output",
+            help="Profile the scan and write the profile to this file "
+            "(cProfile stats, or pyinstrument HTML for .html files)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_false",
+            dest="resume",
+            help="Start over instead of resuming an interrupted scan",
+        )
+        parser.add_argument(
+            "--low-memory",
+            action="store_const",
+            const=True,
+            dest="low_memory",
+            help="Merge a sorted walk with the stored files instead of "
+            "loading them all, whatever SCAN_LOW_MEMORY_FILES says",
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            "--incremental",
+            action="store_const",
+            const=True,
+            dest="incremental",
+            help="Skip files in folders unchanged since the last scan",
+        )
+        mode.add_argument(
+            "--full",
+            action="store_const",
+            const=False,
+            dest="incremental",
+            help="Stat every file, even when SCAN_INCREMENTAL is enabled",
+        )
+        mode.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare an incremental walk against a full walk without "
+            "saving anything",
+        )
 
     def handle(self, *args, **options):
         project_id = options["project_id"]
@@ -19,9 +72,25 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Scanning project: {project.name} ({project.folder_path})")
 
+        monitor = FolderMonitor(
+            project,
+            incremental=options["incremental"],
+            hash_files=options["hash_files"],
+            resume=options["resume"],
+            low_memory=options["low_memory"],
+        )
+
+        if options["verify"]:
+            self.verify(monitor)
+            return
+
         try:
-            monitor = FolderMonitor(project)
-            result = monitor.scan_folder()
+            if options["profile_output"]:
+                with profile_to(options["profile_output"]):
+                    result = monitor.scan_folder()
+                self.stdout.write(f'Profile written to {options["profile_output"]}')
+            else:
+                result = monitor.scan_folder()
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -31,5 +100,37 @@ class Command(BaseCommand):
                     f'Size change: {result["size_change"]} bytes.'
                 )
             )
+            if "hashing" in result:
+                hashing = result["hashing"]
+                self.stdout.write(
+                    f'Hashed {hashing["files_hashed"]} files '
+                    f'({hashing["bytes_hashed"]} bytes), '
+                    f'{hashing["files_failed"]} unreadable, '
+                    f'{hashing["files_pending"]} left for the next run.'
+                )
+            if options["profile"]:
+                self.stdout.write(format_scan_run(monitor.scan_run))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error scanning project: {str(e)}"))
+
+    def verify(self, monitor):
+        try:
+            report = monitor.verify_incremental()
+        except Exception as e:
+            raise CommandError(f"Error verifying project: {str(e)}")
+
+        if report["missing"] or report["unexpected"]:
+            for path in report["missing"]:
+                self.stdout.write(self.style.ERROR(f"  missing: {path}"))
+            for path in report["unexpected"]:
+                self.stdout.write(self.style.ERROR(f"  unexpected: {path}"))
+            raise CommandError("Incremental walk does not match the full walk")
+
+        for path in report["stale"]:
+            self.stdout.write(self.style.WARNING(f"  stale: {path}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Incremental walk matches the full walk. {len(report["stale"])} '
+                "files were modified in place and need a full scan."
+            )
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from core.services.folder_watcher import ProjectWatcher
+
+
+class Command(BaseCommand):
+    help = "Watch active project folders and record changes as they happen"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            help="Seconds a path must be quiet before its change is recorded",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            type=int,
+            help="Seconds between writes of activity logs",
+        )
+        parser.add_argument(
+            "--reconcile-minutes",
+            type=int,
+            help="Minutes between full rescans of watched projects",
+        )
+        parser.add_argument(
+            "--poll-minutes",
+            type=int,
+            help="Minutes between scans of projects that can't be watched",
+        )
+
+    def handle(self, *args, **options):
+        watcher = ProjectWatcher(
+            debounce=options["debounce"],
+            flush_interval=options["flush_interval"],
+            reconcile_minutes=options["reconcile_minutes"],
+            poll_minutes=options["poll_minutes"],
+        )
+        watcher.start()
+        self.stdout.write(
+            self.style.NOTICE(
+                f"Watching {len(watcher.projects) - len(watcher.polled)} projects "
+                f"({len(watcher.watches)} folders), polling {len(watcher.polled)}"
+            )
+        )
+
+        try:
+            while True:
+                watcher.step()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+        self.stdout.write(self.style.SUCCESS("Watcher stopped."))
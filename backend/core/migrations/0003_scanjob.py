@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_directory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("PROJECT", "Project"),
+                            ("ROOT", "Projects root"),
+                            ("ALL", "All projects"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("key", models.CharField(max_length=64)),
+                ("options", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("QUEUED", "Queued"),
+                            ("RUNNING", "Running"),
+                            ("COMPLETED", "Completed"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="QUEUED",
+                        max_length=20,
+                    ),
+                ),
+                ("requests", models.IntegerField(default=1)),
+                ("files_seen", models.BigIntegerField(default=0)),
+                ("files_expected", models.BigIntegerField(default=0)),
+                ("current_project", models.CharField(blank=True, max_length=255)),
+                ("projects_done", models.IntegerField(default=0)),
+                ("projects_total", models.IntegerField(default=0)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_jobs",
+                        to="core.project",
+                    ),
+                ),
+                (
+                    "root",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_jobs",
+                        to="core.projectsroot",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["QUEUED", "RUNNING"])),
+                        fields=("key",),
+                        name="unique_active_scan_job",
+                    )
+                ],
+            },
+        ),
+    ]
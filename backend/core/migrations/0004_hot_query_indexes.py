@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:43
+
+from django.db import DatabaseError, migrations, models, transaction
+
+# Django runs filename__icontains as UPPER(filename) LIKE UPPER(%s) on
+# PostgreSQL, which a trigram index on the same expression can serve
+TRIGRAM_INDEX = "core_file_filename_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        # Other databases rely on core_file_project_name_idx
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON core_filerecord "
+                "USING gin (UPPER(filename) gin_trgm_ops)"
+            )
+    except DatabaseError as e:
+        # The extension needs a privileged role; searches still work without it
+        print(f"Skipping {TRIGRAM_INDEX}: {e}")
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_scanjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["project", "timestamp"], name="core_activity_project_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="filerecord",
+            index=models.Index(
+                fields=["project", "filename"], name="core_file_project_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="filerecord",
+            index=models.Index(
+                fields=["size", "file_hash"], name="core_file_size_hash_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
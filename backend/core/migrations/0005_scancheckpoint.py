@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("incremental", models.BooleanField()),
+                ("last_folder", models.CharField(max_length=512)),
+                ("folders_done", models.IntegerField(default=0)),
+                ("files_seen", models.BigIntegerField(default=0)),
+                ("bytes_seen", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_checkpoint",
+                        to="core.project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ScanCheckpointChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("folders", models.JSONField()),
+                (
+                    "checkpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="core.scancheckpoint",
+                    ),
+                ),
+            ],
+        ),
+    ]
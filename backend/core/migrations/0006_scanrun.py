@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_scancheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("incremental", models.BooleanField(default=False)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField()),
+                ("folders_visited", models.IntegerField(default=0)),
+                ("files_visited", models.BigIntegerField(default=0)),
+                ("stat_calls", models.BigIntegerField(default=0)),
+                ("bytes_visited", models.BigIntegerField(default=0)),
+                ("walk_seconds", models.FloatField(default=0)),
+                ("diff_seconds", models.FloatField(default=0)),
+                ("write_seconds", models.FloatField(default=0)),
+                ("hash_seconds", models.FloatField(default=0)),
+                ("query_count", models.IntegerField(default=0)),
+                ("files_added", models.IntegerField(default=0)),
+                ("files_modified", models.IntegerField(default=0)),
+                ("files_deleted", models.IntegerField(default=0)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_runs",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["project", "started_at"],
+                        name="core_scanrun_project_idx",
+                    )
+                ],
+            },
+        ),
+    ]
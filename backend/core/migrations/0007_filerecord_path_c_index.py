@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:10
+
+from django.db import migrations
+
+# Low-memory scans page through a project's files ordered by path COLLATE "C"
+# on PostgreSQL, which the (project, path) index under the database collation
+# can't serve
+PATH_INDEX = "core_file_project_path_c_idx"
+
+
+def create_path_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        # Other databases compare paths bytewise, like core_filerecord's
+        # unique (project, path) index
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {PATH_INDEX} ON core_filerecord "
+        '(project_id, path COLLATE "C")'
+    )
+
+
+def drop_path_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PATH_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_scanrun"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_path_index, drop_path_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_filerecord_path_c_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="directory",
+            name="name",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="directory",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="children",
+                to="core.directory",
+            ),
+        ),
+        # Filled in by 0009, then made required by 0010
+        migrations.AddField(
+            model_name="filerecord",
+            name="directory",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="files",
+                to="core.directory",
+            ),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:25
+
+import os
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_directories(apps, schema_editor):
+    """
+    Create a Directory for every folder holding stored files, link folders
+    to their parents and files to their folders
+    """
+    Project = apps.get_model("core", "Project")
+    Directory = apps.get_model("core", "Directory")
+    FileRecord = apps.get_model("core", "FileRecord")
+
+    for project_id in Project.objects.values_list("id", flat=True):
+        files = FileRecord.objects.filter(project_id=project_id)
+
+        # Folders of the stored files and all their parents, besides the
+        # folders recorded by incremental scans
+        folders = {"."}
+        for path in files.values_list("path", flat=True).iterator():
+            folder = os.path.dirname(path)
+            while folder and folder not in folders:
+                folders.add(folder)
+                folder = os.path.dirname(folder)
+
+        directories = {
+            d.path: d for d in Directory.objects.filter(project_id=project_id)
+        }
+        folders.update(directories)
+
+        # Parents first, so every folder's parent has a primary key
+        created = set()
+        for path in sorted(folders, key=lambda path: (path.count(os.sep), path)):
+            parent_path = os.path.dirname(path) or "."
+            directory = directories.get(path)
+            if directory is None:
+                # Unknown state, so the next incremental scan stats its files
+                directory = Directory(project_id=project_id, path=path, mtime=None)
+                directories[path] = directory
+                created.add(path)
+            if path == ".":
+                directory.parent = None
+                directory.name = ""
+            else:
+                directory.parent = directories[parent_path]
+                directory.name = os.path.basename(path)
+            if directory.pk is None:
+                directory.save()
+        existing = [d for path, d in directories.items() if path not in created]
+        Directory.objects.bulk_update(
+            existing, ["parent", "name"], batch_size=BATCH_SIZE
+        )
+
+        # Pages by primary key rather than one cursor, which SQLite doesn't
+        # isolate from the updates
+        last_id = 0
+        while True:
+            page = list(
+                files.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "path")[:BATCH_SIZE]
+            )
+            if not page:
+                break
+            FileRecord.objects.bulk_update(
+                [
+                    FileRecord(
+                        pk=record_id,
+                        directory_id=directories[os.path.dirname(path) or "."].pk,
+                    )
+                    for record_id, path in page
+                ],
+                ["directory"],
+            )
+            last_id = page[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_directory_tree"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_directories, migrations.RunPython.noop),
+    ]
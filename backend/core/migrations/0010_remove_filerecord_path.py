@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:25
+
+import os
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def restore_paths(apps, schema_editor):
+    """Rebuild FileRecord.path from the folder path and filename"""
+    FileRecord = apps.get_model("core", "FileRecord")
+
+    last_id = 0
+    while True:
+        page = list(
+            FileRecord.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "directory__path", "filename")[:BATCH_SIZE]
+        )
+        if not page:
+            break
+        FileRecord.objects.bulk_update(
+            [
+                FileRecord(
+                    pk=record_id,
+                    path=(
+                        filename if folder == "." else os.path.join(folder, filename)
+                    ),
+                )
+                for record_id, folder, filename in page
+            ],
+            ["path"],
+        )
+        last_id = page[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_backfill_directories"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="filerecord",
+            unique_together=set(),
+        ),
+        # So the path can be added back to existing rows when reversed
+        migrations.AlterField(
+            model_name="filerecord",
+            name="path",
+            field=models.CharField(default="", max_length=512),
+        ),
+        # Only reversed, between adding the path back and making it unique
+        migrations.RunPython(migrations.RunPython.noop, restore_paths),
+        migrations.RemoveField(
+            model_name="filerecord",
+            name="path",
+        ),
+        migrations.AlterField(
+            model_name="filerecord",
+            name="directory",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="files",
+                to="core.directory",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="filerecord",
+            unique_together={("directory", "filename")},
+        ),
+    ]
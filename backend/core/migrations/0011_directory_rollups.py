@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+import os
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+BATCH_SIZE = 1000
+
+
+def compute_rollups(apps, schema_editor):
+    """Fill in the subtree totals of every folder, deepest folders first"""
+    Project = apps.get_model("core", "Project")
+    Directory = apps.get_model("core", "Directory")
+    FileRecord = apps.get_model("core", "FileRecord")
+
+    for project_id in Project.objects.values_list("id", flat=True):
+        directories = list(Directory.objects.filter(project_id=project_id))
+        totals = {d.pk: [0, 0, None] for d in directories}
+        rows = (
+            FileRecord.objects.filter(project_id=project_id)
+            .values("directory_id")
+            .annotate(files=Count("id"), size=Sum("size"), newest=Max("last_modified"))
+            .order_by()
+        )
+        for row in rows:
+            totals[row["directory_id"]] = [row["files"], row["size"], row["newest"]]
+
+        directories.sort(key=lambda d: d.path.count(os.sep) + (d.path != "."))
+        for directory in reversed(directories):
+            files, size, newest = totals[directory.pk]
+            directory.total_files = files
+            directory.total_size = size
+            directory.newest_modified = newest
+            if directory.parent_id is not None:
+                parent = totals[directory.parent_id]
+                parent[0] += files
+                parent[1] += size
+                if newest is not None and (parent[2] is None or newest > parent[2]):
+                    parent[2] = newest
+
+        Directory.objects.bulk_update(
+            directories,
+            ["total_files", "total_size", "newest_modified"],
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_remove_filerecord_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="directory",
+            name="newest_modified",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="directory",
+            name="total_files",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="directory",
+            name="total_size",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(compute_rollups, migrations.RunPython.noop),
+    ]
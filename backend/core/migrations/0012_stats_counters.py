@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:05
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def count_totals(apps, schema_editor):
+    """Fill in the totals of every root and the global stats row"""
+    ProjectsRoot = apps.get_model("core", "ProjectsRoot")
+    Project = apps.get_model("core", "Project")
+    GlobalStats = apps.get_model("core", "GlobalStats")
+
+    totals = {
+        "total_projects": Count("id"),
+        "active_projects": Count("id", filter=Q(active=True)),
+        "total_files": Sum("total_files"),
+        "total_size": Sum("total_size"),
+    }
+    rows = Project.objects.filter(root__isnull=False).values("root").annotate(**totals)
+    for row in rows.order_by():
+        ProjectsRoot.objects.filter(pk=row.pop("root")).update(
+            **{field: value or 0 for field, value in row.items()}
+        )
+
+    row = Project.objects.aggregate(**totals)
+    GlobalStats.objects.create(pk=1, **{field: row[field] or 0 for field in totals})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_directory_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GlobalStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_projects", models.IntegerField(default=0)),
+                ("active_projects", models.IntegerField(default=0)),
+                ("total_files", models.BigIntegerField(default=0)),
+                ("total_size", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "global stats",
+            },
+        ),
+        migrations.AddField(
+            model_name="projectsroot",
+            name="active_projects",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectsroot",
+            name="total_files",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectsroot",
+            name="total_projects",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectsroot",
+            name="total_size",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(count_totals, migrations.RunPython.noop),
+    ]
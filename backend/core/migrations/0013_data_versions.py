@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:30
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_stats_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="globalstats",
+            name="data_version",
+            field=models.CharField(default=core.models.new_data_version, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="data_version",
+            field=models.CharField(default=core.models.new_data_version, max_length=32),
+        ),
+    ]
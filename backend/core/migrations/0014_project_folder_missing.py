@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:50
+
+from django.db import migrations, models
+
+
+def mark_missing_folders(apps, schema_editor):
+    """
+    Discovery used to deactivate auto-discovered projects whose folder was
+    gone without a trace; flag them so they come back with their folder
+    """
+    Project = apps.get_model("core", "Project")
+    Project.objects.filter(is_auto_discovered=True, active=False).update(
+        folder_missing=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_data_versions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="folder_missing",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_missing_folders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_project_folder_missing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("ADDED", "Added"),
+                            ("MODIFIED", "Modified"),
+                            ("DELETED", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("path", models.CharField(max_length=1024)),
+                ("size", models.BigIntegerField(default=0)),
+                ("size_change", models.BigIntegerField(default=0)),
+                ("last_modified", models.DateTimeField(blank=True, null=True)),
+                ("previous_modified", models.DateTimeField(blank=True, null=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="file_changes",
+                        to="core.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["project", "timestamp", "id"],
+                        name="core_filechange_project_ts_idx",
+                    ),
+                    models.Index(fields=["timestamp"], name="core_filechange_ts_idx"),
+                ],
+            },
+        ),
+    ]
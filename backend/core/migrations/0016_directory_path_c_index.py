@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:30
+
+from django.db import migrations
+
+# DirectoryQuerySet.subtree() selects folders by a range of paths compared
+# COLLATE "C" on PostgreSQL, which the (project, path) unique index under
+# the database collation can't serve. The index 0007 added for the same
+# purpose on core_filerecord went with its path column in 0010.
+PATH_INDEX = "core_dir_project_path_c_idx"
+OLD_PATH_INDEX = "core_file_project_path_c_idx"
+
+
+def create_path_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        # Other databases compare paths bytewise, like the unique
+        # (project, path) index
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {OLD_PATH_INDEX}")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {PATH_INDEX} ON core_directory "
+        '(project_id, path COLLATE "C")'
+    )
+
+
+def drop_path_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PATH_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_file_changes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_path_index, drop_path_index),
+    ]
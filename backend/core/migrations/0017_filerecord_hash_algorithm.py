@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_directory_path_c_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filerecord",
+            name="hash_algorithm",
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+import os
+import uuid
+from django.db import connections, models
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Collate, Concat
 from django.utils import timezone
 
 
@@ -11,10 +15,21 @@ class ProjectsRoot(models.Model):
     auto_discover = models.BooleanField(default=True)  # Auto-discover projects
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Totals of the root's projects, kept by core.services.stats_counters
+    total_projects = models.IntegerField(default=0)
+    active_projects = models.IntegerField(default=0)
+    total_files = models.IntegerField(default=0)
+    total_size = models.BigIntegerField(default=0)  # in bytes
+
     def __str__(self):
         return self.name
 
 
+def new_data_version():
+    """A new version token, see core.services.response_cache"""
+    return uuid.uuid4().hex
+
+
 class Project(models.Model):
     """Individual project folder"""
 
@@ -34,32 +49,179 @@ class Project(models.Model):
     total_files = models.IntegerField(default=0)
     total_size = models.BigIntegerField(default=0)  # in bytes
     active = models.BooleanField(default=True)
+    folder_missing = models.BooleanField(
+        default=False
+    )  # Deactivated by discovery while the folder is gone from its root
     created_at = models.DateTimeField(auto_now_add=True)
+    # Replaced whenever what the project's API responses show changes
+    data_version = models.CharField(max_length=32, default=new_data_version)
 
     def __str__(self):
         return self.name
 
 
+def join_path(folder, name):
+    """Path of a name in a folder relative to the project folder ("." for it)"""
+    return name if folder == "." else os.path.join(folder, name)
+
+
+class FileRecordQuerySet(models.QuerySet):
+    def with_path(self):
+        """
+        Annotate the path relative to the project folder, joined from the
+        folder path and filename, so it can be read, filtered and ordered on
+        """
+        return self.annotate(
+            path=Case(
+                When(directory__path=".", then=F("filename")),
+                default=Concat(F("directory__path"), Value(os.sep), F("filename")),
+                output_field=CharField(),
+            )
+        )
+
+
 class FileRecord(models.Model):
     """Individual file record"""
 
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="files")
-    path = models.CharField(max_length=512)  # Path relative to project folder
+    # Folder holding the file; paths are stored once per folder. Indexed by
+    # the (directory, filename) unique constraint
+    directory = models.ForeignKey(
+        "Directory", on_delete=models.CASCADE, related_name="files", db_index=False
+    )
     filename = models.CharField(max_length=255)
     size = models.BigIntegerField(default=0)  # in bytes
     last_modified = models.DateTimeField()
     file_hash = models.CharField(
         max_length=64, blank=True, null=True
     )  # For detecting content changes
+    hash_algorithm = models.CharField(
+        max_length=16, blank=True, null=True
+    )  # Algorithm that made file_hash, see utils.file_utils.HASH_ALGORITHMS
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FileRecordQuerySet.as_manager()
+
+    _path = None
+
     def __str__(self):
         return self.filename
 
+    @property
+    def path(self):
+        """Path relative to the project folder"""
+        if self._path is None:
+            self._path = join_path(self.directory.path, self.filename)
+        return self._path
+
+    @path.setter
+    def path(self, value):
+        # Set by FileRecordQuerySet.with_path()
+        self._path = value
+
+    class Meta:
+        unique_together = ("directory", "filename")
+        indexes = [
+            # Filename search within a project. Substring matches can't seek
+            # a B-tree, but this lets them scan one project's index range
+            # instead of the whole table; PostgreSQL also gets a trigram
+            # index (see migration 0004)
+            models.Index(
+                fields=["project", "filename"], name="core_file_project_name_idx"
+            ),
+            # Duplicate detection groups by size, then by stored hash
+            models.Index(fields=["size", "file_hash"], name="core_file_size_hash_idx"),
+        ]
+
+
+class DirectoryQuerySet(models.QuerySet):
+    def subtree(self, folder):
+        """
+        A folder and all folders under it
+
+        Folders under it are the paths from "folder/" up to, not including,
+        the separator's next character, compared bytewise: SQLite's default,
+        and COLLATE "C" on PostgreSQL, which the index added by migration
+        0016 covers. Filtered by project, that is a range of an index; LIKE
+        would not be, and it ignores case on SQLite. Files of the subtree
+        are then found with filter(directory__in=...) on the (directory,
+        filename) index.
+        """
+        if folder == ".":
+            return self
+        prefix = os.path.join(folder, "")
+        end = folder + chr(ord(os.sep) + 1)
+        path = F("path")
+        if connections[self.db].vendor == "postgresql":
+            path = Collate(path, "C")
+        return self.alias(bytewise_path=path).filter(
+            Q(path=folder) | Q(bytewise_path__gte=prefix, bytewise_path__lt=end)
+        )
+
+
+class Directory(models.Model):
+    """
+    Folder of a project, holding its files, with the state recorded at the
+    last scan, used to skip unchanged folders, and totals of its subtree
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="directories"
+    )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="children",
+    )  # None for the project folder
+    name = models.CharField(max_length=255, blank=True)  # "" for the project folder
+    path = models.CharField(max_length=512)  # Relative to project folder, "." for it
+    mtime = models.FloatField(
+        null=True, blank=True
+    )  # None when the folder changed while it was being scanned
+    entry_count = models.IntegerField(default=0)  # Files and subfolders
+
+    # Totals of everything under the folder, kept by DirectoryRollup
+    total_files = models.IntegerField(default=0)
+    total_size = models.BigIntegerField(default=0)  # in bytes
+    newest_modified = models.DateTimeField(null=True, blank=True)
+
+    objects = DirectoryQuerySet.as_manager()
+
+    def __str__(self):
+        return self.path
+
     class Meta:
         unique_together = ("project", "path")
 
 
+class GlobalStats(models.Model):
+    """
+    Totals of all projects, kept by core.services.stats_counters in a
+    single row so they can be read without aggregating the projects
+    """
+
+    total_projects = models.IntegerField(default=0)
+    active_projects = models.IntegerField(default=0)
+    total_files = models.BigIntegerField(default=0)
+    total_size = models.BigIntegerField(default=0)  # in bytes
+    updated_at = models.DateTimeField(auto_now=True)
+    # Replaced whenever any project changes, for the project list
+    data_version = models.CharField(max_length=32, default=new_data_version)
+
+    class Meta:
+        verbose_name_plural = "global stats"
+
+    def __str__(self):
+        return f"{self.total_projects} projects, {self.total_files} files"
+
+    @classmethod
+    def load(cls):
+        """The stats row, created on first use"""
+        return cls.objects.get_or_create(pk=1)[0]
+
+
 class ActivityLog(models.Model):
     """Record of changes in a project"""
 
@@ -74,3 +236,209 @@ class ActivityLog(models.Model):
 
     def __str__(self):
         return f"{self.project.name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+    class Meta:
+        indexes = [
+            # Activity for a project over a date range
+            models.Index(
+                fields=["project", "timestamp"], name="core_activity_project_ts_idx"
+            ),
+        ]
+
+
+class FileChangeKind(models.TextChoices):
+    """What happened to a file"""
+
+    ADDED = "ADDED", "Added"
+    MODIFIED = "MODIFIED", "Modified"
+    DELETED = "DELETED", "Deleted"
+
+
+class FileChange(models.Model):
+    """
+    Change to one file found by a scan or the watcher
+
+    Rows are only ever added, in batches with the scan's other writes, and
+    removed by age with prune_file_changes(); they don't refer to the
+    FileRecord, which is gone once the file is deleted.
+    """
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="file_changes",
+        db_index=False,  # Covered by the (project, timestamp, id) index
+    )
+    timestamp = models.DateTimeField(default=timezone.now)  # Same for a whole scan
+    kind = models.CharField(max_length=10, choices=FileChangeKind.choices)
+    path = models.CharField(max_length=1024)  # Relative to project folder
+    size = models.BigIntegerField(default=0)  # After the change, 0 if deleted
+    size_change = models.BigIntegerField(default=0)  # can be negative
+    last_modified = models.DateTimeField(null=True, blank=True)  # Null if deleted
+    previous_modified = models.DateTimeField(null=True, blank=True)  # Null if added
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.path}"
+
+    class Meta:
+        indexes = [
+            # Changes of a project over a time range, newest first, read a
+            # page at a time by (timestamp, id)
+            models.Index(
+                fields=["project", "timestamp", "id"],
+                name="core_filechange_project_ts_idx",
+            ),
+            # Pruning by age
+            models.Index(fields=["timestamp"], name="core_filechange_ts_idx"),
+        ]
+
+
+class ScanJobKind(models.TextChoices):
+    """What a scan job scans"""
+
+    PROJECT = "PROJECT", "Project"
+    ROOT = "ROOT", "Projects root"
+    ALL = "ALL", "All projects"
+
+
+class ScanJobStatus(models.TextChoices):
+    """Lifecycle of a scan job"""
+
+    QUEUED = "QUEUED", "Queued"
+    RUNNING = "RUNNING", "Running"
+    COMPLETED = "COMPLETED", "Completed"
+    FAILED = "FAILED", "Failed"
+
+
+class ScanJob(models.Model):
+    """Scan requested through the API and run by the scan worker"""
+
+    ACTIVE_STATUSES = [ScanJobStatus.QUEUED, ScanJobStatus.RUNNING]
+
+    kind = models.CharField(max_length=20, choices=ScanJobKind.choices)
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="scan_jobs",
+    )
+    root = models.ForeignKey(
+        ProjectsRoot,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="scan_jobs",
+    )
+    key = models.CharField(max_length=64)  # Identifies duplicate requests
+    options = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=ScanJobStatus.choices, default=ScanJobStatus.QUEUED
+    )
+    requests = models.IntegerField(default=1)  # Requests coalesced into this job
+
+    # Progress
+    files_seen = models.BigIntegerField(default=0)
+    files_expected = models.BigIntegerField(default=0)  # From the previous scan
+    current_project = models.CharField(max_length=255, blank=True)
+    projects_done = models.IntegerField(default=0)
+    projects_total = models.IntegerField(default=0)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Worker heartbeat
+
+    def __str__(self):
+        return f"{self.get_kind_display()} scan #{self.pk} ({self.status})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING"]),
+                name="unique_active_scan_job",
+            )
+        ]
+
+
+class ScanRun(models.Model):
+    """Counters and timings of one project scan, to see why it was slow"""
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="scan_runs"
+    )
+    incremental = models.BooleanField(default=False)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+
+    # Filesystem
+    folders_visited = models.IntegerField(default=0)
+    files_visited = models.BigIntegerField(default=0)
+    stat_calls = models.BigIntegerField(default=0)
+    bytes_visited = models.BigIntegerField(default=0)  # Size of the files stat'ed
+
+    # Seconds spent per phase
+    walk_seconds = models.FloatField(default=0)
+    diff_seconds = models.FloatField(default=0)  # Reading and comparing records
+    write_seconds = models.FloatField(default=0)
+    hash_seconds = models.FloatField(default=0)
+    query_count = models.IntegerField(default=0)
+
+    files_added = models.IntegerField(default=0)
+    files_modified = models.IntegerField(default=0)
+    files_deleted = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.project.name} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
+
+    @property
+    def duration_seconds(self):
+        return (self.finished_at - self.started_at).total_seconds()
+
+    @property
+    def files_per_second(self):
+        duration = self.duration_seconds
+        return self.files_visited / duration if duration > 0 else None
+
+    @property
+    def bytes_per_second(self):
+        duration = self.duration_seconds
+        return self.bytes_visited / duration if duration > 0 else None
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "started_at"], name="core_scanrun_project_idx"
+            ),
+        ]
+
+
+class ScanCheckpoint(models.Model):
+    """Progress of an unfinished project walk, so it can be resumed"""
+
+    project = models.OneToOneField(
+        Project, on_delete=models.CASCADE, related_name="scan_checkpoint"
+    )
+    incremental = models.BooleanField()  # Walks only resume in the same mode
+    last_folder = models.CharField(max_length=512)  # In sorted walk order
+    folders_done = models.IntegerField(default=0)
+    files_seen = models.BigIntegerField(default=0)
+    bytes_seen = models.BigIntegerField(default=0)  # Of the files stat'ed
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.project.name} after {self.last_folder}"
+
+
+class ScanCheckpointChunk(models.Model):
+    """Folders walked between two checkpoints"""
+
+    checkpoint = models.ForeignKey(
+        ScanCheckpoint, on_delete=models.CASCADE, related_name="chunks"
+    )
+    # [[path, mtime, entry_count, [[name, size, mtime], ...]], ...]
+    folders = models.JSONField()
@@ -0,0 +1,140 @@
+import base64
+import json
+import os
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination over several ordering fields
+
+    Each page is read with "(fields) after the last row of the previous
+    page", which an index on the same fields answers directly however many
+    rows there are. DRF's CursorPagination only compares the first ordering
+    field and steps over equal values with an offset, which gets slow when
+    many rows share it.
+
+    Subclasses set ordering, fields that are all ascending or all descending
+    and together unique, and position(), the values of those fields for a
+    row as JSON types; parse_position() turns them back into query values.
+    """
+
+    ordering = ()
+    page_size = 200
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        rows = list(queryset.order_by(*self.ordering)[: page_size + 1])
+        self.last = rows[page_size - 1] if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def after(self, position):
+        """Filter for the rows that come after the given position"""
+        descending = self.ordering[0].startswith("-")
+        lookup = "lt" if descending else "gt"
+        fields = [field.lstrip("-") for field in self.ordering]
+
+        after = Q(**{f"{fields[-1]}__{lookup}": position[-1]})
+        for field, value in reversed(list(zip(fields[:-1], position[:-1]))):
+            after = Q(**{f"{field}__{lookup}": value}) | Q(after, **{field: value})
+        # The bound on the first field alone lets the index be seeked
+        return Q(**{f"{fields[0]}__{lookup}e": position[0]}) & after
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def position(self, row):
+        return [getattr(row, field.lstrip("-")) for field in self.ordering]
+
+    def parse_position(self, position):
+        return position
+
+    def encode_cursor(self, row):
+        position = json.dumps(self.position(row))
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(cursor)
+            return self.parse_position(position)
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.last is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class FileCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination for the files of a project, ordered by folder, then
+    filename
+
+    Pages are read off the (project, path) index of the folders and the
+    (directory, filename) index of the files, so files added or removed
+    between requests don't shift the pages and no page sorts the whole
+    project. Needs a queryset annotated by FileRecordQuerySet.with_path(),
+    from which the folder of each row is taken.
+    """
+
+    ordering = ("directory__path", "filename")
+
+    def position(self, row):
+        return [os.path.dirname(row.path) or ".", row.filename]
+
+
+class ScanRunCursorPagination(CursorPagination):
+    """Scan runs, newest first"""
+
+    ordering = "-started_at"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class FileChangeCursorPagination(KeysetCursorPagination):
+    """
+    Keyset pagination for file changes, newest first, on the
+    (project, timestamp, id) index; all changes of a scan share their
+    timestamp, so the id tells them apart
+    """
+
+    ordering = ("-timestamp", "-id")
+
+    def position(self, row):
+        return [row.timestamp.isoformat(), row.pk]
+
+    def parse_position(self, position):
+        timestamp = parse_datetime(position[0])
+        if timestamp is None:
+            raise ValueError(position[0])
+        return [timestamp, int(position[1])]
@@ -1,17 +1,86 @@
+from datetime import datetime
+from django.utils import timezone
 from rest_framework import serializers
-from .models import ProjectsRoot, Project, FileRecord, ActivityLog
+from .models import (
+    ProjectsRoot,
+    GlobalStats,
+    Project,
+    ScanJob,
+    ScanJobStatus,
+    ScanRun,
+)
+
+
+class ReadOnlyRowSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for hot list endpoints
+
+    Copies the attributes named in Meta.fields off each object as they are,
+    without building and running a serializer field per model field; the
+    JSON renderer formats dates and decimals the way those fields would.
+    Like DateTimeField, aware datetimes are given in the current time zone.
+    Meta.sources maps output names to other attributes, such as "project"
+    to "project_id" for a foreign key, or to methods such as
+    "get_status_display", which are called.
+    """
+
+    def to_representation(self, instance):
+        sources = getattr(self.Meta, "sources", {})
+        row = {}
+        for field in self.Meta.fields:
+            value = getattr(instance, sources.get(field, field))
+            if callable(value):
+                value = value()
+            if isinstance(value, datetime) and timezone.is_aware(value):
+                value = timezone.localtime(value)
+            row[field] = value
+        return row
 
 
 class ProjectsRootSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectsRoot
-        fields = ["id", "name", "path", "last_scan", "auto_discover", "created_at"]
-        read_only_fields = ["last_scan", "created_at"]
+        fields = [
+            "id",
+            "name",
+            "path",
+            "last_scan",
+            "auto_discover",
+            "created_at",
+            "total_projects",
+            "active_projects",
+            "total_files",
+            "total_size",
+        ]
+        read_only_fields = [
+            "last_scan",
+            "created_at",
+            "total_projects",
+            "active_projects",
+            "total_files",
+            "total_size",
+        ]
+
 
+class GlobalStatsSerializer(serializers.ModelSerializer):
+    """Totals of all projects"""
+
+    class Meta:
+        model = GlobalStats
+        fields = [
+            "total_projects",
+            "active_projects",
+            "total_files",
+            "total_size",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class FileRecordSerializer(ReadOnlyRowSerializer):
+    """Files of a project; needs FileRecordQuerySet.with_path()"""
 
-class FileRecordSerializer(serializers.ModelSerializer):
     class Meta:
-        model = FileRecord
         fields = [
             "id",
             "path",
@@ -19,14 +88,27 @@ class FileRecordSerializer(serializers.ModelSerializer):
             "size",
             "last_modified",
             "file_hash",
+            "hash_algorithm",
             "created_at",
         ]
-        read_only_fields = ["created_at"]
 
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class FileChangeSerializer(ReadOnlyRowSerializer):
+    class Meta:
+        fields = [
+            "id",
+            "timestamp",
+            "kind",
+            "path",
+            "size",
+            "size_change",
+            "last_modified",
+            "previous_modified",
+        ]
+
+
+class ActivityLogSerializer(ReadOnlyRowSerializer):
     class Meta:
-        model = ActivityLog
         fields = [
             "id",
             "project",
@@ -36,7 +118,7 @@ class ActivityLogSerializer(serializers.ModelSerializer):
             "files_deleted",
             "size_change",
         ]
-        read_only_fields = ["timestamp"]
+        sources = {"project": "project_id"}
 
 
 class ProjectSerializer(serializers.ModelSerializer):
@@ -57,6 +139,28 @@ class ProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ["last_scan", "total_files", "total_size", "created_at"]
 
 
+class DirectorySerializer(ReadOnlyRowSerializer):
+    """Folder of a project with the totals of everything under it"""
+
+    class Meta:
+        fields = [
+            "id",
+            "name",
+            "path",
+            "total_files",
+            "total_size",
+            "newest_modified",
+        ]
+
+
+class ProjectListSerializer(ReadOnlyRowSerializer):
+    """Lean read-only version of ProjectSerializer for the project list"""
+
+    class Meta:
+        fields = ProjectSerializer.Meta.fields
+        sources = {"root": "root_id"}
+
+
 class ProjectDetailSerializer(serializers.ModelSerializer):
     """More detailed project serializer with recent activity and stats"""
 
@@ -86,6 +190,92 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_recent_activity(self, obj):
-        # Get the 5 most recent activity logs
-        recent_logs = obj.activities.all().order_by("-timestamp")[:5]
+        # The 5 most recent activity logs, prefetched by ProjectViewSet
+        recent_logs = getattr(obj, "recent_activity", None)
+        if recent_logs is None:
+            recent_logs = obj.activities.all().order_by("-timestamp")[:5]
         return ActivityLogSerializer(recent_logs, many=True).data
+
+
+class ScanJobSerializer(serializers.ModelSerializer):
+    """Scan job status with progress and an estimated time remaining"""
+
+    kind_display = serializers.CharField(source="get_kind_display", read_only=True)
+    status_display = serializers.CharField(source="get_status_display", read_only=True)
+    eta_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ScanJob
+        fields = [
+            "id",
+            "kind",
+            "kind_display",
+            "project",
+            "root",
+            "options",
+            "status",
+            "status_display",
+            "requests",
+            "files_seen",
+            "files_expected",
+            "current_project",
+            "projects_done",
+            "projects_total",
+            "eta_seconds",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+    def get_eta_seconds(self, obj):
+        # Extrapolated from the file count of the previous scan
+        if (
+            obj.status != ScanJobStatus.RUNNING
+            or obj.started_at is None
+            or not obj.files_seen
+            or obj.files_expected <= obj.files_seen
+        ):
+            return None
+        elapsed = (timezone.now() - obj.started_at).total_seconds()
+        remaining = obj.files_expected - obj.files_seen
+        return round(elapsed * remaining / obj.files_seen)
+
+
+class ScanRunSerializer(serializers.ModelSerializer):
+    """Metrics of a project scan with its throughput"""
+
+    project_name = serializers.CharField(source="project.name", read_only=True)
+    duration_seconds = serializers.FloatField(read_only=True)
+    files_per_second = serializers.FloatField(read_only=True)
+    bytes_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ScanRun
+        fields = [
+            "id",
+            "project",
+            "project_name",
+            "incremental",
+            "started_at",
+            "finished_at",
+            "duration_seconds",
+            "folders_visited",
+            "files_visited",
+            "stat_calls",
+            "bytes_visited",
+            "files_per_second",
+            "bytes_per_second",
+            "walk_seconds",
+            "diff_seconds",
+            "write_seconds",
+            "hash_seconds",
+            "query_count",
+            "files_added",
+            "files_modified",
+            "files_deleted",
+        ]
+        read_only_fields = fields
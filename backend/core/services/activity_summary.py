@@ -0,0 +1,74 @@
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc, TruncDate
+from core.models import ActivityLog
+
+BUCKET_INTERVALS = ("day", "week", "month")
+
+
+class ActivitySummary:
+    """
+    Totals and time-series buckets of the activity logs in a period
+
+    Everything is computed by the database: the summary is a single
+    aggregate() query and the buckets a single grouped annotate() query, so
+    the cost doesn't depend on how many logs the period contains.
+    """
+
+    def __init__(self, start_date, end_date, projects=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.logs = ActivityLog.objects.filter(
+            timestamp__gte=start_date, timestamp__lte=end_date
+        )
+        if projects is not None:
+            self.logs = self.logs.filter(project__in=projects)
+
+    def summary(self):
+        """
+        Totals over the whole period
+
+        Returns:
+            dict: Files added, modified and deleted, net size change, and the
+                number of days with activity
+        """
+        totals = self.logs.aggregate(
+            total_added=Sum("files_added"),
+            total_modified=Sum("files_modified"),
+            total_deleted=Sum("files_deleted"),
+            net_size_change=Sum("size_change"),
+            active_days=Count(TruncDate("timestamp"), distinct=True),
+        )
+        return {
+            "period_start": self.start_date,
+            "period_end": self.end_date,
+            **{key: value or 0 for key, value in totals.items()},
+        }
+
+    def buckets(self, interval="day"):
+        """
+        Totals per day, week or month, oldest first
+
+        Args:
+            interval: "day", "week" or "month"; weeks start on Monday
+
+        Returns:
+            list: One dict per bucket with activity, with its start date and
+                the same totals as summary()
+        """
+        if interval not in BUCKET_INTERVALS:
+            raise ValueError(f"Unknown bucket interval: {interval}")
+
+        # Truncated in the current time zone, like TruncDate
+        bucket = Trunc("timestamp", interval, output_field=DateField())
+        return list(
+            self.logs.annotate(bucket=bucket)
+            .values("bucket")
+            .annotate(
+                files_added=Sum("files_added"),
+                files_modified=Sum("files_modified"),
+                files_deleted=Sum("files_deleted"),
+                size_change=Sum("size_change"),
+                scans=Count("id"),
+            )
+            .order_by("bucket")
+        )
@@ -0,0 +1,136 @@
+import os
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from core.models import Directory, FileRecord
+
+
+class DirectoryRollup:
+    """
+    Keeps the subtree totals of a project's folders up to date
+
+    Every Directory holds the file count, total size and newest modification
+    time of everything under it. After a scan changes some folders, only
+    those folders and their parents are recomputed, deepest first: each from
+    its own files, grouped in one query per batch of folders, plus the
+    totals of its direct subfolders. Unchanged subfolders keep their stored
+    totals, so the work grows with the number of changed folders and their
+    subfolders, not with the size of the project.
+    """
+
+    def __init__(self, project, batch_size=None):
+        self.project = project
+        self.batch_size = batch_size or settings.SCAN_BATCH_SIZE
+
+    def update(self, paths, directories=None):
+        """
+        Recompute the totals of some folders and of all their parents
+
+        Args:
+            paths: Folder paths relative to the project folder whose files
+                changed; folders that no longer exist are skipped
+            directories: Optional saved Directory instances keyed by path,
+                such as FileDiff.directories after apply(), to use instead
+                of loading them
+
+        Returns:
+            int: Number of folders recomputed
+        """
+        affected = set()
+        for path in paths:
+            while path not in affected:
+                affected.add(path)
+                if path == ".":
+                    break
+                path = os.path.dirname(path) or "."
+
+        if directories is not None:
+            return self._recompute(
+                [directories[path] for path in affected if path in directories],
+                all_folders=False,
+            )
+
+        loaded = []
+        affected = sorted(affected)
+        for start in range(0, len(affected), self.batch_size):
+            loaded.extend(
+                self.project.directories.filter(
+                    path__in=affected[start : start + self.batch_size]
+                )
+            )
+        return self._recompute(loaded, all_folders=False)
+
+    def rebuild(self):
+        """
+        Recompute the totals of every folder of the project
+
+        Returns:
+            int: Number of folders recomputed
+        """
+        return self._recompute(list(self.project.directories.all()), all_folders=True)
+
+    def _recompute(self, directories, all_folders):
+        ids = [directory.pk for directory in directories]
+        totals = {pk: [0, 0, None] for pk in ids}  # files, bytes, newest
+
+        # Files directly in each folder
+        for start in range(0, len(ids), self.batch_size):
+            rows = (
+                FileRecord.objects.filter(
+                    directory_id__in=ids[start : start + self.batch_size]
+                )
+                .values("directory_id")
+                .annotate(
+                    files=Count("id"), size=Sum("size"), newest=Max("last_modified")
+                )
+                .order_by()
+            )
+            for row in rows:
+                totals[row["directory_id"]] = [
+                    row["files"],
+                    row["size"] or 0,
+                    row["newest"],
+                ]
+
+        # Subfolders that aren't recomputed contribute their stored totals
+        children = defaultdict(list)  # parent id -> child ids
+        stored = {}
+        if all_folders:
+            for directory in directories:
+                if directory.parent_id is not None:
+                    children[directory.parent_id].append(directory.pk)
+        else:
+            for start in range(0, len(ids), self.batch_size):
+                for child in Directory.objects.filter(
+                    parent_id__in=ids[start : start + self.batch_size]
+                ).values(
+                    "id", "parent_id", "total_files", "total_size", "newest_modified"
+                ):
+                    children[child["parent_id"]].append(child["id"])
+                    if child["id"] not in totals:
+                        stored[child["id"]] = [
+                            child["total_files"],
+                            child["total_size"],
+                            child["newest_modified"],
+                        ]
+
+        # Deepest folders first, so subfolders are done before their parents
+        directories.sort(key=lambda d: d.path.count(os.sep) + (d.path != "."))
+        for directory in reversed(directories):
+            total = totals[directory.pk]
+            for child_id in children[directory.pk]:
+                files, size, newest = totals.get(child_id) or stored[child_id]
+                total[0] += files
+                total[1] += size
+                if newest is not None and (total[2] is None or newest > total[2]):
+                    total[2] = newest
+            directory.total_files, directory.total_size, directory.newest_modified = (
+                total
+            )
+
+        Directory.objects.bulk_update(
+            directories,
+            ["total_files", "total_size", "newest_modified"],
+            batch_size=self.batch_size,
+        )
+        return len(directories)
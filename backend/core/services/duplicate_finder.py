@@ -0,0 +1,257 @@
+import os
+import heapq
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from core.models import Project, FileRecord
+from utils.file_utils import get_file_hash, get_partial_file_hash
+
+
+class DuplicateFinder:
+    """
+    Finds files with identical content, within and across projects
+
+    Candidates are narrowed down in stages so only files that could be
+    duplicates are read: same size, then the same
+    hash of their first and last blocks, then the same full hash. Full hashes
+    stored by the scanner's hashing stage are reused if they were made with
+    the same algorithm, and newly computed ones are saved when that is the
+    scanner's algorithm. Files are read from the database in one query,
+    sorted by size, and only one size group is held in memory at a time.
+
+    With read_files=False nothing is read from disk: files are grouped by
+    their stored hash alone, and files without one are ignored.
+    """
+
+    PARTIAL_BLOCK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        projects=None,
+        min_size=1,
+        read_files=True,
+        limit=100,
+        algorithm=None,
+        workers=None,
+    ):
+        self.projects = projects if projects is not None else Project.objects.all()
+        self.min_size = min_size
+        self.read_files = read_files
+        self.limit = limit  # Largest clusters listed in the report
+        self.algorithm = algorithm or settings.SCAN_HASH_ALGORITHM
+        self.workers = workers or settings.SCAN_HASH_WORKERS
+
+    def find(self):
+        """
+        Find duplicate clusters and the space they waste
+
+        One copy of each cluster (the oldest record) is considered the
+        original; the others count as reclaimable bytes of their project and
+        root.
+
+        Returns:
+            dict: Totals, the largest clusters, and reclaimable bytes per
+                project and per root
+        """
+        self._project_info = {
+            p["id"]: p
+            for p in self.projects.values("id", "name", "folder_path", "root_id")
+        }
+        self._top_clusters = []  # Min-heap on reclaimable bytes
+        self._cluster_count = 0
+        self._per_project = defaultdict(lambda: [0, 0])  # files, bytes
+        self._counter = 0
+
+        records = FileRecord.objects.filter(
+            project_id__in=list(self._project_info), size__gte=self.min_size
+        )
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self._executor = executor
+            if self.read_files:
+                self._find_by_content(records)
+            else:
+                self._find_by_stored_hash(records)
+
+        return self._report()
+
+    def _find_by_stored_hash(self, records):
+        rows = (
+            records.filter(file_hash__isnull=False, hash_algorithm=self.algorithm)
+            .with_path()
+            .order_by("size", "file_hash", "id")
+            .values_list("size", "file_hash", "id", "project_id", "path")
+        )
+        for (size, file_hash), group in groupby(
+            rows.iterator(chunk_size=settings.SCAN_BATCH_SIZE), key=itemgetter(0, 1)
+        ):
+            members = [row[2:] for row in group]
+            if len(members) > 1:
+                self._add_cluster(size, file_hash, members)
+
+    def _find_by_content(self, records):
+        rows = (
+            records.with_path()
+            .order_by("size", "id")
+            .values_list(
+                "size", "id", "project_id", "path", "file_hash", "hash_algorithm"
+            )
+        )
+        # Hashes saved on the way don't change the size or id the rows are
+        # sorted by, so the stream can stay open while they are written
+        for size, group in groupby(
+            rows.iterator(chunk_size=settings.SCAN_BATCH_SIZE), key=itemgetter(0)
+        ):
+            # Stored hashes of another algorithm can't be compared, so
+            # those files count as not hashed
+            members = [
+                (*member, file_hash if algorithm == self.algorithm else None)
+                for _, *member, file_hash, algorithm in group
+            ]
+            if len(members) < 2:
+                continue
+            for file_hash, cluster in self._split_by_content(size, members):
+                self._add_cluster(size, file_hash, cluster)
+
+    def _split_by_content(self, size, members):
+        """
+        Split a group of same-sized files into groups of identical files
+
+        Yields:
+            tuple: (full hash, list of (id, project_id, path))
+        """
+        if all(m[3] for m in members):
+            # Every file already has a full hash
+            yield from self._group((m[3], m[:3]) for m in members)
+            return
+
+        partial_hashes = self._hash_files(members, partial=True)
+        candidates = self._group(
+            (partial_hashes[m[0]], m) for m in members if partial_hashes.get(m[0])
+        )
+
+        for partial_hash, group in candidates:
+            if size <= 2 * self.PARTIAL_BLOCK_SIZE:
+                # The whole file was hashed, so the partial hash is the full one
+                self._save_hashes(
+                    {m[0]: partial_hash for m in group if m[3] != partial_hash}
+                )
+                yield partial_hash, [m[:3] for m in group]
+                continue
+
+            full_hashes = {m[0]: m[3] for m in group if m[3]}
+            computed = self._hash_files([m for m in group if not m[3]], partial=False)
+            self._save_hashes({k: v for k, v in computed.items() if v})
+            full_hashes.update(computed)
+
+            yield from self._group(
+                (full_hashes[m[0]], m[:3]) for m in group if full_hashes.get(m[0])
+            )
+
+    @staticmethod
+    def _group(pairs):
+        """Group (key, value) pairs, keeping only keys with several values"""
+        groups = defaultdict(list)
+        for key, value in pairs:
+            groups[key].append(value)
+        return [(key, values) for key, values in groups.items() if len(values) > 1]
+
+    def _hash_files(self, members, partial):
+        """Hash files on the thread pool, returning hashes keyed by record id"""
+
+        def hash_member(member):
+            record_id, project_id, path = member[:3]
+            folder_path = self._project_info[project_id]["folder_path"]
+            full_path = os.path.join(folder_path, path)
+            if partial:
+                file_hash = get_partial_file_hash(
+                    full_path, self.algorithm, self.PARTIAL_BLOCK_SIZE
+                )
+            else:
+                file_hash = get_file_hash(full_path, self.algorithm)
+            return record_id, file_hash
+
+        return dict(self._executor.map(hash_member, members))
+
+    def _save_hashes(self, hashes):
+        # Hashes of other algorithms would replace the scanner's and be made
+        # again by its next hashing stage
+        if hashes and self.algorithm == settings.SCAN_HASH_ALGORITHM:
+            FileRecord.objects.bulk_update(
+                [
+                    FileRecord(pk=pk, file_hash=h, hash_algorithm=self.algorithm)
+                    for pk, h in hashes.items()
+                ],
+                ["file_hash", "hash_algorithm"],
+            )
+
+    def _add_cluster(self, size, file_hash, members):
+        # Members are ordered by id; the first one is kept as the original
+        duplicates = members[1:]
+        reclaimable = size * len(duplicates)
+        for _, project_id, _ in duplicates:
+            self._per_project[project_id][0] += 1
+            self._per_project[project_id][1] += size
+
+        self._cluster_count += 1
+        if self.limit:
+            cluster = {
+                "size": size,
+                "file_hash": file_hash,
+                "count": len(members),
+                "reclaimable_bytes": reclaimable,
+                "files": [
+                    {
+                        "id": record_id,
+                        "project": project_id,
+                        "project_name": self._project_info[project_id]["name"],
+                        "path": path,
+                    }
+                    for record_id, project_id, path in members
+                ],
+            }
+            # The counter breaks ties so dicts are never compared
+            self._counter += 1
+            entry = (reclaimable, self._counter, cluster)
+            if len(self._top_clusters) < self.limit:
+                heapq.heappush(self._top_clusters, entry)
+            else:
+                heapq.heappushpop(self._top_clusters, entry)
+
+    def _report(self):
+        projects = []
+        roots = defaultdict(lambda: {"duplicate_files": 0, "reclaimable_bytes": 0})
+        for project_id, (files, reclaimable) in self._per_project.items():
+            info = self._project_info[project_id]
+            projects.append(
+                {
+                    "id": project_id,
+                    "name": info["name"],
+                    "root": info["root_id"],
+                    "duplicate_files": files,
+                    "reclaimable_bytes": reclaimable,
+                }
+            )
+            root = roots[info["root_id"]]
+            root["duplicate_files"] += files
+            root["reclaimable_bytes"] += reclaimable
+
+        projects.sort(key=lambda p: p["reclaimable_bytes"], reverse=True)
+        clusters = [
+            cluster for _, _, cluster in sorted(self._top_clusters, reverse=True)
+        ]
+
+        return {
+            "cluster_count": self._cluster_count,
+            "duplicate_files": sum(p["duplicate_files"] for p in projects),
+            "reclaimable_bytes": sum(p["reclaimable_bytes"] for p in projects),
+            "clusters": clusters,
+            "projects": projects,
+            "roots": sorted(
+                ({"id": root_id, **totals} for root_id, totals in roots.items()),
+                key=lambda r: r["reclaimable_bytes"],
+                reverse=True,
+            ),
+        }
@@ -0,0 +1,263 @@
+import os
+from django.conf import settings
+from django.utils import timezone
+from core.models import FileRecord, Directory, FileChange, FileChangeKind
+
+
+class FileDiff:
+    """
+    Collects the changes found while scanning a project folder and writes
+    them to the database in batches
+
+    File changes can also be written as they are found with flush(), inside
+    the transaction that ends with apply(), so memory use doesn't grow with
+    the number of changes. Every file change is also written as a
+    FileChange, in the same batches, all with the time the diff was made.
+
+    Files reference the Directory of their folder. Folders that files are
+    added to are looked up in directories, loaded on first use, and created
+    along with any missing parents when they aren't known yet.
+    """
+
+    def __init__(self, project, batch_size=None):
+        self.project = project
+        self.batch_size = batch_size or settings.SCAN_BATCH_SIZE
+
+        self.added = []  # Unsaved FileRecord instances
+        self.modified = []  # FileRecord instances with updated fields
+        self.deleted = []  # Primary keys of removed FileRecords
+        self.changes = []  # Unsaved FileChange instances
+        self.timestamp = timezone.now()
+
+        # File changes, including the ones already flushed
+        self.files_added = 0
+        self.files_modified = 0
+        self.files_deleted = 0
+
+        # Folder state for the next incremental scan
+        self._directories = None
+        self._paths_by_id = None
+        # Folders whose files changed, for DirectoryRollup
+        self.changed_directories = set()
+        self.added_directories = []
+        self.modified_directories = []
+        self.deleted_directories = []
+
+        # Project totals after the changes are applied
+        self.total_files = 0
+        self.total_size = 0
+
+    @property
+    def directories(self):
+        """
+        Directory of each stored or added folder, keyed by folder path; after
+        apply(), exactly the folders in the database
+        """
+        if self._directories is None:
+            self._directories = {d.path: d for d in self.project.directories.all()}
+        return self._directories
+
+    def directory(self, path):
+        """
+        Get the Directory of a folder, recording it and any missing parents
+        as added folders when they aren't stored yet
+
+        Args:
+            path: Folder path relative to the project folder ("." for it)
+        """
+        directory = self.directories.get(path)
+        if directory is not None:
+            return directory
+
+        parent = None
+        name = ""
+        if path != ".":
+            parent = self.directory(os.path.dirname(path) or ".")
+            name = os.path.basename(path)
+        # No mtime, so incremental scans stat its files until one records it
+        directory = Directory(
+            project=self.project, parent=parent, name=name, path=path, mtime=None
+        )
+        self.directories[path] = directory
+        self.added_directories.append(directory)
+        return directory
+
+    def add(self, path, filename, size, last_modified):
+        """Record a file that is not in the database yet"""
+        folder = os.path.dirname(path) or "."
+        self.files_added += 1
+        self.changed_directories.add(folder)
+        self.added.append(
+            FileRecord(
+                project=self.project,
+                directory=self.directory(folder),
+                filename=filename,
+                size=size,
+                last_modified=last_modified,
+            )
+        )
+        self._change(FileChangeKind.ADDED, path, size, size, last_modified, None)
+
+    def modify(self, record, size, last_modified):
+        """
+        Record new size and modification time for an existing file
+
+        Args:
+            record: FileRecord with at least its pk, directory_id, path and
+                stored size and last_modified
+        """
+        self._change(
+            FileChangeKind.MODIFIED,
+            record.path,
+            size,
+            size - record.size,
+            last_modified,
+            record.last_modified,
+        )
+        record.size = size
+        record.last_modified = last_modified
+        record.file_hash = None  # Content may have changed, hash it again
+        record.hash_algorithm = None
+        self.files_modified += 1
+        self._folder_changed(record.directory_id)
+        self.modified.append(record)
+
+    def delete(self, record):
+        """
+        Record a file that no longer exists on disk
+
+        Args:
+            record: FileRecord with at least its pk, directory_id, path,
+                size and last_modified
+        """
+        self.files_deleted += 1
+        self._folder_changed(record.directory_id)
+        self.deleted.append(record.pk)
+        self._change(
+            FileChangeKind.DELETED,
+            record.path,
+            0,
+            -record.size,
+            None,
+            record.last_modified,
+        )
+
+    @property
+    def pending(self):
+        """File changes not written yet"""
+        return len(self.added) + len(self.modified) + len(self.deleted)
+
+    def add_directory(self, path, mtime, entry_count):
+        """Record a folder that is not in the database yet"""
+        directory = self.directory(path)
+        directory.mtime = mtime
+        directory.entry_count = entry_count
+
+    def modify_directory(self, record, mtime, entry_count):
+        """Record the new state of a known folder"""
+        record.mtime = mtime
+        record.entry_count = entry_count
+        self.modified_directories.append(record)
+
+    def delete_directory(self, record_id):
+        """Record a folder that no longer exists on disk"""
+        path = self._folder_path(record_id)
+        if path is not None and path != ".":
+            self.changed_directories.add(os.path.dirname(path) or ".")
+        self.deleted_directories.append(record_id)
+
+    @property
+    def has_changes(self):
+        """Whether any file changed; folder state alone is not activity"""
+        return bool(self.files_added or self.files_modified or self.files_deleted)
+
+    def flush(self):
+        """
+        Write the file changes collected so far, and the folders added for
+        them, and forget them.
+
+        Must be called inside the transaction that later calls apply().
+        """
+        self._create_directories()
+
+        if self.added:
+            FileRecord.objects.bulk_create(self.added, batch_size=self.batch_size)
+
+        if self.modified:
+            FileRecord.objects.bulk_update(
+                self.modified,
+                ["size", "last_modified", "file_hash", "hash_algorithm"],
+                batch_size=self.batch_size,
+            )
+
+        self._delete_in_chunks(FileRecord, self.deleted)
+        FileChange.objects.bulk_create(self.changes, batch_size=self.batch_size)
+
+        self.added = []
+        self.modified = []
+        self.deleted = []
+        self.changes = []
+
+    def apply(self):
+        """
+        Write the collected changes to the database.
+
+        Must be called inside a transaction so the project never shows a
+        partially applied scan.
+        """
+        self.flush()
+
+        if self.modified_directories:
+            Directory.objects.bulk_update(
+                self.modified_directories,
+                ["mtime", "entry_count"],
+                batch_size=self.batch_size,
+            )
+
+        self._delete_in_chunks(Directory, self.deleted_directories)
+        if self.deleted_directories and self._directories is not None:
+            deleted = set(self.deleted_directories)
+            self._directories = {
+                path: d for path, d in self._directories.items() if d.pk not in deleted
+            }
+
+    def _change(self, kind, path, size, size_change, last_modified, previous):
+        self.changes.append(
+            FileChange(
+                project=self.project,
+                timestamp=self.timestamp,
+                kind=kind,
+                path=path,
+                size=size,
+                size_change=size_change,
+                last_modified=last_modified,
+                previous_modified=previous,
+            )
+        )
+
+    def _folder_path(self, directory_id):
+        if self._paths_by_id is None:
+            self._paths_by_id = {
+                d.pk: path for path, d in self.directories.items() if d.pk is not None
+            }
+        return self._paths_by_id.get(directory_id)
+
+    def _folder_changed(self, directory_id):
+        path = self._folder_path(directory_id)
+        if path is not None:
+            self.changed_directories.add(path)
+
+    def _create_directories(self):
+        # Parents first, so each level can refer to the one above it
+        by_depth = {}
+        for directory in self.added_directories:
+            depth = 0 if directory.path == "." else directory.path.count(os.sep) + 1
+            by_depth.setdefault(depth, []).append(directory)
+        for depth in sorted(by_depth):
+            Directory.objects.bulk_create(by_depth[depth], batch_size=self.batch_size)
+        self.added_directories = []
+
+    def _delete_in_chunks(self, model, ids):
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start : start + self.batch_size]
+            model.objects.filter(pk__in=chunk).delete()
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db.models import Q
+from core.models import FileRecord
+from utils.file_utils import get_file_hash
+
+
+class FileHasher:
+    """
+    Fills in FileRecord.file_hash for files that don't have one yet
+
+    Scans store new and modified files without a hash, so only files whose
+    content may have changed are read. Hashes are stored with their
+    algorithm, and ones made with another algorithm, such as before a
+    change of SCAN_HASH_ALGORITHM, count as missing. Hashing runs after the metadata scan
+    has been committed and stops scheduling files once the byte budget is
+    used; the remaining files keep an empty hash and are picked up by the
+    next run.
+    """
+
+    def __init__(
+        self, project, algorithm=None, workers=None, byte_budget=None, batch_size=None
+    ):
+        self.project = project
+        self.algorithm = algorithm or settings.SCAN_HASH_ALGORITHM
+        self.workers = workers or settings.SCAN_HASH_WORKERS
+        if byte_budget is None:
+            byte_budget = settings.SCAN_HASH_BYTE_BUDGET
+        self.byte_budget = byte_budget  # 0 means unlimited
+        self.batch_size = batch_size or settings.SCAN_BATCH_SIZE
+
+    def hash_pending(self):
+        """
+        Hash files without a stored hash of this algorithm, oldest records
+        first
+
+        Returns:
+            dict: Files and bytes hashed, files that failed to read, and
+                files left for a later run because of the byte budget
+        """
+        stats = {
+            "files_hashed": 0,
+            "bytes_hashed": 0,
+            "files_failed": 0,
+            "files_pending": 0,
+        }
+        bytes_scheduled = 0
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                # Keyset batches, so no cursor stays open while hashes are written
+                rows = list(
+                    FileRecord.objects.filter(
+                        Q(file_hash__isnull=True) | ~Q(hash_algorithm=self.algorithm),
+                        project=self.project,
+                        id__gt=last_id,
+                    )
+                    .with_path()
+                    .order_by("id")
+                    .values_list("id", "path", "size")[: self.batch_size]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                batch = []
+                for record_id, path, size in rows:
+                    # A file larger than the whole budget still gets hashed
+                    # when it comes first, so it can't block the queue forever
+                    if (
+                        self.byte_budget
+                        and bytes_scheduled
+                        and bytes_scheduled + size > self.byte_budget
+                    ):
+                        stats["files_pending"] += 1
+                        continue
+                    bytes_scheduled += size
+                    batch.append((record_id, path, size))
+
+                if batch:
+                    self._hash_batch(executor, batch, stats)
+
+        return stats
+
+    def _hash_batch(self, executor, batch, stats):
+        def hash_file(item):
+            record_id, path, size = item
+            full_path = os.path.join(self.project.folder_path, path)
+            return record_id, size, get_file_hash(full_path, self.algorithm)
+
+        records = []
+        for record_id, size, file_hash in executor.map(hash_file, batch):
+            if file_hash is None:
+                stats["files_failed"] += 1
+                continue
+            records.append(
+                FileRecord(
+                    pk=record_id, file_hash=file_hash, hash_algorithm=self.algorithm
+                )
+            )
+            stats["files_hashed"] += 1
+            stats["bytes_hashed"] += size
+
+        FileRecord.objects.bulk_update(records, ["file_hash", "hash_algorithm"])
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from core.models import FileChange
+
+
+def prune_file_changes(retention_days=None, batch_size=None, now=None):
+    """
+    Delete file changes older than the retention period
+
+    Rows are deleted a batch at a time, oldest first, so each delete holds
+    its locks briefly and a large backlog doesn't need one huge transaction.
+
+    Args:
+        retention_days: Days of history to keep, defaults to the
+            FILE_HISTORY_RETENTION_DAYS setting; 0 keeps everything
+        batch_size: Rows deleted per query, defaults to SCAN_BATCH_SIZE
+        now: Current time
+
+    Returns:
+        int: Number of changes deleted
+    """
+    if retention_days is None:
+        retention_days = settings.FILE_HISTORY_RETENTION_DAYS
+    if not retention_days:
+        return 0
+    batch_size = batch_size or settings.SCAN_BATCH_SIZE
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+
+    old = FileChange.objects.filter(timestamp__lt=cutoff).order_by("timestamp")
+    deleted = 0
+    while True:
+        ids = list(old.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += FileChange.objects.filter(pk__in=ids).delete()[0]
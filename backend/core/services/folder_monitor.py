@@ -1,10 +1,31 @@
 import os
+import time
 import hashlib
 import datetime
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Sum
-from core.models import ProjectsRoot, Project, FileRecord, ActivityLog
+from django.db import connection, transaction
+from core.models import (
+    ProjectsRoot,
+    Project,
+    FileRecord,
+    GlobalStats,
+    ActivityLog,
+    ScanCheckpoint,
+    ScanRun,
+    join_path,
+    new_data_version,
+)
+from core.services.directory_rollup import DirectoryRollup
+from core.services.file_diff import FileDiff
+from core.services.file_hasher import FileHasher
+from core.services.scan_checkpoint import ScanCheckpointer
+from core.services.stats_counters import SCAN_FIELDS, add_to_totals
+from utils.file_walker import FileEntry, WalkStats, folder_sort_key, iter_folders
 
 
 class ProjectsMonitor:
@@ -18,226 +39,956 @@ class ProjectsMonitor:
             root: A ProjectsRoot instance
 
         Returns:
-            dict: Stats about discovered and removed projects
+            dict: Stats about discovered, removed and reactivated projects
         """
-        if not os.path.exists(root.path):
-            print(f"Warning: Projects root path does not exist: {root.path}")
+        folders, error, _ = _list_project_folders(root)
+        return self._apply_discovery(root, folders, error)
+
+    def scan_projects_roots(self, roots, workers=None):
+        """
+        Discover projects in several roots
+
+        With more than one worker the root folders are listed concurrently
+        on a thread pool, which helps when they are on different shares;
+        the changes are applied from the calling thread, one transaction
+        per root.
+
+        Args:
+            roots: ProjectsRoot instances
+            workers: Root folders listed at once. Defaults to the
+                SCAN_WORKERS setting.
+
+        Returns:
+            dict: scan_projects_root() results keyed by root name
+        """
+        workers = workers or settings.SCAN_WORKERS
+        roots = list(roots)
+        results = {}
+        if workers <= 1 or len(roots) <= 1:
+            for root in roots:
+                results[root.name] = self.scan_projects_root(root)
+            return results
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_list_project_folders, root) for root in roots]
+            for future in futures:
+                folders, error, root = future.result()
+                results[root.name] = self._apply_discovery(root, folders, error)
+        return results
+
+    def _apply_discovery(self, root, folders, error):
+        """
+        Bring the projects of a root in line with the listing of its folder
+
+        New folders are created as projects, projects whose folder is gone
+        are deactivated and projects deactivated that way are reactivated
+        when their folder comes back, all in bulk in one transaction.
+        Projects deactivated by hand stay inactive.
+        """
+        if error is not None:
+            print(f"Error scanning projects root {root.path}: {error}")
             return {
-                "error": "Path does not exist",
+                "error": str(error),
                 "new_projects": 0,
                 "removed_projects": 0,
+                "reactivated_projects": 0,
             }
 
-        # Get existing projects for this root
-        existing_projects = {
-            p.folder_path: p for p in Project.objects.filter(root=root)
-        }
-
-        # Track statistics
-        new_projects = 0
-        removed_projects = 0
+        # One project per folder, preferring active ones if there are copies
+        existing = {}
+        projects = Project.objects.filter(root=root).only(
+            "id", "folder_path", "active", "folder_missing"
+        )
+        for project in projects.order_by("-active", "pk"):
+            existing.setdefault(_folder_key(root, project.folder_path), project)
+
+        created = [
+            Project(
+                name=os.path.basename(folders[key]),
+                root=root,
+                folder_path=folders[key],
+                is_auto_discovered=True,
+            )
+            for key in sorted(folders.keys() - existing.keys())
+        ]
+        removed = [
+            project.pk
+            for key, project in existing.items()
+            if key not in folders and project.active
+        ]
+        reactivated = [
+            project.pk
+            for key, project in existing.items()
+            if key in folders and project.folder_missing and not project.active
+        ]
+        # Reactivated by hand while the folder was gone; already counted
+        found = [
+            project.pk
+            for key, project in existing.items()
+            if key in folders and project.folder_missing and project.active
+        ]
+
+        batch_size = settings.SCAN_BATCH_SIZE
+        with transaction.atomic():
+            Project.objects.bulk_create(created, batch_size=batch_size)
+            for ids, active in [(removed, False), (reactivated, True)]:
+                for start in range(0, len(ids), batch_size):
+                    Project.objects.filter(
+                        pk__in=ids[start : start + batch_size]
+                    ).update(
+                        active=active,
+                        folder_missing=not active,
+                        data_version=new_data_version(),
+                    )
+            for start in range(0, len(found), batch_size):
+                Project.objects.filter(pk__in=found[start : start + batch_size]).update(
+                    folder_missing=False
+                )
+            if created or removed or reactivated:
+                add_to_totals(
+                    root.pk,
+                    projects=len(created),
+                    active_projects=len(created) - len(removed) + len(reactivated),
+                )
 
-        # Scan for subdirectories (potential projects)
-        try:
-            with os.scandir(root.path) as entries:
-                current_projects = {}
-
-                # Find all subdirectories
-                for entry in entries:
-                    if entry.is_dir():
-                        project_path = os.path.abspath(entry.path)
-                        project_name = os.path.basename(project_path)
-                        current_projects[project_path] = project_name
-
-                        # If this is a new project, create it
-                        if project_path not in existing_projects:
-                            Project.objects.create(
-                                name=project_name,
-                                root=root,
-                                folder_path=project_path,
-                                is_auto_discovered=True,
-                            )
-                            new_projects += 1
-
-                # Find projects that no longer exist
-                for path, project in existing_projects.items():
-                    if path not in current_projects:
-                        # Project folder no longer exists
-                        project.active = False
-                        project.save()
-                        removed_projects += 1
-
-            # Update last scan time
             root.last_scan = timezone.now()
-            root.save()
-
-            return {"new_projects": new_projects, "removed_projects": removed_projects}
+            root.save(update_fields=["last_scan"])
 
-        except Exception as e:
-            print(f"Error scanning projects root: {str(e)}")
-            return {"error": str(e), "new_projects": 0, "removed_projects": 0}
+        return {
+            "new_projects": len(created),
+            "removed_projects": len(removed),
+            "reactivated_projects": len(reactivated),
+        }
 
-    def scan_all_projects(self):
+    def scan_all_projects(
+        self, workers=None, incremental=None, progress=None, hash_files=None
+    ):
         """
         Scan all active projects for changes
 
+        Args:
+            workers: Number of project folders walked concurrently.
+                Defaults to the SCAN_WORKERS setting; 1 scans sequentially.
+            incremental: Skip unchanged folders, see FolderMonitor.
+                Defaults to the SCAN_INCREMENTAL setting.
+            progress: Optional progress tracker, see FolderMonitor. Its
+                project_done(project) is called after each project.
+            hash_files: Hash new and changed files after each project's
+                scan. Defaults to the SCAN_HASH_FILES setting.
+
         Returns:
             dict: Summary of changes across all projects
         """
         active_projects = Project.objects.filter(active=True)
+        workers = workers or settings.SCAN_WORKERS
+        projects = list(active_projects)
 
         results = {
-            "total_projects": active_projects.count(),
+            "total_projects": len(projects),
             "scanned_projects": 0,
             "total_files_added": 0,
             "total_files_modified": 0,
             "total_files_deleted": 0,
             "total_size_change": 0,  # Track the overall size change
             "errors": [],
+            "projects": [],  # Per-project wall time
         }
 
-        for project in active_projects:
-            try:
-                monitor = FolderMonitor(project)
-                scan_result = monitor.scan_folder()
+        monitor_options = {
+            "incremental": incremental,
+            "progress": progress,
+            "hash_files": hash_files,
+        }
+        if workers > 1:
+            outcomes = self._scan_parallel(projects, workers, monitor_options)
+        else:
+            outcomes = self._scan_sequential(projects, monitor_options)
+
+        # Aggregate in project order so both modes report identically
+        for project in projects:
+            scan_result, error, wall_time = outcomes[project.pk]
+            results["projects"].append(
+                {"id": project.pk, "project": project.name, "wall_time": wall_time}
+            )
+
+            if error is not None:
+                results["errors"].append({"project": project.name, "error": str(error)})
+                continue
 
-                results["scanned_projects"] += 1
-                results["total_files_added"] += scan_result["files_added"]
-                results["total_files_modified"] += scan_result["files_modified"]
-                results["total_files_deleted"] += scan_result["files_deleted"]
-                results["total_size_change"] += scan_result[
-                    "size_change"
-                ]  # Add size change
+            results["scanned_projects"] += 1
+            results["total_files_added"] += scan_result["files_added"]
+            results["total_files_modified"] += scan_result["files_modified"]
+            results["total_files_deleted"] += scan_result["files_deleted"]
+            results["total_size_change"] += scan_result[
+                "size_change"
+            ]  # Add size change
+
+        # Grand totals of all projects, kept up to date by the scans
+        stats = GlobalStats.load()
+        results["total_size"] = stats.total_size
+        results["total_files"] = stats.total_files
+
+        return results
+
+    def _scan_sequential(self, projects, monitor_options):
+        """
+        Scan projects one after another
 
+        Returns:
+            dict: (result, error, wall time) keyed by project id
+        """
+        outcomes = {}
+        for project in projects:
+            started = time.monotonic()
+            try:
+                monitor = FolderMonitor(project, **monitor_options)
+                result = monitor.scan_folder()
+                outcomes[project.pk] = (result, None, time.monotonic() - started)
             except Exception as e:
-                results["errors"].append({"project": project.name, "error": str(e)})
+                outcomes[project.pk] = (None, e, time.monotonic() - started)
+            if monitor_options["progress"] is not None:
+                monitor_options["progress"].project_done(project)
+        return outcomes
 
-        # Calculate grand totals (these values come from the database after all scans)
-        total_size = (
-            active_projects.aggregate(Sum("total_size"))["total_size__sum"] or 0
-        )
-        total_files = (
-            active_projects.aggregate(Sum("total_files"))["total_files__sum"] or 0
-        )
+    def _scan_parallel(self, projects, workers, monitor_options):
+        """
+        Walk project folders on a thread pool while applying the resulting
+        changes from the calling thread, one transaction per project.
 
-        # Add these to the results
-        results["total_size"] = total_size
-        results["total_files"] = total_files
+        Only the filesystem walks run concurrently; every database read and
+        write happens on the calling thread's connection. At most twice the
+        worker count of walks are in flight so finished walks don't pile up
+        in memory. Projects scanned in low-memory mode read the database
+        while they walk, so they are scanned one by one after the others.
 
-        return results
+        Returns:
+            dict: (result, error, wall time) keyed by project id
+        """
+        outcomes = {}
+        pending = iter(projects)
+        low_memory = []
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+
+            def submit_next():
+                for project in pending:
+                    monitor = FolderMonitor(project, **monitor_options)
+                    if monitor.low_memory:
+                        low_memory.append(project)
+                        continue
+                    previous_directories = (
+                        monitor.load_directories() if monitor.incremental else None
+                    )
+                    future = executor.submit(_timed_walk, monitor, previous_directories)
+                    in_flight[future] = monitor
+                    return
+
+            for _ in range(workers * 2):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    monitor = in_flight.pop(future)
+                    submit_next()
+
+                    walk, error, wall_time = future.result()
+                    started = time.monotonic()
+                    result = None
+                    if error is None:
+                        try:
+                            diff = monitor.collect_changes(*walk)
+                            result = monitor.apply_changes(diff)
+                        except Exception as e:
+                            error = e
+                    wall_time += time.monotonic() - started
+                    outcomes[monitor.project.pk] = (result, error, wall_time)
+                    if monitor.progress is not None:
+                        monitor.progress.project_done(monitor.project)
+
+        outcomes.update(self._scan_sequential(low_memory, monitor_options))
+        return outcomes
+
+
+def _folder_key(root, folder_path):
+    """Comparable form of a project folder, which may be relative to its root"""
+    return os.path.normcase(os.path.abspath(os.path.join(root.path, folder_path)))
+
+
+def _list_project_folders(root):
+    """
+    List the subfolders of a projects root without touching the database,
+    so it can run on a thread pool
+
+    Returns:
+        tuple: ({folder key: absolute path}, error or None, root)
+    """
+    if not os.path.exists(root.path):
+        return None, "Path does not exist", root
+    try:
+        with os.scandir(root.path) as entries:
+            folders = {
+                _folder_key(root, entry.path): os.path.abspath(entry.path)
+                for entry in entries
+                if entry.is_dir()
+            }
+    except OSError as e:
+        return None, e, root
+    return folders, None, root
+
+
+def _measured(phase):
+    """Count a FolderMonitor method's time and queries towards a scan phase"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.measure(phase):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _print_walk_error(error):
+    print(f"Error processing {error.filename}: {error}")
+
+
+def _timed_walk(monitor, previous_directories):
+    """Run a folder walk on a worker thread, capturing errors and duration"""
+    started = time.monotonic()
+    try:
+        walk = monitor.walk_folder(previous_directories)
+        return walk, None, time.monotonic() - started
+    except Exception as e:
+        return None, e, time.monotonic() - started
 
 
 class FolderMonitor:
     """Monitors a specific project folder for file changes"""
 
-    def __init__(self, project):
+    # Folders modified this close to the start of a walk may change again
+    # without their mtime moving, so they are never trusted on a rescan
+    MTIME_GRANULARITY = 2
+
+    def __init__(
+        self,
+        project,
+        batch_size=None,
+        incremental=None,
+        progress=None,
+        hash_files=None,
+        checkpoint_seconds=None,
+        resume=True,
+        low_memory=None,
+    ):
         self.project = project
         self.folder_path = project.folder_path
+        self.batch_size = batch_size or settings.SCAN_BATCH_SIZE
+        if incremental is None:
+            incremental = settings.SCAN_INCREMENTAL
+        self.incremental = incremental
+        if hash_files is None:
+            hash_files = settings.SCAN_HASH_FILES
+        self.hash_files = hash_files
+        # Optional tracker whose folder_walked(project, file_count) is called
+        # after each folder, possibly from a worker thread
+        self.progress = progress
+        if checkpoint_seconds is None:
+            checkpoint_seconds = settings.SCAN_CHECKPOINT_SECONDS
+        self.checkpoint_seconds = checkpoint_seconds  # 0 disables checkpoints
+        self.resume = resume  # Continue an interrupted walk from its checkpoint
+        if low_memory is None:
+            low_memory = project.total_files >= settings.SCAN_LOW_MEMORY_FILES
+        self.low_memory = low_memory  # Use scan_folder_merged()
+
+        # Instrumentation, saved as a ScanRun by apply_changes()
+        self.walk_stats = WalkStats()
+        self.metrics = {
+            "started_at": None,
+            "walk_seconds": 0.0,
+            "diff_seconds": 0.0,
+            "write_seconds": 0.0,
+            "hash_seconds": 0.0,
+            "query_count": 0,
+        }
+        self.scan_run = None
 
     def scan_folder(self):
         """
         Scan the folder and record changes
 
+        With checkpoints enabled, the walk saves its progress as it goes and
+        a scan that was interrupted continues where it stopped. In low-memory
+        mode the scan is done by scan_folder_merged() instead.
+
         Returns:
             dict: Statistics about changes detected
         """
+        if self.low_memory:
+            return self.scan_folder_merged()
+
+        previous_directories = self.load_directories() if self.incremental else None
+        checkpointer = None
+        if self.checkpoint_seconds:
+            checkpointer = ScanCheckpointer(
+                self.project, self.incremental, self.checkpoint_seconds
+            )
+            if not self.resume:
+                checkpointer.discard()
+        current_files, current_directories = self.walk_folder(
+            previous_directories, checkpointer
+        )
+        diff = self.collect_changes(current_files, current_directories)
+        return self.apply_changes(diff)
+
+    def scan_folder_merged(self):
+        """
+        Scan the folder with memory use bounded by its depth, not its size
+
+        The walk visits folders in sorted order and is merge-joined against
+        the stored folders in the same order, whose files are read a run of
+        folders at a time, so neither side is ever held in full. Changes are
+        written in batches as they are found, all in one transaction, so the
+        project still never shows a partial scan; on SQLite that keeps other
+        writers waiting until the scan is done. Only the project's
+        Directory rows, far fewer than its files, are kept in memory. These
+        walks are not checkpointed.
+
+        Returns:
+            dict: Statistics about changes detected
+        """
+        previous_directories = self.load_directories() if self.incremental else None
+        with transaction.atomic():
+            diff = self.merge_changes(previous_directories)
+            result = self.write_changes(diff)
+        return self.finish_scan(result)
+
+    @contextmanager
+    def measure(self, phase):
+        """Add the time and database queries of a block to a scan phase"""
+        if self.metrics["started_at"] is None:
+            self.metrics["started_at"] = timezone.now()
+
+        def count_query(execute, sql, params, many, context):
+            self.metrics["query_count"] += 1
+            return execute(sql, params, many, context)
+
+        started = time.monotonic()
+        try:
+            with connection.execute_wrapper(count_query):
+                yield
+        finally:
+            self.metrics[f"{phase}_seconds"] += time.monotonic() - started
+
+    @_measured("diff")
+    def load_directories(self):
+        """
+        Get the folder state recorded by the previous scan
+
+        Returns:
+            dict: (mtime, entry_count) keyed by folder path
+        """
+        return {
+            path: (mtime, entry_count)
+            for path, mtime, entry_count in self.project.directories.values_list(
+                "path", "mtime", "entry_count"
+            )
+        }
+
+    @_measured("walk")
+    def walk_folder(self, previous_directories=None, checkpointer=None):
+        """
+        Walk the project folder and stat its files.
+
+        Only touches the filesystem, so it is safe to run on a worker thread
+        unless a checkpointer is given.
+
+        Args:
+            previous_directories: Result of load_directories() for an
+                incremental walk. Files in folders whose mtime and entry count
+                are unchanged are not stat'ed; their size and last_modified
+                are returned as None.
+            checkpointer: Optional ScanCheckpointer; the walk then resumes
+                from its checkpoint, if any, and runs in sorted order so it
+                can be resumed itself
+
+        Returns:
+            tuple: (files, directories) where files maps paths relative to the
+                project folder to (filename, size, last_modified) and
+                directories maps folder paths to (mtime, entry_count)
+        """
         if not os.path.exists(self.folder_path):
             raise FileNotFoundError(
                 f"Project folder does not exist: {self.folder_path}"
             )
 
-        # Get previous file records
-        previous_files = {f.path: f for f in self.project.files.all()}
         current_files = {}
+        current_directories = {}
+        walk_started = time.time()
+        tz = timezone.get_current_timezone()
+
+        def stat_files(path, mtime, entry_count):
+            return (
+                previous_directories is None
+                or mtime is None
+                or previous_directories.get(path) != (mtime, entry_count)
+            )
 
-        # Stats for activity log
-        files_added = 0
-        files_modified = 0
-        files_deleted = 0
-        old_total_size = self.project.total_size
-        new_total_size = 0
-
-        # Scan current folder structure
-        for root, _, files in os.walk(self.folder_path):
-            for filename in files:
-                full_path = os.path.join(root, filename)
-                # Get path relative to project folder
-                rel_path = os.path.relpath(full_path, self.folder_path)
-
-                # Get file stats
-                try:
-                    stat_info = os.stat(full_path)
-                    size = stat_info.st_size
-                    last_modified = datetime.datetime.fromtimestamp(
-                        stat_info.st_mtime, tz=timezone.get_current_timezone()
+        def add_files(files):
+            for entry in files:
+                last_modified = None
+                if entry.mtime is not None:
+                    last_modified = datetime.datetime.fromtimestamp(entry.mtime, tz=tz)
+                current_files[entry.path] = (entry.name, entry.size, last_modified)
+
+        resume_after = None
+        if checkpointer is not None:
+            resume_after, walked = checkpointer.resume()
+            for path, mtime, entry_count, files in walked:
+                current_directories[path] = (mtime, entry_count)
+                add_files(
+                    (
+                        FileEntry(os.path.join(path, name), name, size, file_mtime)
+                        if path != "."
+                        else FileEntry(name, name, size, file_mtime)
                     )
+                    for name, size, file_mtime in files
+                )
+            if self.progress is not None and current_files:
+                self.progress.folder_walked(self.project, len(current_files))
+
+        for folder in iter_folders(
+            self.folder_path,
+            ignore=settings.SCAN_IGNORE_PATTERNS,
+            stat_files=stat_files,
+            stats=self.walk_stats,
+            onerror=_print_walk_error,
+            sort=checkpointer is not None,
+            after=resume_after,
+        ):
+            mtime = folder.mtime
+            if mtime is not None and mtime >= walk_started - self.MTIME_GRANULARITY:
+                mtime = None
+            current_directories[folder.path] = (mtime, folder.entry_count)
+            add_files(folder.files)
+
+            if checkpointer is not None:
+                checkpointer.folder_walked(
+                    folder.path, mtime, folder.entry_count, folder.files
+                )
+            if self.progress is not None:
+                self.progress.folder_walked(self.project, len(folder.files))
+
+        if checkpointer is not None:
+            checkpointer.finish()
+
+        return current_files, current_directories
+
+    @_measured("diff")
+    def collect_changes(self, current_files, current_directories):
+        """
+        Compare walked files and folders against the stored records
+
+        Args:
+            current_files: Files returned by walk_folder()
+            current_directories: Folders returned by walk_folder()
 
-                    # Track file
-                    current_files[rel_path] = {
-                        "filename": filename,
-                        "size": size,
-                        "last_modified": last_modified,
-                    }
-
-                    new_total_size += size
-
-                    # Check if file is new or modified
-                    if rel_path not in previous_files:
-                        # New file
-                        FileRecord.objects.create(
-                            project=self.project,
-                            path=rel_path,
-                            filename=filename,
-                            size=size,
-                            last_modified=last_modified,
-                        )
-                        files_added += 1
-                    else:
-                        # Existing file - check if modified
-                        prev_record = previous_files[rel_path]
-                        if (
-                            prev_record.size != size
-                            or prev_record.last_modified != last_modified
-                        ):
-                            # File was modified
-                            prev_record.size = size
-                            prev_record.last_modified = last_modified
-                            prev_record.save()
-                            files_modified += 1
-
-                except Exception as e:
-                    print(f"Error processing file {full_path}: {e}")
+        Returns:
+            FileDiff: Changes to apply, with the new project totals
+        """
+        # Get previous file records
+        previous_files = {f.path: f for f in self.project.files.with_path()}
+
+        # Changes are collected in memory and written in batches at the end
+        diff = FileDiff(self.project, batch_size=self.batch_size)
+
+        for rel_path, (filename, size, last_modified) in current_files.items():
+            prev_record = previous_files.get(rel_path)
+
+            if size is None:
+                # Folder unchanged since the last scan: keep the stored state
+                if prev_record is not None:
+                    diff.total_files += 1
+                    diff.total_size += prev_record.size
+                    continue
+
+                # Not recorded by the last scan (e.g. it could not be read)
+                try:
+                    stat_info = os.stat(os.path.join(self.folder_path, rel_path))
+                except OSError as e:
+                    print(f"Error processing file {rel_path}: {e}")
+                    continue
+                size = stat_info.st_size
+                last_modified = datetime.datetime.fromtimestamp(
+                    stat_info.st_mtime, tz=timezone.get_current_timezone()
+                )
+
+            diff.total_files += 1
+            diff.total_size += size
+
+            # Check if file is new or modified
+            if prev_record is None:
+                diff.add(rel_path, filename, size, last_modified)
+            elif prev_record.size != size or prev_record.last_modified != last_modified:
+                diff.modify(prev_record, size, last_modified)
 
         # Find deleted files
         for path, record in previous_files.items():
             if path not in current_files:
-                record.delete()
-                files_deleted += 1
-
-        # Update project stats
-        self.project.total_files = len(current_files)
-        self.project.total_size = new_total_size
-        self.project.last_scan = timezone.now()
-        self.project.save()
-
-        # Create activity log if there were any changes
-        if files_added > 0 or files_modified > 0 or files_deleted > 0:
-            size_change = new_total_size - old_total_size
-            ActivityLog.objects.create(
-                project=self.project,
-                files_added=files_added,
-                files_modified=files_modified,
-                files_deleted=files_deleted,
-                size_change=size_change,
+                diff.delete(record)
+
+        self.collect_directory_changes(diff, current_directories)
+        return diff
+
+    @_measured("walk")
+    def merge_changes(self, previous_directories=None):
+        """
+        Walk the project folder in sorted order and compare each folder
+        against its stored records as it goes, flushing file changes in
+        batches.
+
+        Must be called inside the transaction that applies the returned
+        diff. Time and queries count towards the walk phase, since walking
+        and comparing are interleaved.
+
+        Args:
+            previous_directories: Result of load_directories() for an
+                incremental walk, see walk_folder()
+
+        Returns:
+            FileDiff: Remaining changes to apply, with the new project totals
+        """
+        if not os.path.exists(self.folder_path):
+            raise FileNotFoundError(
+                f"Project folder does not exist: {self.folder_path}"
+            )
+
+        diff = FileDiff(self.project, batch_size=self.batch_size)
+        walk_started = time.time()
+        tz = timezone.get_current_timezone()
+
+        def stat_files(path, mtime, entry_count):
+            return (
+                previous_directories is None
+                or mtime is None
+                or previous_directories.get(path) != (mtime, entry_count)
+            )
+
+        def stored_record(directory_id, folder, name, stored_file):
+            record_id, size, last_modified = stored_file
+            return FileRecord(
+                pk=record_id,
+                directory_id=directory_id,
+                path=join_path(folder, name),
+                size=size,
+                last_modified=last_modified,
             )
 
+        def delete_folder(directory, stored_files):
+            diff.delete_directory(directory.pk)
+            for name, stored_file in stored_files.items():
+                diff.delete(
+                    stored_record(directory.pk, directory.path, name, stored_file)
+                )
+
+        stored = self.iter_stored_folders(diff.directories)
+        directory, stored_files = next(stored, (None, None))
+
+        for folder in iter_folders(
+            self.folder_path,
+            ignore=settings.SCAN_IGNORE_PATTERNS,
+            stat_files=stat_files,
+            stats=self.walk_stats,
+            onerror=_print_walk_error,
+            sort=True,
+        ):
+            # Stored folders that sort before this one are gone from disk
+            key = folder_sort_key(folder.path)
+            while directory is not None and folder_sort_key(directory.path) < key:
+                delete_folder(directory, stored_files)
+                directory, stored_files = next(stored, (None, None))
+
+            mtime = folder.mtime
+            if mtime is not None and mtime >= walk_started - self.MTIME_GRANULARITY:
+                mtime = None
+
+            previous = {}
+            folder_id = None
+            if directory is not None and directory.path == folder.path:
+                previous = stored_files
+                folder_id = directory.pk
+                if directory.mtime != mtime or directory.entry_count != (
+                    folder.entry_count
+                ):
+                    diff.modify_directory(directory, mtime, folder.entry_count)
+                directory, stored_files = next(stored, (None, None))
+            else:
+                diff.add_directory(folder.path, mtime, folder.entry_count)
+
+            for entry in folder.files:
+                prev_record = previous.pop(entry.name, None)
+                size = entry.size
+                if size is None:
+                    # Folder unchanged since the last scan: keep the stored state
+                    if prev_record is not None:
+                        diff.total_files += 1
+                        diff.total_size += prev_record[1]
+                        continue
+
+                    # Not recorded by the last scan (e.g. it could not be read)
+                    try:
+                        stat_info = os.stat(os.path.join(self.folder_path, entry.path))
+                    except OSError as e:
+                        print(f"Error processing file {entry.path}: {e}")
+                        continue
+                    size = stat_info.st_size
+                    last_modified = datetime.datetime.fromtimestamp(
+                        stat_info.st_mtime, tz=tz
+                    )
+                else:
+                    last_modified = datetime.datetime.fromtimestamp(entry.mtime, tz=tz)
+
+                diff.total_files += 1
+                diff.total_size += size
+
+                if prev_record is None:
+                    diff.add(entry.path, entry.name, size, last_modified)
+                elif prev_record[1] != size or prev_record[2] != last_modified:
+                    diff.modify(
+                        stored_record(folder_id, folder.path, entry.name, prev_record),
+                        size,
+                        last_modified,
+                    )
+
+            # Stored files of the folder that weren't walked
+            for name, stored_file in previous.items():
+                diff.delete(stored_record(folder_id, folder.path, name, stored_file))
+
+            if diff.pending >= self.batch_size:
+                diff.flush()
+            if self.progress is not None:
+                self.progress.folder_walked(self.project, len(folder.files))
+
+        # Stored folders after the last one walked
+        while directory is not None:
+            delete_folder(directory, stored_files)
+            directory, stored_files = next(stored, (None, None))
+
+        return diff
+
+    def iter_stored_folders(self, directories):
+        """
+        Read the stored files of each folder, in the order of a sorted walk
+
+        Files are read for a run of folders at a time, about batch_size
+        files judging by the folders' recorded entry counts.
+
+        Args:
+            directories: Directory instances keyed by folder path
+
+        Yields:
+            tuple: (Directory, dict of (id, size, last_modified) keyed by
+                filename)
+        """
+        ordered = sorted(
+            (d for d in directories.values() if d.pk is not None),
+            key=lambda d: folder_sort_key(d.path),
+        )
+        files = self.project.files.values_list(
+            "directory_id", "filename", "id", "size", "last_modified"
+        )
+
+        start = 0
+        while start < len(ordered):
+            end = start
+            expected = 0
+            while end < len(ordered) and (end == start or expected < self.batch_size):
+                expected += max(ordered[end].entry_count, 1)
+                end += 1
+            run = ordered[start:end]
+
+            by_directory = {d.pk: {} for d in run}
+            for directory_id, filename, record_id, size, last_modified in files.filter(
+                directory_id__in=list(by_directory)
+            ):
+                by_directory[directory_id][filename] = (record_id, size, last_modified)
+            for directory in run:
+                yield directory, by_directory[directory.pk]
+            start = end
+
+    def collect_directory_changes(self, diff, current_directories):
+        """
+        Add the changed folder state to a diff
+
+        Args:
+            diff: FileDiff to add to
+            current_directories: (mtime, entry_count) keyed by folder path
+        """
+        # Refresh the folder state used by the next incremental scan
+        previous_directories = dict(diff.directories)
+        for path, (mtime, entry_count) in current_directories.items():
+            record = previous_directories.pop(path, None)
+            if record is None or record.pk is None:
+                diff.add_directory(path, mtime, entry_count)
+            elif record.mtime != mtime or record.entry_count != entry_count:
+                diff.modify_directory(record, mtime, entry_count)
+        for record in previous_directories.values():
+            if record.pk is not None:
+                diff.delete_directory(record.pk)
+
+    def verify_incremental(self):
+        """
+        Compare what an incremental scan would see against a full walk,
+        without writing anything
+
+        Returns:
+            dict: Sorted paths that are on disk but missing from the
+                incremental walk ("missing"), listed by the incremental walk
+                but gone from disk ("unexpected"), and skipped by the
+                incremental walk although their stored size or modification
+                time is out of date ("stale")
+        """
+        previous_files = {
+            path: (size, last_modified)
+            for path, size, last_modified in self.project.files.with_path().values_list(
+                "path", "size", "last_modified"
+            )
+        }
+        incremental_files, _ = self.walk_folder(self.load_directories())
+        full_files, _ = self.walk_folder()
+
+        stale = [
+            path
+            for path, (_, size, _) in incremental_files.items()
+            if size is None
+            and path in full_files
+            and previous_files.get(path) != full_files[path][1:]
+        ]
+
+        return {
+            "missing": sorted(full_files.keys() - incremental_files.keys()),
+            "unexpected": sorted(incremental_files.keys() - full_files.keys()),
+            "stale": sorted(stale),
+        }
+
+    def apply_changes(self, diff):
+        """
+        Write a FileDiff, the project totals and the activity log in a
+        single transaction, then hash new and changed files if enabled and
+        record the scan's metrics as a ScanRun
+
+        Returns:
+            dict: Statistics about changes detected, plus "hashing" stats
+                when files were hashed
+        """
+        return self.finish_scan(self.write_changes(diff))
+
+    def write_changes(self, diff):
+        """
+        Write a FileDiff, the project totals and the activity log in a
+        single transaction
+
+        Returns:
+            dict: Statistics about changes detected
+        """
+        files_added = diff.files_added
+        files_modified = diff.files_modified
+        files_deleted = diff.files_deleted
+
+        with self.measure("write"), transaction.atomic():
+            # The stored totals, not the ones this instance was loaded with:
+            # the watcher moves them forward in place between scans. The row
+            # lock keeps them from moving until the new totals are saved.
+            stored_files, stored_size = (
+                Project.objects.select_for_update()
+                .filter(pk=self.project.pk)
+                .values_list("total_files", "total_size")
+                .get()
+            )
+            size_change = diff.total_size - stored_size
+
+            diff.apply()
+            DirectoryRollup(self.project, batch_size=self.batch_size).update(
+                diff.changed_directories, diff.directories
+            )
+            # The walk is complete, so it must not be resumed again
+            ScanCheckpoint.objects.filter(project=self.project).delete()
+
+            # Update project stats, and the root and global totals with them
+            files_change = diff.total_files - stored_files
+            self.project.total_files = diff.total_files
+            self.project.total_size = diff.total_size
+            self.project.last_scan = timezone.now()
+            self.project.data_version = new_data_version()
+            self.project.save(update_fields=SCAN_FIELDS)
+            add_to_totals(self.project.root_id, files=files_change, size=size_change)
+
+            # Create activity log if there were any changes
+            if diff.has_changes:
+                ActivityLog.objects.create(
+                    project=self.project,
+                    files_added=files_added,
+                    files_modified=files_modified,
+                    files_deleted=files_deleted,
+                    size_change=size_change,
+                )
+
         return {
             "files_added": files_added,
             "files_modified": files_modified,
             "files_deleted": files_deleted,
-            "size_change": new_total_size - old_total_size,
+            "size_change": size_change,
         }
 
+    def finish_scan(self, result):
+        """
+        Hash new and changed files if enabled and record the scan's metrics,
+        once its changes are committed
+
+        Returns:
+            dict: The result, plus "hashing" stats when files were hashed
+        """
+        # Content hashing reads whole files, so it runs after the metadata
+        # has been committed
+        if self.hash_files:
+            with self.measure("hash"):
+                result["hashing"] = FileHasher(
+                    self.project, batch_size=self.batch_size
+                ).hash_pending()
+
+        self.scan_run = self.record_run(result)
+        return result
+
+    def record_run(self, result):
+        """
+        Save the metrics collected so far with the scan's result
+
+        Returns:
+            ScanRun: The saved run
+        """
+        metrics = self.metrics
+        return ScanRun.objects.create(
+            project=self.project,
+            incremental=self.incremental,
+            started_at=metrics["started_at"] or timezone.now(),
+            finished_at=timezone.now(),
+            folders_visited=self.walk_stats.folders,
+            files_visited=self.walk_stats.files,
+            stat_calls=self.walk_stats.stat_calls,
+            bytes_visited=self.walk_stats.bytes,
+            walk_seconds=metrics["walk_seconds"],
+            diff_seconds=metrics["diff_seconds"],
+            write_seconds=metrics["write_seconds"],
+            hash_seconds=metrics["hash_seconds"],
+            query_count=metrics["query_count"],
+            files_added=result["files_added"],
+            files_modified=result["files_modified"],
+            files_deleted=result["files_deleted"],
+        )
+
     @staticmethod
     def get_project_activity(project, start_date=None, end_date=None):
         """
@@ -0,0 +1,490 @@
+import os
+import stat
+import time
+import errno
+import datetime
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from core.models import (
+    Project,
+    FileRecord,
+    Directory,
+    ActivityLog,
+    new_data_version,
+)
+from core.services.directory_rollup import DirectoryRollup
+from core.services.file_diff import FileDiff
+from core.services.folder_monitor import FolderMonitor, _print_walk_error
+from core.services.stats_counters import add_to_totals
+from utils.file_walker import iter_folders, is_ignored
+from utils.inotify import (
+    Inotify,
+    IN_ATTRIB,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DONT_FOLLOW,
+    IN_IGNORED,
+    IN_MODIFY,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+)
+
+
+class ProjectWatcher:
+    """
+    Keeps the FileRecords of active projects up to date from inotify events
+
+    Every folder of every active project is watched. Events only mark paths
+    as dirty; once a path has been quiet for the debounce time its current
+    state is read from disk and compared with the stored records, so bursts
+    (a file written in many chunks, a folder copied in) are written once.
+    Changes are counted per project and written as ActivityLog rows every
+    flush interval.
+
+    Projects whose folders can't all be watched (watch limit reached, or no
+    inotify at all) fall back to an incremental scan every
+    SCAN_INTERVAL_MINUTES. Watched projects get a full reconciliation scan
+    at start-up, after an event queue overflow and every
+    WATCH_RECONCILE_MINUTES.
+    """
+
+    WATCH_MASK = (
+        IN_CREATE
+        | IN_DELETE
+        | IN_MODIFY
+        | IN_CLOSE_WRITE
+        | IN_ATTRIB
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_ONLYDIR
+        | IN_DONT_FOLLOW
+    )
+
+    def __init__(
+        self,
+        debounce=None,
+        flush_interval=None,
+        reconcile_minutes=None,
+        poll_minutes=None,
+        batch_size=None,
+    ):
+        self.debounce = (
+            settings.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        )
+        self.flush_interval = (
+            settings.WATCH_FLUSH_SECONDS if flush_interval is None else flush_interval
+        )
+        self.reconcile_interval = 60 * (
+            settings.WATCH_RECONCILE_MINUTES
+            if reconcile_minutes is None
+            else reconcile_minutes
+        )
+        self.poll_interval = 60 * (
+            settings.SCAN_INTERVAL_MINUTES if poll_minutes is None else poll_minutes
+        )
+        self.batch_size = batch_size or settings.SCAN_BATCH_SIZE
+        self.ignore = settings.SCAN_IGNORE_PATTERNS
+
+        self.projects = {}  # Active projects by id
+        self.watches = {}  # wd -> (project id, folder path)
+        self.project_watches = defaultdict(dict)  # project id -> {folder: wd}
+        self.polled = set()  # Ids of projects scanned on an interval instead
+        self.pending = defaultdict(dict)  # project id -> {path: last event}
+        self.rescan = set()  # Ids of projects needing a reconciliation scan
+        # project id -> [files added, modified, deleted, size change]
+        self.activity = defaultdict(lambda: [0, 0, 0, 0])
+
+        self.inotify = None
+        self._next_flush = self._next_poll = self._next_reconcile = 0
+
+    def start(self):
+        """Watch every active project and reconcile it with the database"""
+        try:
+            self.inotify = Inotify()
+        except OSError as e:
+            print(f"inotify unavailable, polling all projects: {e}")
+
+        now = time.monotonic()
+        self.refresh_projects()  # Queues a reconciliation of watched projects
+        self._next_flush = now + self.flush_interval
+        self._next_reconcile = now + self.reconcile_interval
+
+    def step(self, timeout=None):
+        """
+        Wait for events once, then do whatever work is due
+
+        Args:
+            timeout: Longest wait for events; by default until the next
+                pending path or periodic task is due
+        """
+        now = time.monotonic()
+        if timeout is None:
+            timeout = min(self._next_flush, self._next_poll) - now
+            if self.pending:
+                timeout = min(timeout, self.debounce)
+            timeout = max(timeout, 0)
+
+        if self.inotify is not None:
+            events = self.inotify.read_events(timeout)
+        else:
+            events = []
+            time.sleep(timeout)
+
+        now = time.monotonic()
+        for event in events:
+            self._handle_event(event, now)
+
+        self.sync_pending(now - self.debounce)
+
+        if self.rescan:
+            self.reconcile(self.rescan)
+
+        if now >= self._next_flush:
+            self.flush_activity()
+            self._next_flush = now + self.flush_interval
+
+        if now >= self._next_reconcile:
+            self.reconcile(self.projects.keys() - self.polled)
+            self._next_reconcile = now + self.reconcile_interval
+
+        if now >= self._next_poll:
+            # Also picks up projects discovered or deactivated meanwhile
+            self.refresh_projects()
+            self.poll()
+            self._next_poll = now + self.poll_interval
+
+    def close(self):
+        """Write outstanding changes and stop watching"""
+        self.sync_pending(time.monotonic())
+        self.flush_activity()
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+    def refresh_projects(self):
+        """Watch new active projects and stop watching inactive ones"""
+        active = {p.pk: p for p in Project.objects.filter(active=True)}
+
+        for project_id in self.projects.keys() - active.keys():
+            self._unwatch(project_id, ".")
+            del self.projects[project_id]
+            self.polled.discard(project_id)
+            self.pending.pop(project_id, None)
+            self.rescan.discard(project_id)
+
+        for project_id, project in active.items():
+            if project_id in self.projects:
+                self.projects[project_id] = project
+                continue
+            self.projects[project_id] = project
+            if self.inotify is None or not self._watch_tree(project, "."):
+                self.polled.add(project_id)
+            else:
+                self.rescan.add(project_id)
+
+    def poll(self):
+        """Scan the projects that aren't watched"""
+        for project_id in sorted(self.polled):
+            self._scan(self.projects[project_id], incremental=True)
+
+    def reconcile(self, project_ids):
+        """Rescan projects in full, e.g. after events were lost"""
+        for project_id in sorted(project_ids):
+            self.rescan.discard(project_id)
+            project = self.projects.get(project_id)
+            if project is not None:
+                # Events already queued are covered by the scan
+                self.pending.pop(project_id, None)
+                self._scan(project, incremental=False)
+
+    def sync_pending(self, quiet_since):
+        """
+        Record the current state of dirty paths that have been quiet since
+        the given monotonic time
+        """
+        for project_id in list(self.pending):
+            paths = self.pending[project_id]
+            ready = [path for path, seen in paths.items() if seen <= quiet_since]
+            if not ready:
+                continue
+            for path in ready:
+                del paths[path]
+            if not paths:
+                del self.pending[project_id]
+            self.sync_paths(self.projects[project_id], ready)
+
+    def sync_paths(self, project, paths):
+        """
+        Bring the records of some paths of a project in line with the disk
+
+        A path may be a file, a folder (everything under it is synced) or no
+        longer exist (its record and everything under it are deleted).
+
+        Returns:
+            dict: Files added, modified and deleted and the size change
+        """
+        current_files = {}
+        exact_paths = set()
+        prefixes = set()
+        gone_folders = []
+        tz = timezone.get_current_timezone()
+
+        for path in paths:
+            full_path = os.path.join(project.folder_path, path)
+            try:
+                stat_info = os.stat(full_path)
+            except OSError:
+                # Gone: a file, or a folder with everything under it
+                exact_paths.add(path)
+                prefixes.add(path)
+                gone_folders.append(path)
+                self._unwatch(project.pk, path)
+                continue
+
+            if not stat.S_ISDIR(stat_info.st_mode):
+                exact_paths.add(path)
+                current_files[path] = (
+                    os.path.basename(path),
+                    stat_info.st_size,
+                    datetime.datetime.fromtimestamp(stat_info.st_mtime, tz=tz),
+                )
+                continue
+
+            if os.path.islink(full_path):
+                continue  # Symlinked folders aren't followed, like scans
+
+            # A folder created or moved in: watch and read all of it
+            prefixes.add(path)
+            if self.inotify is not None and project.pk not in self.polled:
+                if not self._watch_tree(project, path):
+                    self.polled.add(project.pk)
+            for folder in iter_folders(
+                full_path, ignore=self.ignore, onerror=_print_walk_error
+            ):
+                for entry in folder.files:
+                    current_files[os.path.join(path, entry.path)] = (
+                        entry.name,
+                        entry.size,
+                        datetime.datetime.fromtimestamp(entry.mtime, tz=tz),
+                    )
+
+        diff = FileDiff(project, batch_size=self.batch_size)
+        size_change = 0
+        for record in self._stored_records(project, exact_paths, prefixes):
+            current = current_files.pop(record.path, None)
+            if current is None:
+                diff.delete(record)
+                size_change -= record.size
+                continue
+            _, size, last_modified = current
+            if record.size != size or record.last_modified != last_modified:
+                size_change += size - record.size
+                diff.modify(record, size, last_modified)
+
+        for path, (filename, size, last_modified) in current_files.items():
+            diff.add(path, filename, size, last_modified)
+            size_change += size
+
+        # Folders created here get stored as files are added to them
+        for path in gone_folders:
+            for directory_id in (
+                Directory.objects.filter(project=project)
+                .subtree(path)
+                .values_list("id", flat=True)
+            ):
+                diff.delete_directory(directory_id)
+
+        stats = {
+            "files_added": diff.files_added,
+            "files_modified": diff.files_modified,
+            "files_deleted": diff.files_deleted,
+            "size_change": size_change,
+        }
+        if not diff.has_changes and not diff.deleted_directories:
+            return stats
+
+        with transaction.atomic():
+            diff.apply()
+            DirectoryRollup(project, batch_size=self.batch_size).update(
+                diff.changed_directories, diff.directories
+            )
+            Project.objects.filter(pk=project.pk).update(
+                total_files=F("total_files")
+                + stats["files_added"]
+                - stats["files_deleted"],
+                total_size=F("total_size") + size_change,
+                data_version=new_data_version(),
+            )
+            add_to_totals(
+                project.root_id,
+                files=stats["files_added"] - stats["files_deleted"],
+                size=size_change,
+            )
+
+        activity = self.activity[project.pk]
+        for i, key in enumerate(stats):
+            activity[i] += stats[key]
+        return stats
+
+    def flush_activity(self):
+        """Write the changes counted since the last flush as activity logs"""
+        logs = [
+            ActivityLog(
+                project_id=project_id,
+                files_added=added,
+                files_modified=modified,
+                files_deleted=deleted,
+                size_change=size_change,
+            )
+            for project_id, (added, modified, deleted, size_change) in sorted(
+                self.activity.items()
+            )
+            if added or modified or deleted
+        ]
+        self.activity.clear()
+        if logs:
+            with transaction.atomic():
+                ActivityLog.objects.bulk_create(logs)
+                Project.objects.filter(pk__in=[log.project_id for log in logs]).update(
+                    data_version=new_data_version()
+                )
+
+    def _handle_event(self, event, now):
+        if event.mask & IN_Q_OVERFLOW:
+            # Events were dropped; only a rescan can tell what changed
+            print("inotify queue overflowed, rescanning watched projects")
+            self.rescan.update(self.projects.keys() - self.polled)
+            return
+
+        watch = self.watches.get(event.wd)
+        if watch is None:
+            return
+        project_id, folder = watch
+
+        if event.mask & IN_IGNORED:
+            # The folder is gone; its parent reports the deletion
+            self._forget_watch(event.wd)
+            if folder == ".":
+                self.polled.add(project_id)
+            return
+
+        if not event.name or is_ignored(event.name, ignore=self.ignore):
+            return
+
+        path = event.name if folder == "." else os.path.join(folder, event.name)
+        self.pending[project_id][path] = now
+
+    def _watch_tree(self, project, path):
+        """
+        Watch a folder of a project and every folder under it
+
+        Returns:
+            bool: False if the watch limit was reached, in which case the
+                project's watches are removed so it can be polled instead
+        """
+        root = os.path.join(project.folder_path, path) if path != "." else None
+        try:
+            for folder in iter_folders(
+                root or project.folder_path,
+                ignore=self.ignore,
+                stat_files=False,
+                onerror=_print_walk_error,
+            ):
+                if root is None:
+                    rel_folder = folder.path
+                elif folder.path == ".":
+                    rel_folder = path
+                else:
+                    rel_folder = os.path.join(path, folder.path)
+                full_path = os.path.join(project.folder_path, rel_folder)
+                wd = self.inotify.add_watch(full_path, self.WATCH_MASK)
+                self.watches[wd] = (project.pk, rel_folder)
+                self.project_watches[project.pk][rel_folder] = wd
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                # Vanished while being walked; its parent reports that
+                print(f"Error watching {project.folder_path}: {e}")
+                return True
+            print(
+                f"inotify watch limit reached, polling {project.name} instead "
+                "(raise fs.inotify.max_user_watches to watch it)"
+            )
+            self._unwatch(project.pk, ".")
+            return False
+        return True
+
+    def _unwatch(self, project_id, path):
+        """Stop watching a folder of a project and every folder under it"""
+        folders = self.project_watches.get(project_id)
+        if not folders:
+            return
+        if path == ".":
+            matching = list(folders)
+        else:
+            prefix = os.path.join(path, "")
+            matching = [f for f in folders if f == path or f.startswith(prefix)]
+        for folder in matching:
+            wd = folders.pop(folder)
+            if self.watches.get(wd) != (project_id, folder):
+                continue  # The folder was moved and is watched under its new path
+            del self.watches[wd]
+            try:
+                self.inotify.remove_watch(wd)
+            except OSError:
+                pass
+
+    def _forget_watch(self, wd):
+        watch = self.watches.pop(wd, None)
+        if watch is not None:
+            project_id, folder = watch
+            folders = self.project_watches[project_id]
+            if folders.get(folder) == wd:
+                del folders[folder]
+
+    def _stored_records(self, project, exact_paths, prefixes):
+        """Records at the given paths or under the given folders"""
+        records = FileRecord.objects.filter(project=project).with_path()
+        querysets = []
+        by_folder = defaultdict(list)
+        for path in exact_paths:
+            folder, filename = os.path.split(path)
+            by_folder[folder or "."].append(filename)
+        folders = sorted(by_folder)
+        for start in range(0, len(folders), 100):
+            query = Q()
+            for folder in folders[start : start + 100]:
+                query |= Q(directory__path=folder, filename__in=by_folder[folder])
+            querysets.append(records.filter(query))
+
+        folders = Directory.objects.filter(project=project)
+        for prefix in sorted(prefixes):
+            querysets.append(
+                records.filter(directory__in=folders.subtree(prefix).values("id"))
+            )
+
+        # Nested folders and files inside them overlap
+        seen = set()
+        for queryset in querysets:
+            for record in queryset:
+                if record.pk not in seen:
+                    seen.add(record.pk)
+                    yield record
+
+    def _scan(self, project, incremental):
+        try:
+            result = FolderMonitor(project, incremental=incremental).scan_folder()
+        except Exception as e:
+            print(f"Error scanning project {project.name}: {e}")
+            return
+        if any(result[k] for k in ("files_added", "files_modified", "files_deleted")):
+            print(
+                f"Scanned {project.name}: {result['files_added']} added, "
+                f"{result['files_modified']} modified, "
+                f"{result['files_deleted']} deleted"
+            )
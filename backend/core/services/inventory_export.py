@@ -0,0 +1,160 @@
+import csv
+import io
+import zlib
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from core.models import FileRecord, join_path
+
+COLUMNS = ["project_id", "project", "path", "size", "last_modified", "file_hash"]
+FORMATS = ["csv", "ndjson", "parquet"]
+STREAMED_FORMATS = ["csv", "ndjson"]  # Parquet needs the whole file written
+
+
+class InventoryExport:
+    """
+    Writes the file inventory of some projects as CSV, NDJSON or Parquet
+
+    Files are read in primary key order with iterator(), which uses a
+    server-side cursor on PostgreSQL, and encoded a chunk at a time, so
+    memory use depends on the chunk size, not on the number of files.
+    Paths are joined from the folder paths in Python rather than in the
+    query. CSV and NDJSON are gzip'd as they are produced; Parquet needs
+    pyarrow and is compressed by its own writer.
+    """
+
+    def __init__(self, projects, chunk_size=None):
+        """
+        Args:
+            projects: Project queryset whose files are exported
+            chunk_size: Rows fetched and encoded at a time, defaults to the
+                EXPORT_CHUNK_SIZE setting
+        """
+        self.projects = projects
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        self.rows = 0
+
+    def chunks(self):
+        """
+        Yield the files as lists of tuples, in COLUMNS order
+        """
+        files = (
+            FileRecord.objects.filter(project__in=self.projects)
+            .order_by("pk")
+            .values_list(
+                "project_id",
+                "project__name",
+                "directory__path",
+                "filename",
+                "size",
+                "last_modified",
+                "file_hash",
+            )
+        )
+        chunk = []
+        for project_id, name, folder, filename, *rest in files.iterator(
+            chunk_size=self.chunk_size
+        ):
+            chunk.append((project_id, name, join_path(folder, filename), *rest))
+            if len(chunk) == self.chunk_size:
+                self.rows += len(chunk)
+                yield chunk
+                chunk = []
+        if chunk:
+            self.rows += len(chunk)
+            yield chunk
+
+    def stream(self, format, compress=True):
+        """
+        Yield the export as bytes, one piece per chunk of files
+
+        Args:
+            format: "csv" or "ndjson"
+            compress: Whether to gzip the output
+
+        Yields:
+            bytes: The next piece of the file
+        """
+        if format not in STREAMED_FORMATS:
+            raise ValueError(f"Can't stream {format}; use one of {STREAMED_FORMATS}")
+
+        # wbits=31 writes a gzip header, so the output is a .gz file
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        encode = self._encode_csv if format == "csv" else self._encode_ndjson
+        for text in encode():
+            data = text.encode()
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+
+    def write(self, path, format, compress=True):
+        """
+        Write the export to a file
+
+        Args:
+            path: File to write
+            format: One of FORMATS
+            compress: Whether to gzip CSV and NDJSON
+
+        Returns:
+            int: Number of files exported
+        """
+        if format == "parquet":
+            self._write_parquet(path)
+        else:
+            with open(path, "wb") as f:
+                for data in self.stream(format, compress=compress):
+                    f.write(data)
+        return self.rows
+
+    def _encode_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        for chunk in self.chunks():
+            writer.writerows(
+                row[:4] + (row[4].isoformat(), row[5] or "") for row in chunk
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()  # Only the header if there were no files
+
+    def _encode_ndjson(self):
+        encoder = DjangoJSONEncoder()
+        for chunk in self.chunks():
+            yield "".join(
+                encoder.encode(dict(zip(COLUMNS, row))) + "\n" for row in chunk
+            )
+
+    def _write_parquet(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet exports need pyarrow (pip install pyarrow)")
+
+        schema = pa.schema(
+            [
+                ("project_id", pa.int64()),
+                ("project", pa.string()),
+                ("path", pa.string()),
+                ("size", pa.int64()),
+                ("last_modified", pa.timestamp("us", tz="UTC")),
+                ("file_hash", pa.string()),
+            ]
+        )
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for chunk in self.chunks():
+                columns = zip(*chunk)
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [
+                            pa.array(values, type=field.type)
+                            for values, field in zip(columns, schema)
+                        ],
+                        schema=schema,
+                    )
+                )
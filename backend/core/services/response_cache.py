@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from core.models import Project, GlobalStats, new_data_version
+
+COUNTERS = ["hits", "misses", "not_modified"]
+KEY_PREFIX = "response"
+
+
+def global_version(view, **kwargs):
+    """Version of responses showing any project, such as the project list"""
+    return (
+        GlobalStats.objects.filter(pk=1).values_list("data_version", flat=True).first()
+    )
+
+
+def project_version(view, pk=None, **kwargs):
+    """Version of responses showing one project, None if it doesn't exist"""
+    return Project.objects.filter(pk=pk).values_list("data_version", flat=True).first()
+
+
+def project_range_version(view, **kwargs):
+    """
+    Version of responses showing one project over a date range, None for
+    ranges ending now (the days parameter, or no end date), which move
+    without the data changing
+    """
+    params = view.request.query_params
+    if params.get("days") or not (params.get("start_date") and params.get("end_date")):
+        return None
+    return project_version(view, **kwargs)
+
+
+def touch_projects(project_ids):
+    """
+    Give projects a new data version after changes to data their responses
+    show that scans don't write, such as their tasks
+
+    Args:
+        project_ids: Ids of the projects, in one query however many
+    """
+    Project.objects.filter(pk__in=project_ids).update(data_version=new_data_version())
+
+
+def cache_response(get_version):
+    """
+    Cache the data of a read-only API view under a versioned key
+
+    The key is made from the request path, query string and the version of
+    the data the view shows. Scans and other writes replace the version
+    (Project.data_version or GlobalStats.data_version), so the next request
+    misses and renders the view again; stale entries are never read and
+    expire after RESPONSE_CACHE_TIMEOUT seconds. Reading the version is a
+    single-row query.
+
+    Responses carry an ETag and Last-Modified, so clients that send
+    If-None-Match or If-Modified-Since get a 304 when nothing changed.
+
+    Args:
+        get_version: Called with the view and the URL keyword arguments;
+            returns the version, or None to run the view uncached
+    """
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            version = get_version(self, **kwargs) if timeout else None
+            if version is None:
+                return view_method(self, request, *args, **kwargs)
+
+            path = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+            key = f"{KEY_PREFIX}:{path}:{version}"
+            etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+            entry = cache.get(key)  # (data, time rendered)
+
+            not_modified = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(entry[1]) if entry else None,
+            )
+            if not_modified is not None:
+                if not_modified.status_code == 304:
+                    _count("not_modified")
+                response = Response(status=not_modified.status_code)
+            elif entry is not None:
+                _count("hits")
+                response = Response(entry[0])
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                entry = (response.data, time.time())
+                cache.set(key, entry, timeout)
+                _count("misses")
+
+            response["ETag"] = etag
+            if entry is not None:
+                response["Last-Modified"] = http_date(entry[1])
+            # Browsers keep the response but check it's current before use
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _count(counter):
+    key = f"{KEY_PREFIX}-counter:{counter}"
+    try:
+        cache.incr(key)
+    except ValueError:  # Not set yet, or evicted
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cache_counters():
+    """
+    Hits, misses and 304 responses counted by the cache, since it was last
+    cleared; with the local-memory cache they are per process
+
+    Returns:
+        dict: The counters and the share of requests answered from the cache
+    """
+    keys = {f"{KEY_PREFIX}-counter:{counter}": counter for counter in COUNTERS}
+    values = cache.get_many(keys)
+    counters = {counter: values.get(key, 0) for key, counter in keys.items()}
+    requests = sum(counters.values())
+    counters["hit_rate"] = (
+        (counters["hits"] + counters["not_modified"]) / requests if requests else None
+    )
+    return counters
@@ -0,0 +1,129 @@
+import time
+from datetime import timedelta
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from core.models import ScanCheckpoint, ScanCheckpointChunk
+
+
+class ScanCheckpointer:
+    """
+    Saves the progress of a sorted project walk so it can be resumed
+
+    Walked folders are buffered and written as one ScanCheckpointChunk at
+    most every interval seconds, together with the last folder walked. A
+    walk that is interrupted can then restore those folders and continue
+    after the last one instead of starting over. Folders restored from a
+    checkpoint reflect the disk at the time they were walked, so checkpoints
+    older than MAX_AGE are discarded rather than resumed.
+
+    The checkpoint is deleted by FolderMonitor.apply_changes() in the same
+    transaction that writes the scan's results.
+    """
+
+    MAX_AGE = timedelta(hours=24)
+
+    def __init__(self, project, incremental, interval):
+        self.project = project
+        self.incremental = incremental
+        self.interval = interval
+        self.checkpoint = None
+        self.buffer = []
+        self.last_folder = None
+        self.folders_done = 0
+        self.files_seen = 0
+        self.bytes_seen = 0
+        self._last_save = time.monotonic()
+
+    def resume(self):
+        """
+        Load the checkpoint left by an interrupted walk
+
+        Returns:
+            tuple: (last folder walked, iterator over the walked folders as
+                [path, mtime, entry_count, [[name, size, mtime], ...]]), or
+                (None, []) when there is nothing to resume
+        """
+        checkpoint = ScanCheckpoint.objects.filter(project=self.project).first()
+        if checkpoint is None:
+            return None, []
+
+        if (
+            checkpoint.incremental != self.incremental
+            or checkpoint.updated_at < timezone.now() - self.MAX_AGE
+        ):
+            checkpoint.delete()
+            return None, []
+
+        self.checkpoint = checkpoint
+        self.last_folder = checkpoint.last_folder
+        self.folders_done = checkpoint.folders_done
+        self.files_seen = checkpoint.files_seen
+        self.bytes_seen = checkpoint.bytes_seen
+
+        chunks = (
+            checkpoint.chunks.order_by("id")
+            .values_list("folders", flat=True)
+            .iterator(chunk_size=10)
+        )
+        return checkpoint.last_folder, (folder for chunk in chunks for folder in chunk)
+
+    def discard(self):
+        """Delete any checkpoint of the project, to start the next walk over"""
+        ScanCheckpoint.objects.filter(project=self.project).delete()
+        self.checkpoint = None
+
+    def folder_walked(self, path, mtime, entry_count, files):
+        """
+        Buffer a walked folder, saving a checkpoint when one is due
+
+        Args:
+            path: Folder path relative to the project folder
+            mtime: Folder mtime as stored for the next incremental scan
+            entry_count: Entries listed in the folder
+            files: FileEntry tuples of the folder
+        """
+        self.buffer.append(
+            [path, mtime, entry_count, [[f.name, f.size, f.mtime] for f in files]]
+        )
+        self.last_folder = path
+        self.folders_done += 1
+        self.files_seen += len(files)
+        self.bytes_seen += sum(f.size for f in files if f.size is not None)
+
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def finish(self):
+        """
+        Save the rest of a completed walk if a checkpoint was already
+        written, so a failure while applying it doesn't repeat the walk
+        """
+        if self.checkpoint is not None:
+            self.save()
+
+    def save(self):
+        """Write buffered folders; failures are retried at the next save"""
+        if not self.buffer:
+            return
+
+        checkpoint = self.checkpoint or ScanCheckpoint(
+            project=self.project, incremental=self.incremental
+        )
+        checkpoint.last_folder = self.last_folder
+        checkpoint.folders_done = self.folders_done
+        checkpoint.files_seen = self.files_seen
+        checkpoint.bytes_seen = self.bytes_seen
+        try:
+            with transaction.atomic():
+                checkpoint.save()
+                ScanCheckpointChunk.objects.create(
+                    checkpoint=checkpoint, folders=self.buffer
+                )
+        except DatabaseError as e:
+            # The walk itself is unaffected; only resuming it would be
+            print(f"Could not save scan checkpoint of {self.project.name}: {e}")
+            return
+
+        self.checkpoint = checkpoint
+        self.buffer = []
+        self._last_save = time.monotonic()
@@ -0,0 +1,227 @@
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from core.models import ProjectsRoot, Project, ScanJob, ScanJobKind, ScanJobStatus
+from core.services.folder_monitor import ProjectsMonitor, FolderMonitor
+
+
+def enqueue_scan(kind, project=None, root=None, full=False):
+    """
+    Queue a scan, unless the same scan is already queued or running
+
+    Args:
+        kind: A ScanJobKind
+        project: Project to scan for PROJECT jobs
+        root: ProjectsRoot to discover for ROOT jobs
+        full: Stat every file even when incremental scans are enabled
+
+    Returns:
+        tuple: (ScanJob, created)
+    """
+    if kind == ScanJobKind.PROJECT:
+        key = f"project:{project.pk}"
+    elif kind == ScanJobKind.ROOT:
+        key = f"root:{root.pk}"
+    else:
+        key = "all"
+
+    # Creation can race with another request for the same scan, and the
+    # active job can finish between the lookup and the insert
+    for _ in range(3):
+        job = ScanJob.objects.filter(
+            key=key, status__in=ScanJob.ACTIVE_STATUSES
+        ).first()
+
+        if job is None:
+            try:
+                with transaction.atomic():
+                    job = ScanJob.objects.create(
+                        kind=kind,
+                        project=project,
+                        root=root,
+                        key=key,
+                        options={"full": full},
+                    )
+                return job, True
+            except IntegrityError:
+                continue
+
+        ScanJob.objects.filter(pk=job.pk).update(requests=F("requests") + 1)
+        if full and job.status == ScanJobStatus.QUEUED:
+            ScanJob.objects.filter(pk=job.pk, status=ScanJobStatus.QUEUED).update(
+                options={**job.options, "full": True}
+            )
+        job.refresh_from_db()
+        return job, False
+
+    raise RuntimeError(f"Could not queue scan {key}")
+
+
+def claim_next_job():
+    """
+    Mark the oldest queued job as running
+
+    Running jobs whose worker stopped sending heartbeats are queued again
+    first, so a crashed worker doesn't block its scans forever.
+
+    Returns:
+        ScanJob: The claimed job, or None if the queue is empty
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(minutes=settings.SCAN_JOB_STALE_MINUTES)
+    ScanJob.objects.filter(
+        status=ScanJobStatus.RUNNING, updated_at__lt=stale_before
+    ).update(status=ScanJobStatus.QUEUED, started_at=None, updated_at=now)
+
+    candidates = ScanJob.objects.filter(status=ScanJobStatus.QUEUED).order_by(
+        "created_at"
+    )
+    for job in candidates[:10]:
+        # Only one worker can move a job out of QUEUED
+        claimed = ScanJob.objects.filter(pk=job.pk, status=ScanJobStatus.QUEUED).update(
+            status=ScanJobStatus.RUNNING, started_at=now, updated_at=now
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+class ScanProgress:
+    """Progress counters shared by the folder walks of a running job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files_seen = 0
+        self.current_project = ""
+        self.projects_done = 0
+
+    def folder_walked(self, project, file_count):
+        with self._lock:
+            self.files_seen += file_count
+            self.current_project = project.name
+
+    def project_done(self, project):
+        with self._lock:
+            self.projects_done += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "files_seen": self.files_seen,
+                "current_project": self.current_project[:255],
+                "projects_done": self.projects_done,
+            }
+
+
+class ScanJobRunner:
+    """Runs a claimed ScanJob and records its progress and outcome"""
+
+    HEARTBEAT_SECONDS = 2
+
+    def __init__(self, job):
+        self.job = job
+        self.progress = ScanProgress()
+        self._stopped = threading.Event()
+
+    def run(self):
+        """
+        Run the job to completion
+
+        Returns:
+            ScanJob: The finished job
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+
+        try:
+            self.job.result = self._execute()
+            self.job.status = ScanJobStatus.COMPLETED
+        except Exception as e:
+            self.job.status = ScanJobStatus.FAILED
+            self.job.error = str(e)
+        finally:
+            self._stopped.set()
+            heartbeat.join()
+
+        for field, value in self.progress.snapshot().items():
+            setattr(self.job, field, value)
+        self.job.finished_at = timezone.now()
+        # Leave out "requests", which API calls may bump while the job runs
+        self.job.save(
+            update_fields=[
+                "status",
+                "result",
+                "error",
+                "files_seen",
+                "current_project",
+                "projects_done",
+                "finished_at",
+                "updated_at",
+            ]
+        )
+        return self.job
+
+    def _execute(self):
+        job = self.job
+        monitor = ProjectsMonitor()
+
+        if job.kind == ScanJobKind.PROJECT:
+            self._set_expected(job.project.total_files, 1)
+            folder_monitor = FolderMonitor(
+                job.project,
+                incremental=False if job.options.get("full") else None,
+                progress=self.progress,
+            )
+            result = folder_monitor.scan_folder()
+            self.progress.project_done(job.project)
+            return result
+
+        if job.kind == ScanJobKind.ROOT:
+            return monitor.scan_projects_root(job.root)
+
+        # First discover projects
+        discovery_results = monitor.scan_projects_roots(
+            ProjectsRoot.objects.all(), workers=settings.SCAN_WORKERS
+        )
+
+        active_projects = Project.objects.filter(active=True)
+        self._set_expected(
+            active_projects.aggregate(Sum("total_files"))["total_files__sum"] or 0,
+            active_projects.count(),
+        )
+
+        # Then scan files
+        scan_results = monitor.scan_all_projects(
+            workers=settings.SCAN_WORKERS,
+            incremental=False if job.options.get("full") else None,
+            progress=self.progress,
+        )
+        return {"discovery": discovery_results, "scan": scan_results}
+
+    def _set_expected(self, files_expected, projects_total):
+        self.job.files_expected = files_expected
+        self.job.projects_total = projects_total
+        ScanJob.objects.filter(pk=self.job.pk).update(
+            files_expected=files_expected,
+            projects_total=projects_total,
+            updated_at=timezone.now(),
+        )
+
+    def _heartbeat(self):
+        """Write progress periodically so the API and stale checks see it"""
+        try:
+            while not self._stopped.wait(self.HEARTBEAT_SECONDS):
+                try:
+                    ScanJob.objects.filter(pk=self.job.pk).update(
+                        updated_at=timezone.now(), **self.progress.snapshot()
+                    )
+                except DatabaseError:
+                    # The scan's own write transaction may hold the lock
+                    pass
+        finally:
+            connection.close()
@@ -0,0 +1,63 @@
+import cProfile
+from contextlib import contextmanager
+
+
+def format_scan_run(run):
+    """
+    Describe a ScanRun on one line for the management commands
+
+    Args:
+        run: ScanRun instance
+
+    Returns:
+        str: Phase timings, counters and throughput
+    """
+    files_per_second = run.files_per_second or 0
+    megabytes_per_second = (run.bytes_per_second or 0) / 1024**2
+    return (
+        f"{run.project.name}: {run.duration_seconds:.2f}s "
+        f"(walk {run.walk_seconds:.2f}s, diff {run.diff_seconds:.2f}s, "
+        f"write {run.write_seconds:.2f}s, hash {run.hash_seconds:.2f}s), "
+        f"{run.folders_visited} folders, {run.files_visited} files, "
+        f"{run.stat_calls} stat calls, {run.query_count} queries, "
+        f"{files_per_second:.0f} files/s, {megabytes_per_second:.1f} MB/s"
+    )
+
+
+@contextmanager
+def profile_to(path):
+    """
+    Profile the enclosed block and write the profile to a file
+
+    Paths ending in .html are written by pyinstrument, which must be
+    installed; anything else gets cProfile stats that can be read with
+    pstats or snakeviz.
+
+    Args:
+        path: File to write the profile to
+    """
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError(
+                "HTML profiles need pyinstrument (pip install pyinstrument)"
+            )
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,198 @@
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.models import (
+    ProjectsRoot,
+    Project,
+    ScanJob,
+    ScanJobKind,
+    ScanJobStatus,
+    ScanRun,
+)
+from core.services.scan_jobs import enqueue_scan
+
+
+class ScanScheduler:
+    """
+    Queues discovery and project scans as they fall due
+
+    Roots are rediscovered every SCAN_INTERVAL_MINUTES. Each project gets
+    its own interval from its recent activity: projects with BUSY_CHANGES
+    activity logs in the last week are scanned twice as often, projects
+    without any are backed off, doubling the interval for every quiet week up
+    to MAX_BACKOFF times. A random jitter spreads scans that fall due together
+    so they don't all hit shared storage at once.
+
+    Projects whose scans fail, such as ones on an unreachable share, never
+    get a new last_scan. They are retried an interval after each failure,
+    doubling with every failure since their last successful scan up to
+    MAX_BACKOFF times, so they don't stay the most overdue and take every
+    slot.
+
+    Incremental scans (SCAN_INCREMENTAL) skip folders whose modification
+    time hasn't changed, which misses files edited in place, so a project
+    whose last full scan is older than SCAN_FULL_INTERVAL_MINUTES gets a
+    full scan instead.
+
+    Scans are queued as ScanJobs and run by the scan workers. The job queue
+    allows one active job per project or root, so a scan that is still
+    running is never started again, and no new jobs are queued while
+    max_concurrent jobs are queued or running.
+    """
+
+    LOOKBACK_DAYS = 7
+    BUSY_CHANGES = 5  # Activity logs in the lookback window of a busy project
+    MAX_BACKOFF = 8
+
+    def __init__(
+        self,
+        interval_minutes=None,
+        max_concurrent=None,
+        jitter=None,
+        full_interval_minutes=None,
+    ):
+        self.interval = timedelta(
+            minutes=interval_minutes or settings.SCAN_INTERVAL_MINUTES
+        )
+        self.max_concurrent = max_concurrent or settings.SCAN_MAX_CONCURRENT
+        self.jitter = settings.SCAN_JITTER if jitter is None else jitter
+        if full_interval_minutes is None:
+            full_interval_minutes = settings.SCAN_FULL_INTERVAL_MINUTES
+        self.full_interval = timedelta(minutes=full_interval_minutes)  # 0 = never
+        self._offsets = {}  # (kind, pk) -> jitter offset between 0 and 1
+
+    def interval_for(self, recent_changes, last_change, now):
+        """
+        Scan interval of a project
+
+        Args:
+            recent_changes: Activity logs in the last LOOKBACK_DAYS
+            last_change: Time of the latest activity log, or when the
+                project was created if it never changed
+            now: Current time
+
+        Returns:
+            timedelta: Time between scans
+        """
+        if recent_changes >= self.BUSY_CHANGES:
+            return self.interval / 2
+        if recent_changes:
+            return self.interval
+        quiet_weeks = max((now - last_change).days // 7, 0)
+        return self.interval * min(2 ** (quiet_weeks + 1), self.MAX_BACKOFF)
+
+    def due_scans(self, now=None):
+        """
+        List roots and projects whose next scan is due, most overdue first
+
+        Returns:
+            list: (overdue by, ScanJobKind, ProjectsRoot or Project)
+        """
+        now = now or timezone.now()
+        due = []
+
+        for root in ProjectsRoot.objects.filter(auto_discover=True):
+            due_at = self._due_at(ScanJobKind.ROOT, root, self.interval)
+            if due_at <= now:
+                due.append((now - due_at, ScanJobKind.ROOT, root))
+
+        since = now - timedelta(days=self.LOOKBACK_DAYS)
+        failed = Q(scan_jobs__status=ScanJobStatus.FAILED)
+        projects = Project.objects.filter(active=True).annotate(
+            recent_changes=Count(
+                "activities",
+                filter=Q(activities__timestamp__gte=since),
+                distinct=True,  # Not multiplied by the scan jobs joined
+            ),
+            last_change=Max("activities__timestamp"),
+            failures=Count(
+                "scan_jobs",
+                filter=failed
+                & Q(
+                    scan_jobs__finished_at__gt=Coalesce(F("last_scan"), F("created_at"))
+                ),
+                distinct=True,
+            ),
+            last_failure=Max("scan_jobs__finished_at", filter=failed),
+            # A subquery, so the scan runs don't multiply the rows joined above
+            last_full_scan=Subquery(
+                ScanRun.objects.filter(project=OuterRef("pk"), incremental=False)
+                .order_by("-finished_at")
+                .values("finished_at")[:1]
+            ),
+        )
+        for project in projects:
+            interval = self.interval_for(
+                project.recent_changes,
+                project.last_change or project.created_at,
+                now,
+            )
+            due_at = self._due_at(ScanJobKind.PROJECT, project, interval)
+            if project.failures:
+                backoff = min(2 ** (project.failures - 1), self.MAX_BACKOFF)
+                due_at = max(due_at, project.last_failure + self.interval * backoff)
+            if due_at <= now:
+                due.append((now - due_at, ScanJobKind.PROJECT, project))
+
+        due.sort(key=lambda item: item[0], reverse=True)
+        return due
+
+    def needs_full_scan(self, project, now):
+        """
+        Whether the next scan of a project should stat every file
+
+        Args:
+            project: Project from due_scans(), with its last_full_scan
+            now: Current time
+
+        Returns:
+            bool: True with SCAN_INCREMENTAL when the last full scan is
+                older than the full scan interval, or there was none
+        """
+        if not settings.SCAN_INCREMENTAL or not self.full_interval:
+            return False
+        last_full_scan = project.last_full_scan
+        return last_full_scan is None or now - last_full_scan >= self.full_interval
+
+    def tick(self, now=None):
+        """
+        Queue the scans that are due, up to the concurrency cap
+
+        Returns:
+            list: ScanJobs queued by this tick
+        """
+        now = now or timezone.now()
+        active_jobs = ScanJob.objects.filter(status__in=ScanJob.ACTIVE_STATUSES)
+        active_keys = set(active_jobs.values_list("key", flat=True))
+        slots = self.max_concurrent - len(active_keys)
+
+        queued = []
+        for _, kind, target in self.due_scans(now):
+            if slots <= 0:
+                break
+            if kind == ScanJobKind.PROJECT and "all" in active_keys:
+                break  # A scan of all projects is already under way
+            if f"{kind.lower()}:{target.pk}" in active_keys:
+                continue  # Still queued or running since it last fell due
+            if kind == ScanJobKind.ROOT:
+                job, created = enqueue_scan(kind, root=target)
+            else:
+                job, created = enqueue_scan(
+                    kind, project=target, full=self.needs_full_scan(target, now)
+                )
+            if created:
+                queued.append(job)
+                slots -= 1
+        return queued
+
+    def _due_at(self, kind, target, interval):
+        # One random offset per target, drawn once so due times don't move
+        offset = self._offsets.setdefault((kind, target.pk), random.random())
+        spread = interval * self.jitter
+        if target.last_scan is None:
+            # Never scanned: spread the first scans after creation
+            return target.created_at + spread * offset
+        return target.last_scan + interval + spread * (2 * offset - 1)
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from core.models import ProjectsRoot, Project, GlobalStats, new_data_version
+
+# Project fields written by scans; saves limited to them don't move projects
+# between roots or change whether they are active
+SCAN_FIELDS = ["total_files", "total_size", "last_scan", "data_version"]
+
+
+def add_to_totals(root_id, files=0, size=0, projects=0, active_projects=0):
+    """
+    Add changes of a project to the totals of its root and the global totals
+
+    The counters are updated in place, so concurrent scans of different
+    projects don't overwrite each other's changes. Call it in the
+    transaction that changes the project, even without changes to count:
+    it also replaces the global data version, see response_cache.
+
+    Args:
+        root_id: Id of the project's ProjectsRoot, or None
+        files: Change in the number of files
+        size: Change in bytes
+        projects: Change in the number of projects
+        active_projects: Change in the number of active projects
+    """
+    changes = {
+        field: F(field) + change
+        for field, change in [
+            ("total_projects", projects),
+            ("active_projects", active_projects),
+            ("total_files", files),
+            ("total_size", size),
+        ]
+        if change
+    }
+    if root_id is not None and changes:
+        ProjectsRoot.objects.filter(pk=root_id).update(**changes)
+    if not GlobalStats.objects.filter(pk=1).update(
+        updated_at=timezone.now(), data_version=new_data_version(), **changes
+    ):
+        # First change ever: start from the projects as they are now
+        recount_totals()
+
+
+def recount_totals():
+    """
+    Recompute the totals of every root and the global totals from the
+    projects, after changes that can't be applied as a difference
+    """
+    totals = {
+        "total_projects": Count("id"),
+        "active_projects": Count("id", filter=Q(active=True)),
+        "total_files": Sum("total_files"),
+        "total_size": Sum("total_size"),
+    }
+
+    by_root = {
+        row.pop("root"): row
+        for row in Project.objects.filter(root__isnull=False)
+        .values("root")
+        .annotate(**totals)
+        .order_by()
+    }
+    roots = list(ProjectsRoot.objects.all())
+    for root in roots:
+        row = by_root.get(root.pk, {})
+        for field in totals:
+            setattr(root, field, row.get(field) or 0)
+    ProjectsRoot.objects.bulk_update(roots, list(totals))
+
+    row = Project.objects.aggregate(**totals)
+    defaults = {field: row[field] or 0 for field in totals}
+    defaults["data_version"] = new_data_version()
+    GlobalStats.objects.update_or_create(pk=1, defaults=defaults)
@@ -0,0 +1,82 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from core.models import Project, new_data_version
+from core.services.stats_counters import SCAN_FIELDS, add_to_totals
+
+# Project fields counted in the root and global totals
+COUNTED_FIELDS = ["root_id", "active", "total_files", "total_size"]
+
+
+@receiver(pre_save, sender=Project)
+def project_changing(sender, instance, update_fields=None, **kwargs):
+    """
+    Give edited projects a new data version, see response_cache, and
+    remember the counted fields as stored before the edit
+    """
+    if update_fields is None:
+        instance.data_version = new_data_version()
+    instance._counted_before = None
+    if instance.pk is not None and not _scan_save(update_fields):
+        instance._counted_before = (
+            Project.objects.filter(pk=instance.pk).values_list(*COUNTED_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Add new projects and the changes of edited ones to the totals"""
+    if created:
+        add_to_totals(
+            instance.root_id,
+            files=instance.total_files,
+            size=instance.total_size,
+            projects=1,
+            active_projects=int(instance.active),
+        )
+        return
+
+    before = getattr(instance, "_counted_before", None)
+    if before is None:
+        # Scans add their own changes in FolderMonitor.write_changes()
+        return
+
+    root_id, active, files, size = before
+    if root_id != instance.root_id:
+        # Moved: out of the old root's totals and into the new one's
+        add_to_totals(
+            root_id,
+            files=-files,
+            size=-size,
+            projects=-1,
+            active_projects=-int(active),
+        )
+        add_to_totals(
+            instance.root_id,
+            files=instance.total_files,
+            size=instance.total_size,
+            projects=1,
+            active_projects=int(instance.active),
+        )
+    else:
+        # Also replaces the global data version for edits such as renames
+        add_to_totals(
+            root_id,
+            files=instance.total_files - files,
+            size=instance.total_size - size,
+            active_projects=int(instance.active) - int(active),
+        )
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    add_to_totals(
+        instance.root_id,
+        files=-instance.total_files,
+        size=-instance.total_size,
+        projects=-1,
+        active_projects=-int(instance.active),
+    )
+
+
+def _scan_save(update_fields):
+    return update_fields is not None and set(update_fields) <= set(SCAN_FIELDS)
@@ -1,3 +1,1230 @@
-from django.test import TestCase
+import os
+import sys
+import csv
+import errno
+import gzip
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.models import (
+    ProjectsRoot,
+    Project,
+    GlobalStats,
+    FileRecord,
+    FileChange,
+    ActivityLog,
+    ScanJob,
+    ScanJobKind,
+    ScanJobStatus,
+    ScanCheckpoint,
+    ScanCheckpointChunk,
+    ScanRun,
+)
+from core.serializers import ProjectSerializer
+from core.services.folder_monitor import ProjectsMonitor, FolderMonitor
+from core.services.directory_rollup import DirectoryRollup
+from core.services import inventory_export
+from core.services.duplicate_finder import DuplicateFinder
+from core.services.file_hasher import FileHasher
+from core.services.file_history import prune_file_changes
+from core.services.folder_watcher import ProjectWatcher
+from core.services.scan_checkpoint import ScanCheckpointer
+from core.services.scan_scheduler import ScanScheduler
+from core.services.stats_counters import recount_totals
+from core.services.scan_jobs import enqueue_scan, claim_next_job, ScanJobRunner
+from projects.models import Task
+from utils.file_walker import iter_folders, walk_files
+
+
+class ScanTestCase(TestCase):
+    """Base class providing a temporary project folder"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.project = Project.objects.create(name="Test", folder_path=self.folder)
+
+    def write_file(self, rel_path, content=b"data", mtime=None):
+        full_path = os.path.join(self.folder, rel_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(full_path, (mtime, mtime))
+        return full_path
+
+
+class FolderMonitorTests(ScanTestCase):
+    def test_detects_added_modified_and_deleted_files(self):
+        self.write_file("a.txt", b"aaa")
+        self.write_file(os.path.join("sub", "b.txt"), b"bb")
+        self.write_file("c.txt", b"c")
+
+        result = FolderMonitor(self.project).scan_folder()
+        self.assertEqual(result["files_added"], 3)
+        self.assertEqual(result["size_change"], 6)
+
+        self.write_file("a.txt", b"aaaa")
+        os.remove(os.path.join(self.folder, "c.txt"))
+        self.write_file("d.txt", b"dd")
+
+        result = FolderMonitor(self.project).scan_folder()
+        self.assertEqual(
+            result,
+            {
+                "files_added": 1,
+                "files_modified": 1,
+                "files_deleted": 1,
+                "size_change": 2,
+            },
+        )
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_files, 3)
+        self.assertEqual(self.project.total_size, 8)
+        self.assertEqual(
+            set(FileRecord.objects.with_path().values_list("path", flat=True)),
+            {"a.txt", os.path.join("sub", "b.txt"), "d.txt"},
+        )
+
+        log = ActivityLog.objects.filter(project=self.project).latest("id")
+        self.assertEqual(
+            (log.files_added, log.files_modified, log.files_deleted, log.size_change),
+            (1, 1, 1, 2),
+        )
+
+    def test_files_are_stored_by_folder(self):
+        self.write_file(os.path.join("sub", "deep", "a.txt"), b"aaa")
+        self.write_file(os.path.join("sub", "b.txt"), b"bb")
+        self.write_file("c.txt", b"c")
+        FolderMonitor(self.project).scan_folder()
+
+        directory = FileRecord.objects.get(filename="a.txt").directory
+        self.assertEqual(directory.path, os.path.join("sub", "deep"))
+        self.assertEqual((directory.name, directory.parent.name), ("deep", "sub"))
+        self.assertEqual(directory.parent.parent.path, ".")
+        self.assertEqual(
+            FileRecord.objects.filter(
+                directory__in=self.project.directories.subtree("sub")
+            ).aggregate(files=Count("id"), size=Sum("size")),
+            {"files": 2, "size": 5},
+        )
+
+        # The API still returns paths relative to the project folder
+        response = self.client.get(f"/api/projects/{self.project.pk}/files/")
+        self.assertEqual(
+            [f["path"] for f in response.json()["results"]],
+            [
+                "c.txt",
+                os.path.join("sub", "b.txt"),
+                os.path.join("sub", "deep", "a.txt"),
+            ],
+        )
+
+        shutil.rmtree(os.path.join(self.folder, "sub"))
+        result = FolderMonitor(self.project).scan_folder()
+        self.assertEqual(result["files_deleted"], 2)
+        self.assertEqual(
+            list(self.project.directories.values_list("path", flat=True)), ["."]
+        )
+
+    def test_unchanged_folder_creates_no_activity(self):
+        self.write_file("a.txt")
+        FolderMonitor(self.project).scan_folder()
+        FolderMonitor(self.project).scan_folder()
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+    def test_writes_are_batched(self):
+        for i in range(50):
+            self.write_file(f"file{i}.txt")
+
+        monitor = FolderMonitor(self.project, batch_size=20)
+        # Checkpoint lookup, file and folder reads, stored project totals,
+        # 3 batched file inserts and 3 of their change events, 1 folder
+        # insert, folder rollups (own files, subfolders, update), checkpoint
+        # cleanup, project update, global totals update, activity log, the
+        # transaction savepoint queries and the scan run
+        with self.assertNumQueries(21):
+            monitor.scan_folder()
+        self.assertEqual(FileRecord.objects.count(), 50)
+
+    def test_scan_run_records_metrics(self):
+        self.write_file("a.txt", b"12345")
+        self.write_file("sub/b.txt", b"123")
+
+        monitor = FolderMonitor(self.project)
+        monitor.scan_folder()
+        run = monitor.scan_run
+        self.assertEqual((run.folders_visited, run.files_visited), (2, 2))
+        self.assertEqual(run.bytes_visited, 8)
+        self.assertEqual(run.stat_calls, 4)  # Root, subfolder and two files
+        self.assertEqual(run.files_added, 2)
+        self.assertGreater(run.query_count, 0)
+        self.assertGreater(run.walk_seconds, 0)
+
+        runs = self.client.get("/api/scan-runs/", {"project": self.project.pk})
+        [data] = runs.json()["results"]
+        self.assertEqual(data["files_visited"], 2)
+        self.assertEqual(data["project_name"], "Test")
+
+
+class ScanAllProjectsTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.other_folder, ignore_errors=True)
+        Project.objects.create(name="Other", folder_path=self.other_folder)
+        Project.objects.create(name="Missing", folder_path=self.folder + "-missing")
+
+        self.write_file("a.txt", b"aaa")
+        with open(os.path.join(self.other_folder, "b.txt"), "wb") as f:
+            f.write(b"bb")
+
+    def strip_times(self, results):
+        for project in results.pop("projects"):
+            self.assertGreaterEqual(project["wall_time"], 0)
+        return results
+
+    def test_parallel_matches_sequential(self):
+        parallel = ProjectsMonitor().scan_all_projects(workers=4)
+        self.assertEqual(len(parallel["projects"]), 3)
+        FileRecord.objects.all().delete()
+        ActivityLog.objects.all().delete()
+        Project.objects.update(total_files=0, total_size=0)
+        recount_totals()  # Bulk updates bypass the counters
+
+        sequential = ProjectsMonitor().scan_all_projects(workers=1)
+        self.assertEqual(self.strip_times(parallel), self.strip_times(sequential))
+        self.assertEqual(sequential["scanned_projects"], 2)
+        self.assertEqual(sequential["total_files_added"], 2)
+        self.assertEqual(sequential["total_size"], 5)
+        self.assertEqual(
+            [error["project"] for error in sequential["errors"]], ["Missing"]
+        )
+
+
+class ProjectDiscoveryTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = ProjectsRoot.objects.create(name="Root", path=self.folder)
+
+    def make_folders(self, *names):
+        for name in names:
+            os.makedirs(os.path.join(self.folder, name), exist_ok=True)
+
+    def test_listing_is_applied_in_bulk(self):
+        self.make_folders(*[f"p{i}" for i in range(30)])
+        monitor = ProjectsMonitor()
+        # Existing projects, bulk insert, global totals, root totals and
+        # last scan, with the transaction savepoints
+        with self.assertNumQueries(7):
+            result = monitor.scan_projects_root(self.root)
+        self.assertEqual(result["new_projects"], 30)
+
+        shutil.rmtree(os.path.join(self.folder, "p0"))
+        shutil.rmtree(os.path.join(self.folder, "p1"))
+        by_hand = Project.objects.get(name="p2")
+        by_hand.active = False
+        by_hand.save()
+        result = monitor.scan_projects_root(self.root)
+        self.assertEqual((result["new_projects"], result["removed_projects"]), (0, 2))
+
+        # Folders that come back reactivate their project instead of adding
+        # another; projects deactivated by hand stay inactive
+        self.make_folders("p0")
+        result = monitor.scan_projects_root(self.root)
+        self.assertEqual(result["reactivated_projects"], 1)
+        self.assertEqual(monitor.scan_projects_root(self.root)["new_projects"], 0)
+        projects = Project.objects.filter(root=self.root)
+        self.assertEqual(projects.count(), 30)
+        self.assertEqual(
+            sorted(os.path.basename(p.folder_path) for p in projects if not p.active),
+            ["p1", "p2"],
+        )
+        self.root.refresh_from_db()
+        self.assertEqual(
+            (self.root.total_projects, self.root.active_projects), (30, 28)
+        )
+
+    def test_projects_reactivated_by_hand_are_counted_once(self):
+        self.make_folders("p0", "p1")
+        monitor = ProjectsMonitor()
+        monitor.scan_projects_root(self.root)
+        shutil.rmtree(os.path.join(self.folder, "p0"))
+        monitor.scan_projects_root(self.root)
+
+        # Turned back on before its folder returns
+        project = Project.objects.get(name="p0")
+        project.active = True
+        project.save()
+        self.make_folders("p0")
+        result = monitor.scan_projects_root(self.root)
+        self.assertEqual(result["reactivated_projects"], 0)
+        project.refresh_from_db()
+        self.assertFalse(project.folder_missing)
+        self.root.refresh_from_db()
+        self.assertEqual((self.root.total_projects, self.root.active_projects), (2, 2))
+
+    def test_roots_are_listed_concurrently(self):
+        other_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_folder, ignore_errors=True)
+        os.makedirs(os.path.join(other_folder, "q"))
+        other = ProjectsRoot.objects.create(name="Other", path=other_folder)
+        missing = ProjectsRoot.objects.create(name="Missing", path=other_folder + "-x")
+        self.make_folders("p")
+
+        results = ProjectsMonitor().scan_projects_roots(
+            [self.root, other, missing], workers=3
+        )
+        self.assertEqual(results["Root"]["new_projects"], 1)
+        self.assertEqual(results["Other"]["new_projects"], 1)
+        self.assertEqual(results["Missing"]["error"], "Path does not exist")
+        self.assertEqual(
+            sorted(
+                Project.objects.filter(root__isnull=False).values_list(
+                    "name", flat=True
+                )
+            ),
+            ["p", "q"],
+        )
+
+
+class StatsCountersTests(ScanTestCase):
+    def counters(self):
+        root = ProjectsRoot.objects.get(pk=self.root.pk)
+        stats = GlobalStats.load()
+        return [
+            (r.total_projects, r.active_projects, r.total_files, r.total_size)
+            for r in (root, stats)
+        ]
+
+    def test_counters_follow_scans_and_project_changes(self):
+        self.root = ProjectsRoot.objects.create(name="Root", path=self.folder)
+        self.project.root = self.root
+        self.project.save()
+        self.write_file("a.txt", b"aaa")
+        self.write_file("sub/b.txt", b"bb")
+        FolderMonitor(self.project).scan_folder()
+        other = Project.objects.create(name="Other", folder_path=self.folder)
+        FolderMonitor(other).scan_folder()
+        self.assertEqual(self.counters(), [(1, 1, 2, 5), (2, 2, 4, 10)])
+
+        os.remove(os.path.join(self.folder, "a.txt"))
+        FolderMonitor(self.project).scan_folder()
+        self.assertEqual(self.counters(), [(1, 1, 1, 2), (2, 2, 3, 7)])
+
+        url = f"/api/projects/{self.project.pk}/"
+        self.client.patch(url, {"active": False}, content_type="application/json")
+        self.assertEqual(self.counters(), [(1, 0, 1, 2), (2, 1, 3, 7)])
+
+        # Edits apply their change in place, however many projects there are
+        other.root = self.root
+        # Stored values, save, then out of the old totals and into the new
+        with self.assertNumQueries(5):
+            other.save()
+        self.assertEqual(self.counters(), [(2, 1, 3, 7), (2, 1, 3, 7)])
+        other.root = None
+        other.save()
+        self.assertEqual(self.counters(), [(1, 0, 1, 2), (2, 1, 3, 7)])
+        other.delete()
+        self.assertEqual(self.counters(), [(1, 0, 1, 2), (1, 0, 1, 2)])
+
+        # Kept in step with what recounting every project gives
+        counted = self.counters()
+        recount_totals()
+        self.assertEqual(self.counters(), counted)
+
+        self.client.get("/api/stats/")
+        with self.assertNumQueries(1):  # Cached under the global data version
+            stats = self.client.get("/api/stats/").json()
+        self.assertEqual((stats["total_projects"], stats["total_files"]), (1, 1))
+
+
+class IncrementalScanTests(ScanTestCase):
+    OLD = 1_600_000_000  # Timestamps well outside the racy window
+
+    def age_folders(self):
+        for root, dirs, _ in os.walk(self.folder):
+            os.utime(root, (self.OLD, self.OLD))
+
+    def test_detects_adds_and_deletes(self):
+        self.write_file("a.txt", mtime=self.OLD)
+        self.write_file(os.path.join("sub", "b.txt"), mtime=self.OLD)
+        self.age_folders()
+        FolderMonitor(self.project).scan_folder()
+
+        os.remove(os.path.join(self.folder, "a.txt"))
+        self.write_file(os.path.join("sub", "c.txt"), b"ccc")
+
+        result = FolderMonitor(self.project, incremental=True).scan_folder()
+        self.assertEqual(result["files_added"], 1)
+        self.assertEqual(result["files_deleted"], 1)
+        self.assertEqual(
+            set(FileRecord.objects.with_path().values_list("path", flat=True)),
+            {os.path.join("sub", "b.txt"), os.path.join("sub", "c.txt")},
+        )
+
+    def test_unchanged_folders_skip_stat_until_full_scan(self):
+        self.write_file(os.path.join("sub", "b.txt"), b"b", mtime=self.OLD)
+        self.age_folders()
+        FolderMonitor(self.project).scan_folder()
+
+        # Rewrite in place and restore the folder mtime
+        self.write_file(os.path.join("sub", "b.txt"), b"bbbb", mtime=self.OLD)
+        self.age_folders()
+
+        monitor = FolderMonitor(self.project, incremental=True)
+        self.assertEqual(
+            monitor.verify_incremental(),
+            {"missing": [], "unexpected": [], "stale": [os.path.join("sub", "b.txt")]},
+        )
+        self.assertEqual(monitor.scan_folder()["files_modified"], 0)
+
+        result = FolderMonitor(self.project, incremental=False).scan_folder()
+        self.assertEqual(result["files_modified"], 1)
+        self.assertEqual(result["size_change"], 3)
+
+
+class LowMemoryScanTests(ScanTestCase):
+    # Folders whose sorted walk order differs from plain path order
+    PATHS = [
+        "a.txt",
+        os.path.join("a-b", "x.txt"),
+        os.path.join("a", "b.txt"),
+        os.path.join("a", "c", "d.txt"),
+        "ab.txt",
+        "B.txt",
+        "é.txt",
+    ]
+
+    def stored_files(self):
+        return dict(self.project.files.with_path().values_list("path", "size"))
+
+    def test_merge_join_matches_the_full_scan(self):
+        for path in self.PATHS:
+            self.write_file(path)
+        FolderMonitor(self.project, low_memory=False).scan_folder()
+
+        self.write_file("a.txt", b"changed")
+        os.remove(os.path.join(self.folder, "a", "b.txt"))
+        os.remove(os.path.join(self.folder, "é.txt"))
+        self.write_file(os.path.join("a", "a.txt"), b"new")
+        self.write_file("z.txt", b"z")
+
+        # Pages and flushes of two rows each
+        result = FolderMonitor(
+            self.project, batch_size=2, low_memory=True
+        ).scan_folder()
+        self.assertEqual(
+            result,
+            {
+                "files_added": 2,
+                "files_modified": 1,
+                "files_deleted": 2,
+                "size_change": -1,
+            },
+        )
+        on_disk = {entry.path: entry.size for entry in walk_files(self.folder)}
+        self.assertEqual(self.stored_files(), on_disk)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_files, len(on_disk))
+        self.assertEqual(self.project.total_size, sum(on_disk.values()))
+
+        # Nothing left for a scan that loads every record
+        result = FolderMonitor(self.project, low_memory=False).scan_folder()
+        self.assertEqual(result["files_added"] + result["files_deleted"], 0)
+        self.assertEqual(result["files_modified"], 0)
+
+
+class FileWalkerTests(ScanTestCase):
+    def test_relative_paths_and_filters(self):
+        self.write_file("a.txt", b"aaa")
+        self.write_file(".hidden", b"h")
+        self.write_file(os.path.join("sub", "b.txt"), b"bb")
+        self.write_file(os.path.join(".git", "config"), b"c")
+        self.write_file(os.path.join("sub", "~$draft.docx"), b"d")
+
+        entries = {
+            entry.path: entry.size
+            for entry in walk_files(self.folder, include_hidden=False, ignore=["~$*"])
+        }
+        self.assertEqual(entries, {"a.txt": 3, os.path.join("sub", "b.txt"): 2})
+
+        folders = {
+            folder.path: folder.entry_count for folder in iter_folders(self.folder)
+        }
+        self.assertEqual(folders, {".": 4, "sub": 2, ".git": 1})
+
+
+class ScanJobTests(ScanTestCase):
+    def test_scan_requests_are_coalesced_and_run_by_the_worker(self):
+        self.write_file("a.txt", b"aaa")
+        url = f"/api/projects/{self.project.pk}/scan/"
+
+        responses = [self.client.post(url) for _ in range(3)]
+        self.assertEqual({r.status_code for r in responses}, {202})
+        self.assertEqual(len({r.json()["job"]["id"] for r in responses}), 1)
+
+        job = ScanJob.objects.get()
+        self.assertEqual(job.requests, 3)
+        self.assertEqual(job.status, ScanJobStatus.QUEUED)
+
+        job = ScanJobRunner(claim_next_job()).run()
+        self.assertEqual(job.status, ScanJobStatus.COMPLETED)
+        self.assertEqual(job.result["files_added"], 1)
+        self.assertEqual(job.files_seen, 1)
+        self.assertIsNone(claim_next_job())
+
+        # A finished job no longer absorbs new requests
+        response = self.client.post(url)
+        self.assertNotEqual(response.json()["job"]["id"], job.pk)
+
+        status = self.client.get(f"/api/scan-jobs/{job.pk}/").json()
+        self.assertEqual(status["status"], "COMPLETED")
+        self.assertEqual(status["files_seen"], 1)
+
+    def test_failed_scan_is_recorded(self):
+        self.project.folder_path = self.folder + "-missing"
+        self.project.save()
+        job, _ = enqueue_scan(ScanJobKind.PROJECT, project=self.project)
+
+        job = ScanJobRunner(claim_next_job()).run()
+        self.assertEqual(job.status, ScanJobStatus.FAILED)
+        self.assertIn("does not exist", job.error)
+
+
+class FileHasherTests(ScanTestCase):
+    def test_hashes_within_budget_and_rehashes_changed_files(self):
+        self.write_file("a.txt", b"a" * 10)
+        self.write_file("b.txt", b"b" * 10)
+        self.write_file("c.txt", b"c" * 10)
+        FolderMonitor(self.project).scan_folder()
+
+        stats = FileHasher(
+            self.project, algorithm="sha256", byte_budget=25
+        ).hash_pending()
+        self.assertEqual(stats["files_hashed"], 2)
+        self.assertEqual(stats["files_pending"], 1)
+
+        stats = FileHasher(
+            self.project, algorithm="sha256", byte_budget=25
+        ).hash_pending()
+        self.assertEqual((stats["files_hashed"], stats["files_pending"]), (1, 0))
+        record = FileRecord.objects.get(filename="a.txt")
+        self.assertEqual(record.file_hash, hashlib.sha256(b"a" * 10).hexdigest())
+
+        self.write_file("a.txt", b"changed")
+        FolderMonitor(self.project).scan_folder()
+        stats = FileHasher(self.project, algorithm="sha256").hash_pending()
+        self.assertEqual(stats["files_hashed"], 1)
+        record.refresh_from_db()
+        self.assertEqual(
+            (record.file_hash, record.hash_algorithm),
+            (hashlib.sha256(b"changed").hexdigest(), "sha256"),
+        )
+
+        # Hashes made with another algorithm are made again
+        result = FolderMonitor(self.project, hash_files=True).scan_folder()
+        self.assertEqual(result["hashing"]["files_hashed"], 3)
+        record.refresh_from_db()
+        self.assertEqual(
+            (record.file_hash, record.hash_algorithm),
+            (hashlib.blake2b(b"changed", digest_size=32).hexdigest(), "blake2b"),
+        )
+
+
+class DuplicateFinderTests(ScanTestCase):
+    def test_finds_identical_files_across_projects(self):
+        other_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_folder, ignore_errors=True)
+        other = Project.objects.create(name="Other", folder_path=other_folder)
+
+        block = DuplicateFinder.PARTIAL_BLOCK_SIZE
+        big = b"x" * block + b"middle" + b"y" * block
+        self.write_file("big.bin", big)
+        self.write_file("big-copy.bin", big)
+        # Same size, first and last blocks as big.bin
+        self.write_file("big-other.bin", b"x" * block + b"MIDDLE" + b"y" * block)
+        self.write_file("small.txt", b"hello")
+        self.write_file("same-size.txt", b"world")
+        with open(os.path.join(other_folder, "small.txt"), "wb") as f:
+            f.write(b"hello")
+
+        FolderMonitor(self.project).scan_folder()
+        FolderMonitor(other).scan_folder()
+
+        # The endpoint never reads files, only hashes stored by scans
+        report = self.client.get("/api/duplicates/", {"read_files": "true"}).json()
+        self.assertEqual(report["cluster_count"], 0)
+
+        report = DuplicateFinder().find()
+        self.assertEqual(report["cluster_count"], 2)
+        self.assertEqual(report["reclaimable_bytes"], len(big) + 5)
+        clusters = {
+            cluster["size"]: sorted(f["path"] for f in cluster["files"])
+            for cluster in report["clusters"]
+        }
+        self.assertEqual(
+            clusters,
+            {len(big): ["big-copy.bin", "big.bin"], 5: ["small.txt", "small.txt"]},
+        )
+
+        # Hashes computed on the way are stored and reused
+        self.assertEqual(FileRecord.objects.filter(file_hash__isnull=False).count(), 5)
+        report = self.client.get("/api/duplicates/", {"root": ""}).json()
+        self.assertEqual(report["cluster_count"], 2)
+        self.assertEqual(
+            {p["name"]: p["reclaimable_bytes"] for p in report["projects"]},
+            {"Test": len(big), "Other": 5},
+        )
+
+    def test_files_are_read_in_one_query(self):
+        for i in range(1, 6):
+            self.write_file(f"a{i}.txt", b"a" * i)
+            self.write_file(f"b{i}.txt", b"a" * i)
+            self.write_file(f"c{i}.txt", b"c" * i)
+        FolderMonitor(self.project).scan_folder()
+        FileHasher(self.project).hash_pending()
+
+        # Projects, then every file sorted by size and hash
+        with self.assertNumQueries(2):
+            report = DuplicateFinder(read_files=False).find()
+        self.assertEqual(report["cluster_count"], 5)
+        with self.assertNumQueries(2):
+            self.assertEqual(DuplicateFinder().find()["cluster_count"], 5)
+
+    def test_only_hashes_of_the_same_algorithm_are_compared(self):
+        self.write_file("a.txt", b"same")
+        self.write_file("b.txt", b"same")
+        FolderMonitor(self.project).scan_folder()
+        FileHasher(self.project, algorithm="sha256").hash_pending()
+        FileRecord.objects.filter(filename="b.txt").update(
+            file_hash=hashlib.blake2b(b"same", digest_size=32).hexdigest(),
+            hash_algorithm="blake2b",
+        )
+
+        finder = DuplicateFinder(read_files=False, algorithm="blake2b")
+        self.assertEqual(finder.find()["cluster_count"], 0)
+        self.assertEqual(
+            DuplicateFinder(algorithm="blake2b").find()["cluster_count"], 1
+        )
+        self.assertEqual(
+            set(FileRecord.objects.values_list("hash_algorithm", flat=True)),
+            {"blake2b"},
+        )
+        self.assertEqual(finder.find()["cluster_count"], 1)
+
+
+class FileListTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in [
+            "b.txt",
+            "a.txt",
+            "sub/c.txt",
+            "d.txt",
+            "sub/a.log",
+            "sub/a/z.txt",
+        ]:
+            self.write_file(name)
+        FolderMonitor(self.project).scan_folder()
+        self.url = f"/api/projects/{self.project.pk}/files/"
+        # Folder, then filename: sub/c.txt comes before sub/a/z.txt
+        self.paths = sorted(
+            FileRecord.objects.with_path().values_list("path", flat=True),
+            key=lambda path: (os.path.dirname(path) or ".", os.path.basename(path)),
+        )
+
+    def test_pages_follow_the_cursor_in_folder_order(self):
+        paths = []
+        url, params = self.url, {"page_size": 2}
+        while url:
+            with self.assertNumQueries(2):  # Project, page
+                page = self.client.get(url, params).json()
+            self.assertLessEqual(len(page["results"]), 2)
+            paths.extend(f["path"] for f in page["results"])
+            url, params = page["next"], None
+        self.assertEqual(paths, self.paths)
+
+    def test_ndjson_stream(self):
+        response = self.client.get(self.url, {"stream": "ndjson", "filename": "a"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [r["path"] for r in rows], ["a.txt", os.path.join("sub", "a.log")]
+        )
+        self.assertEqual(rows[0]["size"], 4)
+
+
+class FileHistoryTests(ScanTestCase):
+    def changes(self):
+        return {
+            (c.kind, c.path): (c.size, c.size_change)
+            for c in FileChange.objects.filter(project=self.project)
+        }
+
+    def test_scans_record_file_changes(self):
+        for low_memory in (False, True):
+            FileChange.objects.all().delete()
+            FileRecord.objects.all().delete()
+            self.project.directories.all().delete()
+            shutil.rmtree(self.folder)
+            self.write_file("a.txt", b"aaa", mtime=1_000_000)
+            self.write_file(os.path.join("sub", "b.txt"), b"bb")
+            FolderMonitor(self.project, low_memory=low_memory).scan_folder()
+
+            self.write_file("a.txt", b"a", mtime=2_000_000)
+            os.remove(os.path.join(self.folder, "sub", "b.txt"))
+            self.write_file("c.txt", b"cccc")
+            FolderMonitor(self.project, low_memory=low_memory).scan_folder()
+
+            with self.subTest(low_memory=low_memory):
+                self.assertEqual(
+                    self.changes(),
+                    {
+                        ("ADDED", "a.txt"): (3, 3),
+                        ("ADDED", os.path.join("sub", "b.txt")): (2, 2),
+                        ("MODIFIED", "a.txt"): (1, -2),
+                        ("DELETED", os.path.join("sub", "b.txt")): (0, -2),
+                        ("ADDED", "c.txt"): (4, 4),
+                    },
+                )
+                modified = FileChange.objects.get(kind="MODIFIED")
+                self.assertEqual(
+                    modified.last_modified - modified.previous_modified,
+                    timedelta(seconds=1_000_000),
+                )
+
+    def test_changes_are_paged_newest_first_and_filtered(self):
+        for i in range(5):
+            self.write_file(os.path.join("dir", f"file{i}.txt"))
+        FolderMonitor(self.project).scan_folder()
+        first_scan = FileChange.objects.get(
+            path=os.path.join("dir", "file0.txt")
+        ).timestamp
+        self.write_file("other.txt")
+        os.remove(os.path.join(self.folder, "dir", "file4.txt"))
+        FolderMonitor(self.project).scan_folder()
+
+        url = f"/api/projects/{self.project.pk}/changes/"
+        changes = []
+        next_url, params = url, {"page_size": 2}
+        while next_url:
+            with self.assertNumQueries(2):  # Project, page
+                page = self.client.get(next_url, params).json()
+            changes.extend(page["results"])
+            next_url, params = page["next"], None
+        self.assertEqual(len(changes), 7)
+        self.assertEqual(len({c["id"] for c in changes}), 7)
+        self.assertEqual(
+            [c["kind"] for c in changes[:2]], ["DELETED", "ADDED"]
+        )  # Second scan first, newest rows first within it
+
+        def paths(**params):
+            results = self.client.get(url, params).json()["results"]
+            return sorted(c["path"] for c in results)
+
+        deleted = os.path.join("dir", "file4.txt")
+        self.assertEqual(paths(kind="DELETED"), [deleted])
+        self.assertEqual(
+            paths(path="dir" + os.sep),
+            sorted([os.path.join("dir", f"file{i}.txt") for i in range(5)] + [deleted]),
+        )
+        self.assertEqual(paths(path=deleted, end=first_scan.isoformat()), [])
+        self.assertEqual(
+            paths(path=deleted, start=first_scan.isoformat()), [deleted] * 2
+        )
+        self.assertEqual(len(paths(start=first_scan.date().isoformat())), 7)
+        self.assertEqual(self.client.get(url, {"start": "Tuesday"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"kind": "MOVED"}).status_code, 400)
+
+    def test_old_changes_are_pruned(self):
+        self.write_file("a.txt")
+        self.write_file("b.txt")
+        FolderMonitor(self.project).scan_folder()
+        FileChange.objects.filter(path="a.txt").update(
+            timestamp=timezone.now() - timedelta(days=40)
+        )
+        self.assertEqual(prune_file_changes(retention_days=0), 0)
+        self.assertEqual(prune_file_changes(retention_days=30, batch_size=1), 1)
+        self.assertEqual(
+            list(FileChange.objects.values_list("path", flat=True)), ["b.txt"]
+        )
+
+
+class InventoryExportTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(7):
+            self.write_file(os.path.join(f"dir{i % 2}", f"file{i}.txt"), b"x" * i)
+        FolderMonitor(self.project).scan_folder()
+        other = Project.objects.create(name="Other", folder_path=self.folder)
+        FolderMonitor(other).scan_folder()
+        self.paths = sorted(
+            self.project.files.with_path().values_list("path", flat=True)
+        )
+
+    def test_streams_gzipped_csv_and_ndjson(self):
+        # One query for the files, whatever the chunk size
+        with self.settings(EXPORT_CHUNK_SIZE=3), self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/export/", {"project": self.project.pk, "type": "csv"}
+            )
+            data = gzip.decompress(b"".join(response.streaming_content))
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        self.assertEqual(sorted(r["path"] for r in rows), self.paths)
+        self.assertEqual({r["project"] for r in rows}, {"Test"})
+        self.assertEqual(sum(int(r["size"]) for r in rows), 21)
+
+        response = self.client.get("/api/export/", {"type": "ndjson", "gzip": "0"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 14)
+        self.assertEqual(set(rows[0]), set(inventory_export.COLUMNS))
+
+        response = self.client.get("/api/export/", {"type": "parquet"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_writes_the_same_rows_with_any_chunk_size(self):
+        outputs = []
+        for chunk_size in (1, 4, 1000):
+            path = os.path.join(self.folder, f"inventory{chunk_size}.ndjson.gz")
+            call_command(
+                "export_inventory",
+                path,
+                format="ndjson",
+                chunk_size=chunk_size,
+                stdout=io.StringIO(),
+            )
+            with gzip.open(path, "rt") as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertEqual(len(outputs[0].splitlines()), 14)
+
+
+class DirectoryRollupTests(ScanTestCase):
+    def rollups(self):
+        return {
+            d.path: (d.total_files, d.total_size)
+            for d in self.project.directories.all()
+        }
+
+    def test_subtree_matches_path_prefixes_exactly(self):
+        for folder in ["src/lib", "src/lib/x", "Src/lib", "src.bak", "src0", "srcx"]:
+            self.write_file(os.path.join(folder, "f.txt"))
+        FolderMonitor(self.project).scan_folder()
+        subtree = self.project.directories.subtree("src").values_list("path", flat=True)
+        self.assertEqual(
+            sorted(subtree),
+            ["src", os.path.join("src", "lib"), os.path.join("src", "lib", "x")],
+        )
+
+    def test_rollups_follow_scans_and_drive_the_tree(self):
+        self.write_file("top.txt", b"1")
+        self.write_file("src/a.py", b"22")
+        self.write_file("src/lib/b.py", b"333")
+        self.write_file("docs/c.md", b"4444")
+        FolderMonitor(self.project).scan_folder()
+        self.assertEqual(
+            self.rollups(),
+            {
+                ".": (4, 10),
+                "src": (2, 5),
+                os.path.join("src", "lib"): (1, 3),
+                "docs": (1, 4),
+            },
+        )
+
+        self.write_file("src/lib/b.py", b"33333")
+        self.write_file("src/lib/new/d.py", b"55")
+        os.remove(os.path.join(self.folder, "docs", "c.md"))
+        FolderMonitor(self.project, low_memory=True).scan_folder()
+        updated = self.rollups()
+        self.assertEqual(updated["."], (4, 10))
+        self.assertEqual(updated["src"], (3, 9))
+        self.assertEqual(updated["docs"], (0, 0))
+
+        # Incremental updates agree with recomputing every folder
+        DirectoryRollup(self.project).rebuild()
+        self.assertEqual(self.rollups(), updated)
+
+        url = f"/api/projects/{self.project.pk}/tree/"
+        with self.assertNumQueries(3):
+            root = self.client.get(url).json()
+        self.assertEqual((root["total_files"], root["own_files"]), (4, 1))
+        self.assertEqual([c["name"] for c in root["children"]], ["src", "docs"])
+
+        lib = self.client.get(url, {"path": os.path.join("src", "lib")}).json()
+        self.assertEqual((lib["total_size"], lib["own_size"]), (7, 5))
+        self.assertEqual(lib["children"][0]["path"], os.path.join("src", "lib", "new"))
+        self.assertEqual(self.client.get(url, {"path": "nope"}).status_code, 404)
+
+
+class ResponseCacheTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.write_file("a.txt", b"aaa")
+        FolderMonitor(self.project).scan_folder()
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def test_responses_are_cached_until_the_project_changes(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):  # Only the version is read
+            second = self.client.get(self.url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Scans replace the version of the project and of the project list
+        self.client.get("/api/projects/")
+        self.write_file("b.txt", b"bb")
+        FolderMonitor(self.project).scan_folder()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_files"], 2)
+        self.assertEqual(len(response.json()["recent_activity"]), 2)
+        listed = self.client.get("/api/projects/").json()
+        self.assertEqual(listed[0]["total_files"], 2)
+
+        # So do changes to the project's tasks
+        etag = response["ETag"]
+        self.client.post(
+            "/api/projects/tasks/", {"title": "Check", "project": self.project.pk}
+        )
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+        counters = self.client.get("/api/stats/cache/").json()
+        self.assertEqual(
+            (counters["hits"], counters["misses"], counters["not_modified"]),
+            (1, 5, 2),
+        )
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class EndpointQueryTests(ScanTestCase):
+    def add_rows(self, scans):
+        """Scans adding files, folders, activity logs and scan runs"""
+        for i in range(scans):
+            count = self.project.files.count()
+            for j in range(count, count + 5):
+                self.write_file(f"dir{j % 3}/file{j}.txt")
+            Project.objects.create(name=f"Other {count}", folder_path=self.folder)
+            Task.objects.create(title=f"Task {count}", project=self.project)
+            FolderMonitor(self.project).scan_folder()
+
+    def test_query_counts_dont_grow_with_rows(self):
+        root = ProjectsRoot.objects.create(name="Root", path=self.folder)
+        project = f"/api/projects/{self.project.pk}"
+        endpoints = [
+            ("/api/projects/", 1),
+            (f"{project}/", 2),  # Project, recent activity
+            (f"{project}/activity/?days=30", 4),  # Project, summary, buckets, logs
+            (f"{project}/files/?page_size=1000", 2),  # Project, page
+            (f"{project}/tree/", 3),  # Project, folder, subfolders
+            ("/api/roots/", 1),
+            (f"/api/roots/{root.pk}/", 1),
+            ("/api/scan-runs/", 1),
+            ("/api/scan-jobs/", 1),
+            ("/api/stats/", 1),
+        ]
+        self.add_rows(1)
+        for rows in ("few", "more"):
+            for url, queries in endpoints:
+                with self.subTest(url=url, rows=rows), self.assertNumQueries(queries):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+            self.add_rows(3)
+
+    def test_lean_serializers_match_model_serializers(self):
+        self.add_rows(2)
+        for time_zone in ["UTC", "America/New_York"]:
+            with self.subTest(time_zone=time_zone), self.settings(TIME_ZONE=time_zone):
+                listed = self.client.get("/api/projects/").json()
+                expected = [
+                    dict(row)
+                    for row in ProjectSerializer(Project.objects.all(), many=True).data
+                ]
+                self.assertEqual(listed, json.loads(JSONRenderer().render(expected)))
+
+
+class ActivitySummaryTests(ScanTestCase):
+    def test_summary_and_buckets_are_aggregated(self):
+        now = timezone.now()
+        for days_ago, added, size_change in [(0, 2, 10), (0, 1, -4), (8, 5, 100)]:
+            log = ActivityLog.objects.create(
+                project=self.project, files_added=added, size_change=size_change
+            )
+            ActivityLog.objects.filter(pk=log.pk).update(
+                timestamp=now - timedelta(days=days_ago)
+            )
+
+        url = f"/api/projects/{self.project.pk}/activity/"
+        # Project, summary, buckets and logs; ranges ending now aren't cached
+        with self.assertNumQueries(4):
+            data = self.client.get(url, {"days": 30}).json()
+        self.assertEqual(len(data["logs"]), 3)
+        summary = data["summary"]
+        self.assertEqual((summary["total_added"], summary["net_size_change"]), (8, 106))
+        self.assertEqual(summary["active_days"], 2)
+        self.assertEqual(
+            [(b["files_added"], b["size_change"], b["scans"]) for b in data["buckets"]],
+            [(5, 100, 1), (3, 6, 2)],
+        )
+        self.assertEqual(data["buckets"][1]["bucket"], str(now.date()))
+
+        # Fixed ranges are, until the project changes
+        dates = {"start_date": str(now.date() - timedelta(days=30))}
+        dates["end_date"] = str(now.date() + timedelta(days=1))
+        self.assertEqual(self.client.get(url, dates).json()["logs"], data["logs"])
+        with self.assertNumQueries(1):
+            self.client.get(url, dates)
+
+        month = self.client.get(url, {"days": 30, "interval": "month"}).json()
+        self.assertEqual(
+            sum(b["files_added"] for b in month["buckets"]), summary["total_added"]
+        )
+        self.assertEqual(self.client.get(url, {"interval": "hour"}).status_code, 400)
+
+
+@skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class ProjectWatcherTests(ScanTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write_file("keep.txt")
+        self.write_file("old.txt")
+        self.watcher = ProjectWatcher(debounce=0, flush_interval=3600)
+        self.watcher.start()
+        self.addCleanup(self.watcher.close)
+        self.watcher.step(timeout=0)  # Reconciliation scan
+
+    def wait_for(self, condition):
+        for _ in range(20):
+            self.watcher.step(timeout=0.1)
+            if condition():
+                return
+        self.fail("Watcher did not record the change")
+
+    def test_events_are_applied_and_flushed_as_activity(self):
+        self.assertEqual(self.project.files.count(), 2)
+        activity_before = ActivityLog.objects.count()
+
+        self.write_file("sub/deep/new.txt", b"new!")
+        self.write_file("keep.txt", b"changed")
+        os.remove(os.path.join(self.folder, "old.txt"))
+        self.wait_for(
+            lambda: sorted(
+                self.project.files.with_path().values_list("path", flat=True)
+            )
+            == ["keep.txt", os.path.join("sub", "deep", "new.txt")]
+            and self.project.files.get(filename="keep.txt").size == 7
+        )
+
+        # The new folders are watched too
+        self.write_file("sub/deep/later.txt")
+        self.wait_for(lambda: self.project.files.count() == 3)
+
+        shutil.rmtree(os.path.join(self.folder, "sub"))
+        self.wait_for(lambda: self.project.files.count() == 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.total_files, self.project.total_size), (1, 7))
+        root = self.project.directories.get(path=".")
+        self.assertEqual((root.total_files, root.total_size), (1, 7))
+
+        self.assertEqual(ActivityLog.objects.count(), activity_before)
+        self.watcher.flush_activity()
+        log = ActivityLog.objects.latest("timestamp")
+        self.assertEqual(
+            (log.files_added, log.files_modified, log.files_deleted), (2, 1, 3)
+        )
+
+    def test_rescans_after_events_keep_the_totals(self):
+        self.write_file("new.txt", b"new")
+        self.wait_for(lambda: self.project.files.count() == 3)
+
+        # The watcher's own copy of the project predates the event
+        self.watcher.reconcile([self.project.pk])
+        stats = GlobalStats.load()
+        self.assertEqual((stats.total_files, stats.total_size), (3, 11))
+        recount_totals()
+        stats = GlobalStats.load()
+        self.assertEqual((stats.total_files, stats.total_size), (3, 11))
+
+    def test_falls_back_to_polling_at_the_watch_limit(self):
+        other = Project.objects.create(name="Other", folder_path=self.folder)
+        full = OSError(errno.ENOSPC, "No space left on device")
+        with mock.patch.object(self.watcher.inotify, "add_watch", side_effect=full):
+            self.watcher.refresh_projects()
+        self.assertIn(other.pk, self.watcher.polled)
+        self.assertNotIn(self.project.pk, self.watcher.polled)
+
+
+class ScanSchedulerTests(ScanTestCase):
+    def test_adaptive_intervals_and_concurrency_cap(self):
+        now = timezone.now()
+        scheduler = ScanScheduler(interval_minutes=60, max_concurrent=2, jitter=0)
+        hour = timedelta(hours=1)
+        self.assertEqual(scheduler.interval_for(5, now, now), hour / 2)
+        self.assertEqual(scheduler.interval_for(1, now, now), hour)
+        self.assertEqual(scheduler.interval_for(0, now, now), 2 * hour)
+        self.assertEqual(
+            scheduler.interval_for(0, now - timedelta(weeks=10), now), 8 * hour
+        )
+
+        # Changes often, scanned 40 minutes ago: due
+        busy = self.project
+        for _ in range(5):
+            ActivityLog.objects.create(project=busy, files_modified=1)
+        # No changes, scanned 90 minutes ago: not due for two hours
+        dormant = Project.objects.create(name="Dormant", folder_path=self.folder)
+        Project.objects.filter(pk=busy.pk).update(
+            last_scan=now - 40 * timedelta(minutes=1)
+        )
+        Project.objects.filter(pk=dormant.pk).update(last_scan=now - 1.5 * hour)
+        new = Project.objects.create(name="New", folder_path=self.folder)
+        third = Project.objects.create(name="Third", folder_path=self.folder)
+
+        now = timezone.now()
+        jobs = scheduler.tick(now)
+        self.assertEqual(len(jobs), 2)
+        self.assertNotIn(dormant.pk, {job.project_id for job in jobs})
+
+        # The cap is reached until a job finishes
+        self.assertEqual(scheduler.tick(now), [])
+        ScanJob.objects.filter(pk=jobs[0].pk).update(status=ScanJobStatus.COMPLETED)
+        jobs = scheduler.tick(now)
+        self.assertEqual(len(jobs), 1)
+        self.assertIn(jobs[0].project_id, {new.pk, third.pk, busy.pk})
+        self.assertEqual(ScanJob.objects.filter(project=dormant).count(), 0)
+
+    def test_failing_projects_back_off(self):
+        now = timezone.now()
+        scheduler = ScanScheduler(interval_minutes=60, max_concurrent=1, jitter=0)
+        Project.objects.filter(pk=self.project.pk).update(active=False)
+
+        # Never scanned successfully, so the most overdue without a backoff
+        failing = Project.objects.create(name="Failing", folder_path=self.folder)
+        Project.objects.filter(pk=failing.pk).update(
+            created_at=now - timedelta(days=30)
+        )
+        for minutes in (200, 10):
+            ScanJob.objects.create(
+                kind=ScanJobKind.PROJECT,
+                project=failing,
+                key=f"project:{failing.pk}",
+                status=ScanJobStatus.FAILED,
+                finished_at=now - timedelta(minutes=minutes),
+            )
+        healthy = Project.objects.create(name="Healthy", folder_path=self.folder)
+        ActivityLog.objects.create(project=healthy, files_modified=1)
+        Project.objects.filter(pk=healthy.pk).update(last_scan=now - timedelta(hours=2))
+
+        [job] = scheduler.tick(now)
+        self.assertEqual(job.project_id, healthy.pk)
+
+        # Two failures: retried two intervals after the last one
+        ScanJob.objects.filter(pk=job.pk).update(status=ScanJobStatus.COMPLETED)
+        later = now + timedelta(minutes=100)
+        Project.objects.filter(pk=healthy.pk).update(last_scan=later)
+        self.assertEqual(scheduler.tick(later), [])
+        [job] = scheduler.tick(later + timedelta(minutes=11))
+        self.assertEqual(job.project_id, failing.pk)
+
+    @override_settings(SCAN_INCREMENTAL=True)
+    def test_incremental_projects_get_periodic_full_scans(self):
+        now = timezone.now()
+        scheduler = ScanScheduler(
+            interval_minutes=60,
+            max_concurrent=1,
+            jitter=0,
+            full_interval_minutes=60 * 24,
+        )
+        for days, incremental in [(2, False), (0, True)]:
+            ScanRun.objects.create(
+                project=self.project,
+                incremental=incremental,
+                started_at=now - timedelta(days=days, hours=3),
+                finished_at=now - timedelta(days=days, hours=3),
+            )
+        Project.objects.filter(pk=self.project.pk).update(
+            last_scan=now - timedelta(hours=3)
+        )
+
+        # Last full scan two days ago: the next one stats every file
+        [job] = scheduler.tick(now)
+        self.assertTrue(job.options["full"])
+
+        ScanJob.objects.filter(pk=job.pk).update(status=ScanJobStatus.COMPLETED)
+        ScanRun.objects.create(
+            project=self.project, incremental=False, started_at=now, finished_at=now
+        )
+        Project.objects.filter(pk=self.project.pk).update(last_scan=now)
+        [job] = scheduler.tick(now + timedelta(hours=3))
+        self.assertFalse(job.options["full"])
+
+
+class ScanCheckpointTests(ScanTestCase):
+    def test_interrupted_walk_resumes_after_the_last_checkpoint(self):
+        for folder in ["a", "a-b", "a/c", "b"]:
+            self.write_file(f"{folder}/file.txt")
+        self.write_file("top.txt")
+
+        walked = []
+
+        class Interrupted(Exception):
+            pass
+
+        class CrashingCheckpointer(ScanCheckpointer):
+            def folder_walked(self, path, *args):
+                walked.append(path)
+                super().folder_walked(path, *args)
+                self.save()  # Checkpoint after every folder
+                if path == "a":
+                    raise Interrupted
+
+        checkpointer = CrashingCheckpointer(self.project, False, 60)
+        monitor = FolderMonitor(self.project)
+        with self.assertRaises(Interrupted):
+            monitor.walk_folder(checkpointer=checkpointer)
+        self.assertEqual(walked, [".", "a-b", "a"])
+        self.assertEqual(self.project.scan_checkpoint.last_folder, "a")
+
+        # The resumed walk only visits the remaining folders
+        walked.clear()
+        checkpointer = ScanCheckpointer(self.project, False, 60)
+        checkpointer.folder_walked = lambda path, *args: walked.append(path)
+        files, directories = monitor.walk_folder(checkpointer=checkpointer)
+        self.assertEqual(walked, [os.path.join("a", "c"), "b"])
+        self.assertEqual(len(files), 5)
+        self.assertEqual(len(directories), 5)
+
+        # Applying the scan removes the checkpoint in the same transaction
+        result = monitor.apply_changes(monitor.collect_changes(files, directories))
+        self.assertEqual(result["files_added"], 5)
+        self.assertFalse(ScanCheckpoint.objects.exists())
+        self.assertFalse(ScanCheckpointChunk.objects.exists())
@@ -1,15 +1,27 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views import ScanAllView
+from .views import (
+    ScanAllView,
+    DuplicatesView,
+    InventoryExportView,
+    StatsView,
+    CacheStatsView,
+)
 
 router = DefaultRouter()
 router.register(r"roots", views.ProjectsRootViewSet)
 router.register(r"projects", views.ProjectViewSet)
+router.register(r"scan-jobs", views.ScanJobViewSet)
+router.register(r"scan-runs", views.ScanRunViewSet)
 
 app_name = "core"
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("stats/", StatsView.as_view(), name="stats"),
+    path("stats/cache/", CacheStatsView.as_view(), name="cache-stats"),
     path("scan-all/", ScanAllView.as_view(), name="scan-all"),
+    path("duplicates/", DuplicatesView.as_view(), name="duplicates"),
+    path("export/", InventoryExportView.as_view(), name="export"),
 ]
@@ -1,19 +1,57 @@
+import json
+import os
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 from rest_framework.views import APIView
 
-from .models import ProjectsRoot, Project, FileRecord, ActivityLog
+from .models import (
+    ProjectsRoot,
+    Project,
+    GlobalStats,
+    FileRecord,
+    FileChange,
+    FileChangeKind,
+    ActivityLog,
+    ScanJob,
+    ScanJobKind,
+    ScanRun,
+)
 from .serializers import (
     ProjectsRootSerializer,
+    GlobalStatsSerializer,
     ProjectSerializer,
+    ProjectListSerializer,
     ProjectDetailSerializer,
+    DirectorySerializer,
     FileRecordSerializer,
+    FileChangeSerializer,
     ActivityLogSerializer,
+    ScanJobSerializer,
+    ScanRunSerializer,
+)
+from .pagination import (
+    FileCursorPagination,
+    FileChangeCursorPagination,
+    ScanRunCursorPagination,
 )
-from .services.folder_monitor import ProjectsMonitor, FolderMonitor
+from .services.activity_summary import ActivitySummary, BUCKET_INTERVALS
+from .services.duplicate_finder import DuplicateFinder
+from .services.inventory_export import InventoryExport, STREAMED_FORMATS
+from .services.response_cache import (
+    cache_counters,
+    cache_response,
+    global_version,
+    project_range_version,
+    project_version,
+)
+from .services.scan_jobs import enqueue_scan
 
 
 class ProjectsRootViewSet(viewsets.ModelViewSet):
@@ -27,29 +65,11 @@ class ProjectsRootViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def scan(self, request, pk=None):
         """
-        Trigger a scan of the projects root folder to discover projects
+        Queue a scan of the projects root folder to discover projects
         """
         root = self.get_object()
-
-        try:
-            monitor = ProjectsMonitor()
-            result = monitor.scan_projects_root(root)
-
-            return Response(
-                {
-                    "success": True,
-                    "message": "Scan completed successfully",
-                    "result": result,
-                }
-            )
-        except Exception as e:
-            return Response(
-                {
-                    "success": False,
-                    "message": f"Error scanning projects root: {str(e)}",
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        job, created = enqueue_scan(ScanJobKind.ROOT, root=root)
+        return _scan_job_response(job, created)
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -59,62 +79,161 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     queryset = Project.objects.all()
 
+    def get_queryset(self):
+        queryset = Project.objects.all()
+        if self.action == "retrieve":
+            # Recent activity for ProjectDetailSerializer in one query
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "activities",
+                    queryset=ActivityLog.objects.order_by("-timestamp")[:5],
+                    to_attr="recent_activity",
+                )
+            )
+        return queryset
+
     def get_serializer_class(self):
+        if self.action == "list":
+            return ProjectListSerializer
         if self.action == "retrieve":
             return ProjectDetailSerializer
         return ProjectSerializer
 
+    @cache_response(global_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(project_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=["post"])
     def scan(self, request, pk=None):
         """
-        Trigger a scan of the project folder
+        Queue a scan of the project folder
+
+        Pass "full": true to stat every file even when incremental scans
+        are enabled.
         """
         project = self.get_object()
-
-        try:
-            monitor = FolderMonitor(project)
-            result = monitor.scan_folder()
-
-            return Response(
-                {
-                    "success": True,
-                    "message": "Scan completed successfully",
-                    "result": result,
-                }
-            )
-        except Exception as e:
-            return Response(
-                {"success": False, "message": f"Error scanning project: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        full = str(request.data.get("full", "")).lower() in ("1", "true")
+        job, created = enqueue_scan(ScanJobKind.PROJECT, project=project, full=full)
+        return _scan_job_response(job, created)
 
     @action(detail=True, methods=["get"])
     def files(self, request, pk=None):
         """
-        Get files for a project
+        Get files for a project, ordered by folder, then filename
+
+        Files are returned a page at a time; follow the "next" link to get
+        the rest. Pass stream=ndjson to get every file in one response
+        instead, as one JSON object per line.
         """
         project = self.get_object()
 
         # Support filtering
         filename = request.query_params.get("filename", None)
 
-        files = FileRecord.objects.filter(project=project)
+        files = FileRecord.objects.filter(project=project).with_path()
         if filename:
             files = files.filter(filename__icontains=filename)
 
-        # Support pagination
-        page = self.paginate_queryset(files)
-        if page is not None:
-            serializer = FileRecordSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        if request.query_params.get("stream") == "ndjson":
+            return _stream_ndjson(
+                files.order_by(*FileCursorPagination.ordering).values(
+                    *FileRecordSerializer.Meta.fields
+                )
+            )
+
+        paginator = FileCursorPagination()
+        page = paginator.paginate_queryset(files, request, view=self)
+        serializer = FileRecordSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def tree(self, request, pk=None):
+        """
+        Get a folder of the project with its subfolders, largest first
+
+        The folder is given by the path parameter, relative to the project
+        folder ("." by default). Every folder carries the file count, size
+        and newest modification time of its whole subtree, kept up to date
+        by the scanner, so only the folder and its direct children are read.
+        """
+        project = self.get_object()
+        path = request.query_params.get("path", ".")
+        directory = project.directories.filter(path=path).first()
+        if directory is None:
+            return Response(
+                {"error": f"Folder {path} not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-        serializer = FileRecordSerializer(files, many=True)
-        return Response(serializer.data)
+        children = directory.children.order_by("-total_size", "name")
+        data = DirectorySerializer(directory).data
+        data["children"] = DirectorySerializer(children, many=True).data
+        # Files directly in the folder, not in any subfolder
+        data["own_files"] = directory.total_files - sum(
+            child["total_files"] for child in data["children"]
+        )
+        data["own_size"] = directory.total_size - sum(
+            child["total_size"] for child in data["children"]
+        )
+        return Response(data)
 
     @action(detail=True, methods=["get"])
+    def changes(self, request, pk=None):
+        """
+        Get the file changes of a project, newest first
+
+        Filter by time with start and end (ISO dates or datetimes, end not
+        included), by kind (ADDED, MODIFIED or DELETED) and by path, which
+        matches the path and everything under it. Changes are returned a
+        page at a time; follow the "next" link to get the rest.
+        """
+        project = self.get_object()
+        changes = FileChange.objects.filter(project=project)
+
+        for param, lookup in [("start", "timestamp__gte"), ("end", "timestamp__lt")]:
+            value = request.query_params.get(param, None)
+            if value:
+                moment = _parse_moment(value)
+                if moment is None:
+                    return Response(
+                        {"error": f"{param} must be an ISO date or datetime"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                changes = changes.filter(**{lookup: moment})
+
+        kind = request.query_params.get("kind", None)
+        if kind:
+            if kind not in FileChangeKind.values:
+                return Response(
+                    {
+                        "error": f"kind must be one of {', '.join(FileChangeKind.values)}"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            changes = changes.filter(kind=kind)
+
+        path = request.query_params.get("path", None)
+        if path:
+            path = path.rstrip(os.sep)
+            changes = changes.filter(Q(path=path) | Q(path__startswith=path + os.sep))
+
+        paginator = FileChangeCursorPagination()
+        page = paginator.paginate_queryset(changes, request, view=self)
+        serializer = FileChangeSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    @cache_response(project_range_version)
     def activity(self, request, pk=None):
         """
-        Get activity logs for a project
+        Get activity logs for a project with their summary
+
+        The response also has the totals per day, week or month (interval
+        parameter, "day" by default) for charting.
         """
         project = self.get_object()
 
@@ -143,41 +262,59 @@ class ProjectViewSet(viewsets.ModelViewSet):
             start_date = timezone.now() - timedelta(days=30)
             end_date = timezone.now()
 
+        interval = request.query_params.get("interval", "day")
+        if interval not in BUCKET_INTERVALS:
+            return Response(
+                {"error": f"interval must be one of {', '.join(BUCKET_INTERVALS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Summary and chart buckets are aggregated by the database
+        activity = ActivitySummary(start_date, end_date, projects=[project])
+        extra = {
+            "summary": activity.summary(),
+            "buckets": activity.buckets(interval),
+        }
+
         # Get activity logs
-        activity_logs = ActivityLog.objects.filter(
-            project=project, timestamp__gte=start_date, timestamp__lte=end_date
-        ).order_by("timestamp")
+        activity_logs = activity.logs.order_by("timestamp")
 
         # Support pagination
         page = self.paginate_queryset(activity_logs)
         if page is not None:
             serializer = ActivityLogSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            response.data.update(extra)
+            return response
 
         serializer = ActivityLogSerializer(activity_logs, many=True)
+        return Response({"logs": serializer.data, **extra})
+
+
+class StatsView(APIView):
+    """
+    API endpoint for the totals of all projects
+    """
+
+    @cache_response(global_version)
+    def get(self, request):
+        """
+        Get the number of projects and their files and size, kept up to
+        date by the scans so no projects have to be read
+        """
+        return Response(GlobalStatsSerializer(GlobalStats.load()).data)
 
-        # Calculate summary stats
-        total_added = sum(log.files_added for log in activity_logs)
-        total_modified = sum(log.files_modified for log in activity_logs)
-        total_deleted = sum(log.files_deleted for log in activity_logs)
-        net_size_change = sum(log.size_change for log in activity_logs)
-
-        return Response(
-            {
-                "logs": serializer.data,
-                "summary": {
-                    "period_start": start_date,
-                    "period_end": end_date,
-                    "total_added": total_added,
-                    "total_modified": total_modified,
-                    "total_deleted": total_deleted,
-                    "net_size_change": net_size_change,
-                    "active_days": activity_logs.values("timestamp__date")
-                    .distinct()
-                    .count(),
-                },
-            }
-        )
+
+class CacheStatsView(APIView):
+    """
+    API endpoint for the response cache counters
+    """
+
+    def get(self, request):
+        """
+        Get the hits, misses and 304 responses of the cached endpoints
+        """
+        return Response(cache_counters())
 
 
 class ScanAllView(APIView):
@@ -186,20 +323,192 @@ class ScanAllView(APIView):
     """
 
     def post(self, request):
-        monitor = ProjectsMonitor()
+        """
+        Queue project discovery on every root followed by a scan of all
+        active projects
+        """
+        full = str(request.data.get("full", "")).lower() in ("1", "true")
+        job, created = enqueue_scan(ScanJobKind.ALL, full=full)
+        return _scan_job_response(job, created)
+
+
+class DuplicatesView(APIView):
+    """
+    API endpoint for duplicate files across projects
+    """
+
+    def get(self, request):
+        """
+        Report duplicate clusters and reclaimable bytes per project and root
+
+        Only compares hashes already stored by scans, so no file is read
+        within the request; the find_duplicates command also reads and hashes
+        the candidate files.
+        """
+        projects = Project.objects.all()
+
+        # Filter by project if specified
+        project_id = request.query_params.get("project", None)
+        if project_id:
+            projects = projects.filter(id=project_id)
+
+        # Filter by root if specified
+        root_id = request.query_params.get("root", None)
+        if root_id:
+            projects = projects.filter(root_id=root_id)
+
+        try:
+            min_size = int(request.query_params.get("min_size", 1))
+            limit = int(request.query_params.get("limit", 50))
+        except ValueError:
+            return Response(
+                {"error": "min_size and limit must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        finder = DuplicateFinder(
+            projects=projects, min_size=min_size, read_files=False, limit=limit
+        )
+        return Response(finder.find())
+
+
+class InventoryExportView(APIView):
+    """
+    API endpoint for downloading the file inventory
+    """
+
+    def get(self, request):
+        """
+        Stream every file of a project, a root or all projects as gzip'd
+        CSV (type=csv, the default) or NDJSON (type=ndjson)
+
+        Pass gzip=false for uncompressed output. Files are read and sent a
+        chunk at a time, so exports of any size use bounded memory; Parquet
+        files are written by the export_inventory command.
+        """
+        projects = Project.objects.all()
+
+        # Filter by project if specified
+        project_id = request.query_params.get("project", None)
+        if project_id:
+            projects = projects.filter(id=project_id)
+
+        # Filter by root if specified
+        root_id = request.query_params.get("root", None)
+        if root_id:
+            projects = projects.filter(root_id=root_id)
+
+        format = request.query_params.get("type", "csv")
+        if format not in STREAMED_FORMATS:
+            return Response(
+                {"error": f"type must be one of {', '.join(STREAMED_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        compress = request.query_params.get("gzip", "true").lower() not in (
+            "0",
+            "false",
+        )
+
+        filename = f"inventory.{format}" + (".gz" if compress else "")
+        response = StreamingHttpResponse(
+            InventoryExport(projects).stream(format, compress=compress),
+            content_type=(
+                "application/gzip"
+                if compress
+                else ("text/csv" if format == "csv" else "application/x-ndjson")
+            ),
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ScanJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for scan job status and progress
+    """
+
+    queryset = ScanJob.objects.all().order_by("-created_at")
+    serializer_class = ScanJobSerializer
 
-        # First discover projects
-        roots = ProjectsRoot.objects.all()
-        discovery_results = {}
+    def get_queryset(self):
+        queryset = ScanJob.objects.all().order_by("-created_at")
 
-        for root in roots:
-            result = monitor.scan_projects_root(root)
-            discovery_results[root.name] = result
+        # Filter by status if specified
+        job_status = self.request.query_params.get("status", None)
+        if job_status:
+            queryset = queryset.filter(status=job_status)
 
-        # Then scan files
-        scan_results = monitor.scan_all_projects()
+        # Filter by project if specified
+        project_id = self.request.query_params.get("project", None)
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
 
-        # Combine results
-        combined_results = {"discovery": discovery_results, "scan": scan_results}
+        return queryset
 
-        return Response(combined_results)
+
+class ScanRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the metrics of completed project scans
+    """
+
+    queryset = ScanRun.objects.select_related("project").order_by("-started_at")
+    serializer_class = ScanRunSerializer
+    pagination_class = ScanRunCursorPagination
+
+    def get_queryset(self):
+        queryset = ScanRun.objects.select_related("project").order_by("-started_at")
+
+        # Filter by project if specified
+        project_id = self.request.query_params.get("project", None)
+        if project_id:
+            queryset = queryset.filter(project_id=project_id)
+
+        return queryset
+
+
+def _scan_job_response(job, created):
+    """202 response pointing the client at the queued (or coalesced) job"""
+    return Response(
+        {
+            "success": True,
+            "message": "Scan queued" if created else "Scan already queued",
+            "job": ScanJobSerializer(job).data,
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def _parse_moment(value):
+    """
+    Parse an ISO datetime, or a date as its midnight, in the current time
+    zone unless one is given
+
+    Returns:
+        datetime: The moment, or None if the value isn't a date or datetime
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day, time())
+    except ValueError:  # Well formatted but not a real date
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _stream_ndjson(rows, chunk_size=2000):
+    """
+    Stream a values() queryset as newline-delimited JSON
+
+    Rows are fetched with iterator() and encoded as they are sent, so memory
+    use doesn't grow with the number of rows.
+    """
+    lines = (
+        json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        for row in rows.iterator(chunk_size=chunk_size)
+    )
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
@@ -1,7 +1,31 @@
 from django.contrib import admin
+from core.services.response_cache import touch_projects
 from .models import TaskCategory, Task, TaskComment
 
 
+class TouchProjectsAdmin(admin.ModelAdmin):
+    """Gives the projects of changed rows a new data version"""
+
+    project_path = "project"  # Lookup from the model to its project
+
+    def touched(self, queryset):
+        return queryset.values_list(self.project_path, flat=True)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        touch_projects(self.touched(self.model.objects.filter(pk=obj.pk)))
+
+    def delete_model(self, request, obj):
+        project_ids = list(self.touched(self.model.objects.filter(pk=obj.pk)))
+        super().delete_model(request, obj)
+        touch_projects(project_ids)
+
+    def delete_queryset(self, request, queryset):
+        project_ids = list(self.touched(queryset))
+        super().delete_queryset(request, queryset)
+        touch_projects(project_ids)
+
+
 @admin.register(TaskCategory)
 class TaskCategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "color")
@@ -9,14 +33,17 @@ class TaskCategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(TouchProjectsAdmin):
     list_display = ("title", "project", "category", "status", "priority", "due_date")
     list_filter = ("status", "priority", "category")
+    list_select_related = ("project", "category")
     search_fields = ("title", "description")
 
 
 @admin.register(TaskComment)
-class TaskCommentAdmin(admin.ModelAdmin):
+class TaskCommentAdmin(TouchProjectsAdmin):
+    project_path = "task__project"
     list_display = ("task", "text", "created_at")
     list_filter = ("created_at",)
+    list_select_related = ("task",)  # Shown by its title
     search_fields = ("text",)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.serializers import ReadOnlyRowSerializer
 from .models import TaskCategory, Task, TaskComment
 
 
@@ -15,6 +16,14 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
+class TaskCommentListSerializer(ReadOnlyRowSerializer):
+    """Lean read-only version of TaskCommentSerializer for comment lists"""
+
+    class Meta:
+        fields = TaskCommentSerializer.Meta.fields
+        sources = {"task": "task_id"}
+
+
 class TaskSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source="get_status_display", read_only=True)
     priority_display = serializers.CharField(
@@ -40,6 +49,60 @@ class TaskSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
+class TaskListSerializer(ReadOnlyRowSerializer):
+    """Lean read-only version of TaskSerializer for task lists"""
+
+    class Meta:
+        fields = TaskSerializer.Meta.fields
+        sources = {
+            "project": "project_id",
+            "category": "category_id",
+            "status_display": "get_status_display",
+            "priority_display": "get_priority_display",
+        }
+
+
+class TaskBatchItemSerializer(serializers.ModelSerializer):
+    """
+    One task of a bulk request
+
+    Projects and categories are given by id and checked against the ids the
+    view loaded for the whole batch (context["project_ids"] and
+    context["category_ids"]), so validating a batch doesn't query per task.
+    """
+
+    project = serializers.IntegerField(source="project_id")
+    category = serializers.IntegerField(
+        source="category_id", required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Task
+        fields = [
+            "title",
+            "description",
+            "project",
+            "category",
+            "status",
+            "priority",
+            "due_date",
+        ]
+
+    def validate_project(self, value):
+        if value not in self.context["project_ids"]:
+            raise serializers.ValidationError(
+                f'Invalid pk "{value}" - object does not exist.'
+            )
+        return value
+
+    def validate_category(self, value):
+        if value is not None and value not in self.context["category_ids"]:
+            raise serializers.ValidationError(
+                f'Invalid pk "{value}" - object does not exist.'
+            )
+        return value
+
+
 class TaskDetailSerializer(serializers.ModelSerializer):
     """Detailed task serializer with comments"""
 
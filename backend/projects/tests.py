@@ -1,3 +1,182 @@
+import json
+
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Project
+from .models import TaskCategory, Task, TaskComment
+from .serializers import TaskSerializer, TaskCommentSerializer
+
+
+class TaskEndpointQueryTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name="Test", folder_path="/tmp/test")
+        self.category = TaskCategory.objects.create(name="Scanning")
+        self.task = self.add_tasks(1)[0]
+
+    def add_tasks(self, count):
+        tasks = []
+        for i in range(count):
+            task = Task.objects.create(
+                title=f"Task {i}", project=self.project, category=self.category
+            )
+            TaskComment.objects.create(task=task, text="First")
+            TaskComment.objects.create(task=task, text="Second")
+            tasks.append(task)
+        return tasks
+
+    def test_query_counts_dont_grow_with_rows(self):
+        endpoints = [
+            ("/api/projects/tasks/", 1),
+            (f"/api/projects/tasks/?project={self.project.pk}", 1),
+            (f"/api/projects/tasks/{self.task.pk}/", 2),  # Task and category, comments
+            (f"/api/projects/tasks/{self.task.pk}/comments/", 2),
+            ("/api/projects/comments/", 1),
+            ("/api/projects/categories/", 1),
+        ]
+        for rows in ("few", "more"):
+            for url, queries in endpoints:
+                with self.subTest(url=url, rows=rows), self.assertNumQueries(queries):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+            self.add_tasks(5)
+            TaskComment.objects.create(task=self.task, text="More")
+
+    def test_lean_serializers_match_model_serializers(self):
+        self.add_tasks(2)
+        for url, serializer, queryset in [
+            ("/api/projects/tasks/", TaskSerializer, Task.objects.all()),
+            (
+                "/api/projects/comments/",
+                TaskCommentSerializer,
+                TaskComment.objects.all(),
+            ),
+        ]:
+            expected = [dict(row) for row in serializer(queryset, many=True).data]
+            self.assertEqual(
+                self.client.get(url).json(),
+                json.loads(JSONRenderer().render(expected)),
+            )
+
+
+class BulkTaskTests(TestCase):
+    url = "/api/projects/tasks/"
+
+    def setUp(self):
+        self.project = Project.objects.create(name="Test", folder_path="/tmp/test")
+        self.other = Project.objects.create(name="Other", folder_path="/tmp/other")
+        self.category = TaskCategory.objects.create(name="Scanning")
+
+    def bulk_create(self, count, **fields):
+        tasks = [
+            {"title": f"Task {i}", "project": self.project.pk, **fields}
+            for i in range(count)
+        ]
+        return self.client.post(f"{self.url}bulk_create/", tasks, "application/json")
+
+    def test_query_counts_dont_grow_with_batch_size(self):
+        # Projects, categories, insert and project versions in a savepoint
+        for count in (5, 50):
+            with self.subTest(count=count), self.assertNumQueries(6):
+                response = self.bulk_create(count, category=self.category.pk)
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(Task.objects.count(), 55)
+
+        # Tasks, projects (no categories given), update and project versions
+        for count in (5, 50):
+            changes = [
+                {"id": pk, "status": "COMPLETED", "project": self.other.pk}
+                for pk in Task.objects.values_list("pk", flat=True)[:count]
+            ]
+            with self.subTest(count=count), self.assertNumQueries(6):
+                response = self.client.patch(
+                    f"{self.url}bulk_update/", changes, "application/json"
+                )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Task.objects.filter(status="COMPLETED", project=self.other).count(), 50
+        )
+
+        # Projects of the tasks, then the delete (tasks, comments, tasks) and
+        # project versions
+        for task in Task.objects.all()[:10]:
+            TaskComment.objects.create(task=task, text="Note")
+        for count in (5, 50):
+            ids = list(Task.objects.values_list("pk", flat=True)[:count])
+            with self.subTest(count=count), self.assertNumQueries(7):
+                response = self.client.post(
+                    f"{self.url}bulk_delete/", {"ids": ids}, "application/json"
+                )
+            self.assertEqual(response.json(), {"deleted": count})
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(TaskComment.objects.exists())
+
+    def test_invalid_items_are_reported_and_nothing_is_written(self):
+        tasks = [
+            {"title": "Good", "project": self.project.pk},
+            {"title": "", "project": self.project.pk},
+            {"title": "Lost", "project": 999, "category": 999},
+            {"title": "Bad status", "project": self.project.pk, "status": "NOPE"},
+        ]
+        response = self.client.post(
+            f"{self.url}bulk_create/", tasks, "application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = {e["index"]: e["errors"] for e in response.json()["errors"]}
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertEqual(sorted(errors[2]), ["category", "project"])
+        self.assertFalse(Task.objects.exists())
+
+        task = self.bulk_create(1).json()["tasks"][0]
+        changes = [
+            {"id": task["id"], "priority": "HIGH"},
+            {"id": task["id"], "priority": "LOW"},
+            {"id": 999, "priority": "HIGH"},
+        ]
+        response = self.client.patch(
+            f"{self.url}bulk_update/", changes, "application/json"
+        )
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1, 2])
+        self.assertEqual(Task.objects.get().priority, "MEDIUM")
+
+        # Ids that aren't numbers, such as lists or true for 1, are errors
+        changes = [{"id": bad, "priority": "HIGH"} for bad in [[1], True, "1", None]]
+        response = self.client.patch(
+            f"{self.url}bulk_update/", changes, "application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [e["errors"]["id"] for e in response.json()["errors"]],
+            [["A task id is required."]] * 4,
+        )
+        self.assertEqual(Task.objects.get().priority, "MEDIUM")
+
+        response = self.client.post(
+            f"{self.url}bulk_delete/", {"ids": [task["id"], 999]}, "application/json"
+        )
+        self.assertEqual(response.json()["missing"], [999])
+        for bad in [True, [task["id"]]]:
+            response = self.client.post(
+                f"{self.url}bulk_delete/", {"ids": [bad]}, "application/json"
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertTrue(Task.objects.exists())
+
+        response = self.client.post(
+            f"{self.url}bulk_create/", {"title": "One"}, "application/json"
+        )
+        self.assertEqual(response.status_code, 400)
 
-# Create your tests here.
+    def test_bulk_changes_replace_project_versions(self):
+        version = Project.objects.get(pk=self.project.pk).data_version
+        task = self.bulk_create(1).json()["tasks"][0]
+        self.assertNotEqual(
+            Project.objects.get(pk=self.project.pk).data_version, version
+        )
+        versions = dict(Project.objects.values_list("pk", "data_version"))
+        self.client.patch(
+            f"{self.url}bulk_update/",
+            [{"id": task["id"], "project": self.other.pk}],
+            "application/json",
+        )
+        for pk, version in Project.objects.values_list("pk", "data_version"):
+            self.assertNotEqual(version, versions[pk])
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
+router.include_root_view = False  # /api/projects/ is the core project list
 router.register(r"categories", views.TaskCategoryViewSet)
 router.register(r"tasks", views.TaskViewSet)
 router.register(r"comments", views.TaskCommentViewSet)
@@ -1,13 +1,19 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from core.models import Project
+from core.services.response_cache import touch_projects
 from .models import TaskCategory, Task, TaskComment
 from .serializers import (
     TaskCategorySerializer,
     TaskSerializer,
+    TaskListSerializer,
     TaskDetailSerializer,
+    TaskBatchItemSerializer,
     TaskCommentSerializer,
+    TaskCommentListSerializer,
 )
 
 
@@ -26,14 +32,20 @@ class TaskViewSet(viewsets.ModelViewSet):
     """
 
     queryset = Task.objects.all()
+    BULK_MAX_TASKS = 1000  # Tasks per bulk request
 
     def get_serializer_class(self):
+        if self.action == "list":
+            return TaskListSerializer
         if self.action == "retrieve":
             return TaskDetailSerializer
         return TaskSerializer
 
     def get_queryset(self):
         queryset = Task.objects.all()
+        if self.action == "retrieve":
+            # Category and comments for TaskDetailSerializer
+            queryset = queryset.select_related("category").prefetch_related("comments")
 
         # Filter by project if specified
         project_id = self.request.query_params.get("project", None)
@@ -57,6 +69,179 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def perform_create(self, serializer):
+        task = serializer.save()
+        touch_projects([task.project_id])
+
+    def perform_update(self, serializer):
+        project_id = serializer.instance.project_id
+        task = serializer.save()
+        touch_projects({project_id, task.project_id})
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        touch_projects([instance.project_id])
+
+    @action(detail=False, methods=["post"])
+    def bulk_create(self, request):
+        """
+        Create many tasks at once
+
+        Takes a list of tasks. All of them are validated before anything is
+        written; if any is invalid, nothing is created and the errors are
+        returned with the position of each failing task.
+        """
+        items, error = self._bulk_items(request.data)
+        if error is not None:
+            return error
+
+        serializers, errors = self._validate_batch(items)
+        if errors:
+            return _bulk_errors(errors)
+
+        tasks = [Task(**serializer.validated_data) for serializer in serializers]
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            touch_projects({task.project_id for task in tasks})
+        return Response(
+            {"tasks": TaskListSerializer(tasks, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["patch"])
+    def bulk_update(self, request):
+        """
+        Change many tasks at once
+
+        Takes a list of partial tasks with their id, such as
+        [{"id": 1, "status": "COMPLETED"}, ...]. All of them are validated
+        before anything is written; if any is invalid or not found, nothing
+        is changed and the errors are returned with the position of each
+        failing task.
+        """
+        items, error = self._bulk_items(request.data)
+        if error is not None:
+            return error
+
+        ids = [item.get("id") for item in items]
+        tasks = Task.objects.in_bulk([i for i in ids if _is_id(i)])
+        errors = {}
+        seen = set()
+        for index, task_id in enumerate(ids):
+            if not _is_id(task_id):
+                errors[index] = {"id": ["A task id is required."]}
+                continue
+            if task_id not in tasks:
+                errors[index] = {"id": ["Task not found."]}
+            elif task_id in seen:
+                errors[index] = {"id": ["Task is listed more than once."]}
+            seen.add(task_id)
+
+        instances = [tasks.get(task_id) if _is_id(task_id) else None for task_id in ids]
+        serializers, invalid = self._validate_batch(items, instances)
+        errors.update(
+            (index, {**invalid[index], **errors.get(index, {})}) for index in invalid
+        )
+        if errors:
+            return _bulk_errors(errors)
+
+        fields = {"updated_at"}
+        project_ids = set()
+        now = timezone.now()
+        for task, serializer in zip(instances, serializers):
+            project_ids.add(task.project_id)
+            for field, value in serializer.validated_data.items():
+                setattr(task, field, value)
+                fields.add(field)
+            task.updated_at = now
+            project_ids.add(task.project_id)
+
+        with transaction.atomic():
+            Task.objects.bulk_update(instances, sorted(fields))
+            touch_projects(project_ids)
+        return Response({"tasks": TaskListSerializer(instances, many=True).data})
+
+    @action(detail=False, methods=["post"])
+    def bulk_delete(self, request):
+        """
+        Delete many tasks at once, with their comments
+
+        Takes {"ids": [...]}. If any id is not found, nothing is deleted and
+        the missing ids are returned.
+        """
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(_is_id(i) for i in ids):
+            return Response(
+                {"error": 'Expected {"ids": [task ids]}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > self.BULK_MAX_TASKS:
+            return _too_many_tasks(self.BULK_MAX_TASKS)
+
+        project_ids = dict(Task.objects.filter(pk__in=ids).values_list("id", "project"))
+        missing = sorted(set(ids) - project_ids.keys())
+        if missing:
+            return Response(
+                {"error": "Tasks not found", "missing": missing},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            deleted = (
+                Task.objects.filter(pk__in=ids).delete()[1].get("projects.Task", 0)
+            )
+            touch_projects(set(project_ids.values()))
+        return Response({"deleted": deleted})
+
+    def _bulk_items(self, data):
+        """
+        Check the body of a bulk request is a list of objects
+
+        Returns:
+            tuple: (items, None) or (None, error response)
+        """
+        if not isinstance(data, list) or not all(isinstance(i, dict) for i in data):
+            return None, Response(
+                {"error": "Expected a list of tasks"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(data) > self.BULK_MAX_TASKS:
+            return None, _too_many_tasks(self.BULK_MAX_TASKS)
+        return data, None
+
+    def _validate_batch(self, items, instances=None):
+        """
+        Validate the tasks of a bulk request in one pass
+
+        The projects and categories they refer to are looked up with one
+        query each for the whole batch.
+
+        Args:
+            items: Task data from the request
+            instances: Tasks being changed, one per item (None for ones not
+                found), or None to create new tasks
+
+        Returns:
+            tuple: (serializers, {position: errors} of the invalid items)
+        """
+        context = {
+            "project_ids": _existing_ids(Project, items, "project"),
+            "category_ids": _existing_ids(TaskCategory, items, "category"),
+        }
+        serializers = []
+        errors = {}
+        for index, item in enumerate(items):
+            serializer = TaskBatchItemSerializer(
+                instances[index] if instances else None,
+                data=item,
+                partial=instances is not None,
+                context=context,
+            )
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+            serializers.append(serializer)
+        return serializers, errors
+
     @action(detail=True, methods=["post"])
     def add_comment(self, request, pk=None):
         """
@@ -69,6 +254,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = TaskCommentSerializer(data=data)
         if serializer.is_valid():
             serializer.save()
+            touch_projects([task.project_id])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -91,6 +277,11 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
     queryset = TaskComment.objects.all()
     serializer_class = TaskCommentSerializer
 
+    def get_serializer_class(self):
+        if self.action == "list":
+            return TaskCommentListSerializer
+        return TaskCommentSerializer
+
     def get_queryset(self):
         queryset = TaskComment.objects.all()
 
@@ -100,3 +291,50 @@ class TaskCommentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(task_id=task_id)
 
         return queryset
+
+    def perform_create(self, serializer):
+        comment = serializer.save()
+        touch_projects([comment.task.project_id])
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        touch_projects([comment.task.project_id])
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        touch_projects([instance.task.project_id])
+
+
+def _is_id(value):
+    """Whether a value from a JSON body is an id; JSON true and false aren't"""
+    return type(value) is int
+
+
+def _existing_ids(model, items, field):
+    """Ids among the items' values of a foreign key that exist, in one query"""
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item[field]))
+        except (KeyError, TypeError, ValueError):
+            pass  # Missing or invalid values are reported by the serializer
+    return set(model.objects.filter(pk__in=ids).values_list("id", flat=True))
+
+
+def _bulk_errors(errors):
+    """400 response listing the errors of each invalid task by position"""
+    return Response(
+        {
+            "errors": [
+                {"index": index, "errors": errors[index]} for index in sorted(errors)
+            ]
+        },
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def _too_many_tasks(limit):
+    return Response(
+        {"error": f"At most {limit} tasks per request"},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
@@ -2,6 +2,7 @@ import os
 import hashlib
 from pathlib import Path
 import mimetypes
+from utils.file_walker import walk_files
 
 
 def get_file_size(file_path):
@@ -20,13 +21,22 @@ def get_file_size(file_path):
         return 0
 
 
-def get_file_hash(file_path, algorithm="md5", buffer_size=65536):
+HASH_ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    # 32-byte digest so the hex form fits FileRecord.file_hash
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+}
+
+
+def get_file_hash(file_path, algorithm="md5", buffer_size=1024 * 1024):
     """
     Calculate file hash
 
     Args:
         file_path: Path to the file
-        algorithm: Hash algorithm to use ('md5', 'sha1', 'sha256')
+        algorithm: Hash algorithm to use ('md5', 'sha1', 'sha256', 'blake2b')
         buffer_size: Buffer size for reading file chunks
 
     Returns:
@@ -35,27 +45,61 @@ def get_file_hash(file_path, algorithm="md5", buffer_size=65536):
     if not os.path.exists(file_path):
         return None
 
-    if algorithm == "md5":
-        hash_obj = hashlib.md5()
-    elif algorithm == "sha1":
-        hash_obj = hashlib.sha1()
-    elif algorithm == "sha256":
-        hash_obj = hashlib.sha256()
-    else:
+    if algorithm not in HASH_ALGORITHMS:
         raise ValueError(f"Unsupported hash algorithm: {algorithm}")
 
     try:
+        # Read into one reused buffer rather than memory-mapped: a mapped file
+        # truncated on a share kills the process with SIGBUS
         with open(file_path, "rb") as f:
-            buffer = f.read(buffer_size)
-            while buffer:
-                hash_obj.update(buffer)
-                buffer = f.read(buffer_size)
+            hash_obj = HASH_ALGORITHMS[algorithm]()
+            buffer = bytearray(buffer_size)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hash_obj.update(view[:read])
 
         return hash_obj.hexdigest()
     except (IOError, OSError):
         return None
 
 
+def get_partial_file_hash(file_path, algorithm="md5", block_size=64 * 1024):
+    """
+    Hash the first and last blocks of a file
+
+    Cheap pre-check for duplicate detection: files with different partial
+    hashes can't be identical. Files no larger than two blocks are hashed
+    whole, so for them the result equals get_file_hash().
+
+    Args:
+        file_path: Path to the file
+        algorithm: Hash algorithm to use, see get_file_hash()
+        block_size: Bytes read from each end of the file
+
+    Returns:
+        str: Hex digest, or None if the file can't be read
+    """
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= 2 * block_size:
+                return get_file_hash(file_path, algorithm)
+
+            hash_obj = HASH_ALGORITHMS[algorithm]()
+            hash_obj.update(f.read(block_size))
+            f.seek(-block_size, os.SEEK_END)
+            hash_obj.update(f.read(block_size))
+            return hash_obj.hexdigest()
+    except (IOError, OSError):
+        return None
+
+
 def get_file_extension(file_path):
     """
     Get file extension without the dot
@@ -215,7 +259,7 @@ def list_directory_files(dir_path, recursive=True, include_hidden=False):
     Args:
         dir_path: Path to the directory
         recursive: Whether to include files in subdirectories
-        include_hidden: Whether to include hidden files
+        include_hidden: Whether to include hidden files and folders
 
     Returns:
         list: List of file paths
@@ -223,19 +267,12 @@ def list_directory_files(dir_path, recursive=True, include_hidden=False):
     if not os.path.isdir(dir_path):
         return []
 
-    file_list = []
-
-    if recursive:
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                if include_hidden or not file.startswith("."):
-                    file_list.append(os.path.join(root, file))
-    else:
-        with os.scandir(dir_path) as entries:
-            for entry in entries:
-                if entry.is_file() and (
-                    include_hidden or not entry.name.startswith(".")
-                ):
-                    file_list.append(entry.path)
-
-    return file_list
+    return [
+        os.path.join(dir_path, entry.path)
+        for entry in walk_files(
+            dir_path,
+            recursive=recursive,
+            include_hidden=include_hidden,
+            stat_files=False,
+        )
+    ]
@@ -0,0 +1,218 @@
+import os
+import fnmatch
+from collections import namedtuple
+
+# Path is relative to the walked folder; size and mtime are None when the
+# file was not stat'ed
+FileEntry = namedtuple("FileEntry", ["path", "name", "size", "mtime"])
+
+# Path is relative to the walked folder ("." for the folder itself);
+# entry_count includes hidden and ignored entries
+FolderEntry = namedtuple("FolderEntry", ["path", "mtime", "entry_count", "files"])
+
+
+class WalkStats:
+    """Counters updated by a walk"""
+
+    __slots__ = ("folders", "files", "stat_calls", "bytes")
+
+    def __init__(self):
+        self.folders = 0
+        self.files = 0
+        self.stat_calls = 0
+        self.bytes = 0  # Size of the files stat'ed
+
+
+def is_ignored(name, include_hidden=True, ignore=None):
+    """
+    Check whether a file or folder name is filtered out of a walk
+
+    Args:
+        name: File or folder name
+        include_hidden: Whether names starting with "." are kept
+        ignore: fnmatch patterns of names to skip
+
+    Returns:
+        bool: True if the entry should be skipped
+    """
+    if not include_hidden and name.startswith("."):
+        return True
+    if ignore:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in ignore)
+    return False
+
+
+def iter_folders(
+    root,
+    recursive=True,
+    include_hidden=True,
+    ignore=None,
+    stat_files=True,
+    stats=None,
+    onerror=None,
+    sort=False,
+    after=None,
+):
+    """
+    Walk a folder tree top-down with os.scandir
+
+    Sizes and modification times come from DirEntry.stat(), which caches its
+    result (and is served from the directory listing itself on Windows), so
+    no file is stat'ed twice. Every folder is stat'ed before it is listed, so
+    a change made while it is being listed moves its mtime past the one
+    reported here. Symlinked folders are not followed, like os.walk.
+
+    Args:
+        root: Folder to walk
+        recursive: Whether to descend into subfolders
+        include_hidden: Whether to include entries whose name starts with "."
+        ignore: fnmatch patterns of file and folder names to skip, along
+            with everything under matching folders
+        stat_files: True, False, or a callable taking (path, mtime,
+            entry_count) of a folder and returning whether its files should
+            be stat'ed
+        stats: Optional WalkStats to update
+        onerror: Called with the OSError when a folder or file can't be read
+        sort: Visit folders in folder_sort_key() order and list files by
+            name, so walks of an unchanged tree are repeatable
+        after: With sort, resume a walk after this folder path: folders
+            that sort before it, and the folder itself, are not yielded, and
+            only its parent folders are listed again
+
+    Yields:
+        FolderEntry: One per folder, with its files as FileEntry tuples
+    """
+    prefix_len = len(os.path.join(root, ""))
+    after_key = folder_sort_key(after) if after is not None else None
+
+    try:
+        root_mtime = os.stat(root).st_mtime
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+        root_mtime = None
+    if stats is not None:
+        stats.stat_calls += 1
+
+    pending = [(root, root_mtime)]
+    while pending:
+        folder, mtime = pending.pop()
+        rel_folder = folder[prefix_len:] or "."
+        # Folders up to the resume point only need listing for their subfolders
+        done = after_key is not None and folder_sort_key(rel_folder) <= after_key
+
+        try:
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+
+        if sort:
+            entries.sort(key=lambda entry: entry.name)
+
+        if done:
+            stat_this_folder = False
+        elif callable(stat_files):
+            stat_this_folder = stat_files(rel_folder, mtime, len(entries))
+        else:
+            stat_this_folder = stat_files
+
+        files = []
+        subfolders = []
+        for entry in entries:
+            name = entry.name
+            if is_ignored(name, include_hidden, ignore):
+                continue
+
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if recursive and not entry.is_symlink():
+                    if after_key is not None:
+                        key = folder_sort_key(entry.path[prefix_len:])
+                        if key <= after_key and not after_key.startswith(key):
+                            continue  # Walked before the resume point
+                    try:
+                        subfolder_mtime = entry.stat().st_mtime
+                    except OSError as e:
+                        if onerror is not None:
+                            onerror(e)
+                        subfolder_mtime = None
+                    if stats is not None:
+                        stats.stat_calls += 1
+                    subfolders.append((entry.path, subfolder_mtime))
+                continue
+
+            if done:
+                continue
+
+            if not stat_this_folder:
+                files.append(FileEntry(entry.path[prefix_len:], name, None, None))
+                continue
+
+            if stats is not None:
+                stats.stat_calls += 1
+            try:
+                stat_info = entry.stat()
+            except OSError as e:
+                if onerror is not None:
+                    onerror(e)
+                continue
+            if stats is not None:
+                stats.bytes += stat_info.st_size
+            files.append(
+                FileEntry(
+                    entry.path[prefix_len:],
+                    name,
+                    stat_info.st_size,
+                    stat_info.st_mtime,
+                )
+            )
+
+        # Reversed so subfolders are visited in listing order
+        if sort:
+            subfolders.sort(key=lambda item: folder_sort_key(item[0]), reverse=True)
+        else:
+            subfolders.reverse()
+        pending.extend(subfolders)
+
+        if done:
+            continue
+
+        if stats is not None:
+            stats.folders += 1
+            stats.files += len(files)
+
+        yield FolderEntry(rel_folder, mtime, len(entries), files)
+
+
+def folder_sort_key(path):
+    """
+    Order of folders in a sorted walk
+
+    Folder paths compared with a trailing separator, which is the order a
+    depth-first walk with sorted subfolders visits them in: "a-b" sorts
+    before "a" because "a-b/" < "a/", and "a" before everything under it.
+
+    Args:
+        path: Folder path relative to the walked folder ("." for itself)
+    """
+    return "" if path == "." else os.path.join(path, "")
+
+
+def walk_files(root, **kwargs):
+    """
+    Walk a folder tree and yield its files
+
+    Takes the same keyword arguments as iter_folders().
+
+    Yields:
+        FileEntry: Every file under root
+    """
+    for folder in iter_folders(root, **kwargs):
+        yield from folder.files
@@ -0,0 +1,133 @@
+import os
+import sys
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from collections import namedtuple
+
+# Event masks from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+# Name is the entry inside the watched folder, or "" for events on the
+# folder itself
+InotifyEvent = namedtuple("InotifyEvent", ["wd", "mask", "cookie", "name"])
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    try:
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except AttributeError:
+        raise OSError(errno.ENOSYS, "The C library has no inotify support")
+    return libc
+
+
+def _last_error(path=None):
+    error = ctypes.get_errno()
+    return OSError(error, os.strerror(error), path)
+
+
+class Inotify:
+    """
+    Minimal inotify binding using ctypes
+
+    Raises OSError when inotify isn't available or the per-user instance
+    limit is reached. add_watch() raises OSError with errno ENOSPC once the
+    per-user watch limit (fs.inotify.max_user_watches) is reached.
+    """
+
+    READ_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._libc = _load_libc()
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise _last_error()
+        self.fd = fd
+        self._poll = select.poll()
+        self._poll.register(fd, select.POLLIN)
+
+    def add_watch(self, path, mask):
+        """
+        Watch a path, or update the mask of an existing watch
+
+        Returns:
+            int: Watch descriptor reported in the path's events
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise _last_error(path)
+        return wd
+
+    def remove_watch(self, wd):
+        """Stop watching; watches of deleted paths are already gone"""
+        if self._libc.inotify_rm_watch(self.fd, wd) < 0:
+            error = ctypes.get_errno()
+            if error != errno.EINVAL:
+                raise OSError(error, os.strerror(error))
+
+    def read_events(self, timeout=None):
+        """
+        Read pending events, waiting for some first
+
+        Args:
+            timeout: Seconds to wait for an event, None to wait forever
+
+        Returns:
+            list: InotifyEvent tuples, empty if the timeout expired
+        """
+        if not self._poll.poll(None if timeout is None else timeout * 1000):
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, self.READ_SIZE)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append(InotifyEvent(wd, mask, cookie, os.fsdecode(name)))
+
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
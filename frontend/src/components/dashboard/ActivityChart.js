@@ -13,7 +13,6 @@ import {
 } from 'chart.js';
 import { Line, Bar } from 'react-chartjs-2';
 import projectService from '../../services/projectService';
-import { formatDate } from '../../utils/dateUtils';
 
 // Register ChartJS components
 ChartJS.register(
@@ -35,6 +34,9 @@ const ActivityChart = ({ projects }) => {
   const [selectedProject, setSelectedProject] = useState('all');
 
   useEffect(() => {
+    // Daily points for short ranges, weekly ones for longer ranges
+    const interval = Number(timeRange) > 30 ? 'week' : 'day';
+    
     const fetchActivityData = async () => {
       try {
         setLoading(true);
@@ -49,28 +51,28 @@ const ActivityChart = ({ projects }) => {
             .slice(0, 5); // Get top 5 active projects by file count
             
           const projectPromises = topProjects.map(project => 
-            projectService.getProjectActivity(project.id, { days: timeRange })
+            projectService.getProjectActivity(project.id, { days: timeRange, interval })
           );
           
           const projectsActivity = await Promise.all(projectPromises);
           
           // Combine all project activities
           projectsActivity.forEach((activity, index) => {
-            if (activity.logs) {
+            if (activity.buckets) {
               activityData.push({
                 projectName: topProjects[index].name,
-                logs: activity.logs
+                buckets: activity.buckets
               });
             }
           });
         } else {
           // Fetch activity for a single project
-          const response = await projectService.getProjectActivity(selectedProject, { days: timeRange });
-          if (response.logs) {
+          const response = await projectService.getProjectActivity(selectedProject, { days: timeRange, interval });
+          if (response.buckets) {
             const project = projects.find(p => p.id.toString() === selectedProject);
             activityData.push({
               projectName: project ? project.name : 'Selected Project',
-              logs: response.logs
+              buckets: response.buckets
             });
           }
         }
@@ -89,11 +91,11 @@ const ActivityChart = ({ projects }) => {
   }, [projects, selectedProject, timeRange]);
   
   const prepareChartData = (activityData) => {
-    // Get unique dates from all projects
+    // Get unique bucket dates from all projects
     const allDates = new Set();
     activityData.forEach(project => {
-      project.logs.forEach(log => {
-        allDates.add(formatDate(log.timestamp, 'YYYY-MM-DD'));
+      project.buckets.forEach(bucket => {
+        allDates.add(bucket.bucket);
       });
     });
     
@@ -102,11 +104,10 @@ const ActivityChart = ({ projects }) => {
     
     // Prepare datasets for each project
     const datasets = activityData.map((project, index) => {
-      // Create a map of date to activity count for this project
+      // Create a map of bucket date to activity count for this project
       const dateMap = {};
-      project.logs.forEach(log => {
-        const date = formatDate(log.timestamp, 'YYYY-MM-DD');
-        dateMap[date] = (log.files_added + log.files_modified);
+      project.buckets.forEach(bucket => {
+        dateMap[bucket.bucket] = bucket.files_added + bucket.files_modified;
       });
       
       // Generate data points for all dates
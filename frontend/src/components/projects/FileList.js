@@ -4,12 +4,15 @@ import fileService from '../../services/fileService';
 import { formatFileSize } from '../../utils/formatters';
 import { formatDate } from '../../utils/dateUtils';
 
-const FileList = ({ projectId, initialFiles = [] }) => {
+const FileList = ({ projectId, initialFiles = [], initialCursor = null }) => {
   const [files, setFiles] = useState(initialFiles);
+  const [nextCursor, setNextCursor] = useState(initialCursor);
+  const [activeSearch, setActiveSearch] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [sortField, setSortField] = useState('filename');
   const [sortDirection, setSortDirection] = useState('asc');
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   useEffect(() => {
     if (initialFiles.length === 0) {
@@ -21,8 +24,10 @@ const FileList = ({ projectId, initialFiles = [] }) => {
   const fetchFiles = async () => {
     try {
       setLoading(true);
-      const filesData = await fileService.getProjectFiles(projectId);
-      setFiles(filesData);
+      const filesPage = await fileService.getProjectFiles(projectId);
+      setFiles(filesPage.files);
+      setNextCursor(filesPage.nextCursor);
+      setActiveSearch('');
     } catch (error) {
       console.error('Error fetching files:', error);
     } finally {
@@ -39,7 +44,9 @@ const FileList = ({ projectId, initialFiles = [] }) => {
     try {
       setLoading(true);
       const results = await fileService.searchFiles(projectId, searchTerm);
-      setFiles(results);
+      setFiles(results.files);
+      setNextCursor(results.nextCursor);
+      setActiveSearch(searchTerm);
     } catch (error) {
       console.error('Error searching files:', error);
     } finally {
@@ -47,6 +54,21 @@ const FileList = ({ projectId, initialFiles = [] }) => {
     }
   };
   
+  // Fetch the next page of the current listing and append it
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const params = activeSearch ? { filename: activeSearch } : {};
+      const page = await fileService.getMoreProjectFiles(projectId, nextCursor, params);
+      setFiles((loaded) => [...loaded, ...page.files]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more files:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+  
   const handleSort = (field) => {
     if (sortField === field) {
       // Toggle direction if clicking the same field
@@ -134,7 +156,7 @@ const FileList = ({ projectId, initialFiles = [] }) => {
     <div className="file-list">
       <Row className="mb-3">
         <Col md={6}>
-          <h5>Files ({files.length})</h5>
+          <h5>Files ({files.length}{nextCursor ? '+' : ''})</h5>
         </Col>
         <Col md={6}>
           <InputGroup>
@@ -217,6 +239,14 @@ const FileList = ({ projectId, initialFiles = [] }) => {
           </tbody>
         </Table>
       </div>
+      
+      {nextCursor && !loading && (
+        <div className="text-center">
+          <Button variant="outline-primary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more files'}
+          </Button>
+        </div>
+      )}
     </div>
   );
 };
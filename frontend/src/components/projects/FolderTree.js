@@ -0,0 +1,92 @@
+import React, { useState, useEffect } from 'react';
+import { ListGroup, ProgressBar, Breadcrumb, Alert } from 'react-bootstrap';
+import LoadingIndicator from '../common/LoadingIndicator';
+import fileService from '../../services/fileService';
+import { getRelativeTime } from '../../utils/dateUtils';
+import { formatFileSize } from '../../utils/formatters';
+
+// Drill-down through the folders of a project, largest first. Every folder
+// comes with the totals of its subtree, so each level is a single request.
+const FolderTree = ({ projectId }) => {
+  const [path, setPath] = useState('.');
+  const [folder, setFolder] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    const fetchFolder = async () => {
+      try {
+        setLoading(true);
+        setFolder(await fileService.getFolderTree(projectId, path));
+        setError(null);
+      } catch (err) {
+        setError('Failed to load folder.');
+        console.error(err);
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    fetchFolder();
+  }, [projectId, path]);
+
+  if (loading && !folder) {
+    return <LoadingIndicator message="Loading folders..." />;
+  }
+
+  if (error) {
+    return <Alert variant="danger">{error}</Alert>;
+  }
+
+  const parts = path === '.' ? [] : path.split('/');
+  const share = (size) => (folder.total_size ? (size / folder.total_size) * 100 : 0);
+
+  return (
+    <div className="folder-tree">
+      <Breadcrumb>
+        <Breadcrumb.Item active={!parts.length} onClick={() => setPath('.')}>
+          Project
+        </Breadcrumb.Item>
+        {parts.map((part, i) => (
+          <Breadcrumb.Item
+            key={i}
+            active={i === parts.length - 1}
+            onClick={() => setPath(parts.slice(0, i + 1).join('/'))}
+          >
+            {part}
+          </Breadcrumb.Item>
+        ))}
+      </Breadcrumb>
+
+      <p className="text-muted small">
+        {folder.total_files} files, {formatFileSize(folder.total_size)}
+        {folder.own_files > 0 &&
+          ` (${folder.own_files} files, ${formatFileSize(folder.own_size)} directly in this folder)`}
+      </p>
+
+      {folder.children.length === 0 ? (
+        <p className="text-muted text-center py-4">No subfolders.</p>
+      ) : (
+        <ListGroup variant="flush">
+          {folder.children.map((child) => (
+            <ListGroup.Item key={child.id} action onClick={() => setPath(child.path)}>
+              <div className="d-flex justify-content-between">
+                <span className="fw-bold text-truncate">
+                  <i className="fas fa-folder me-2"></i>
+                  {child.name}
+                </span>
+                <span className="small text-muted">
+                  {child.total_files} files, {formatFileSize(child.total_size)}
+                  {child.newest_modified && `, changed ${getRelativeTime(child.newest_modified)}`}
+                </span>
+              </div>
+              <ProgressBar now={share(child.total_size)} style={{ height: '4px' }} className="mt-1" />
+            </ListGroup.Item>
+          ))}
+        </ListGroup>
+      )}
+    </div>
+  );
+};
+
+export default FolderTree;
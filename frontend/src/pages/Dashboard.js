@@ -32,16 +32,13 @@ const Dashboard = () => {
         const newProjectsData = await projectService.getNewlyDiscoveredProjects();
         setNewProjects(newProjectsData);
         
-        // Calculate overall stats
-        const activeProjects = projectsData.filter(project => project.active);
-        const totalFiles = projectsData.reduce((sum, project) => sum + project.total_files, 0);
-        const totalSize = projectsData.reduce((sum, project) => sum + project.total_size, 0);
-        
+        // Overall stats are kept by the server, so they are read as one row
+        const statsData = await projectService.getStats();
         setStats({
-          totalProjects: projectsData.length,
-          activeProjects: activeProjects.length,
-          totalFiles,
-          totalSize,
+          totalProjects: statsData.total_projects,
+          activeProjects: statsData.active_projects,
+          totalFiles: statsData.total_files,
+          totalSize: statsData.total_size,
         });
         
         setError(null);
@@ -3,6 +3,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { Container, Row, Col, Card, Button, Alert, Tabs, Tab } from 'react-bootstrap';
 import FileList from '../components/projects/FileList';
+import FolderTree from '../components/projects/FolderTree';
 import ActivityTimeline from '../components/projects/ActivityTimeline';
 import ProjectStatus from '../components/projects/ProjectStatus';
 import LoadingIndicator from '../components/common/LoadingIndicator';
@@ -15,6 +16,7 @@ const ProjectDetail = () => {
   const { id } = useParams();
   const [project, setProject] = useState(null);
   const [files, setFiles] = useState([]);
+  const [filesCursor, setFilesCursor] = useState(null);
   const [activities, setActivities] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -32,8 +34,9 @@ const ProjectDetail = () => {
         setProject(projectData);
         
         // Fetch project files
-        const filesData = await fileService.getProjectFiles(id);
-        setFiles(filesData);
+        const filesPage = await fileService.getProjectFiles(id);
+        setFiles(filesPage.files);
+        setFilesCursor(filesPage.nextCursor);
         
         // Fetch project activities
         const activitiesData = await projectService.getProjectActivity(id);
@@ -61,7 +64,8 @@ const ProjectDetail = () => {
       
       // Refresh files
       const updatedFiles = await fileService.getProjectFiles(id);
-      setFiles(updatedFiles);
+      setFiles(updatedFiles.files);
+      setFilesCursor(updatedFiles.nextCursor);
       
       // Refresh activities
       const updatedActivities = await projectService.getProjectActivity(id);
@@ -192,6 +196,9 @@ const ProjectDetail = () => {
                 <Tab eventKey="files" title="Files">
                   {/* Tab content rendered below */}
                 </Tab>
+                <Tab eventKey="folders" title="Folders">
+                  {/* Tab content rendered below */}
+                </Tab>
                 <Tab eventKey="activity" title="Activity">
                   {/* Tab content rendered below */}
                 </Tab>
@@ -249,7 +256,15 @@ const ProjectDetail = () => {
               )}
               
               {activeTab === 'files' && (
-                <FileList projectId={project.id} initialFiles={files} />
+                <FileList
+                  projectId={project.id}
+                  initialFiles={files}
+                  initialCursor={filesCursor}
+                />
+              )}
+              
+              {activeTab === 'folders' && (
+                <FolderTree projectId={project.id} />
               )}
               
               {activeTab === 'activity' && (
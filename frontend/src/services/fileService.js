@@ -1,23 +1,37 @@
 import api from './api';
 
+// Files are listed a page at a time, ordered by folder, then filename; the
+// cursor of the next page is taken from the "next" link returned by the API
+const toFilesPage = (data) => ({
+  files: data.results,
+  nextCursor: data.next ? new URL(data.next).searchParams.get('cursor') : null
+});
+
 const fileService = {
   getProjectFiles: async (projectId, params = {}) => {
     const response = await api.get(`/projects/${projectId}/files/`, { params });
-    return response.data;
+    return toFilesPage(response.data);
+  },
+  
+  getMoreProjectFiles: async (projectId, cursor, params = {}) => {
+    const response = await api.get(`/projects/${projectId}/files/`, {
+      params: { ...params, cursor }
+    });
+    return toFilesPage(response.data);
   },
   
   searchFiles: async (projectId, searchTerm) => {
     const response = await api.get(`/projects/${projectId}/files/`, {
       params: { filename: searchTerm }
     });
-    return response.data;
+    return toFilesPage(response.data);
   },
   
   getRecentFiles: async (projectId, limit = 10) => {
     const response = await api.get(`/projects/${projectId}/files/`, {
       params: { limit, ordering: '-last_modified' }
     });
-    return response.data;
+    return toFilesPage(response.data).files;
   },
   
   getFilesByCategory: async (projectId, category) => {
@@ -26,6 +40,14 @@ const fileService = {
     const response = await api.get(`/projects/${projectId}/files/`, {
       params: { category }
     });
+    return toFilesPage(response.data);
+  },
+  
+  // A folder with its subfolders, each with the totals of its whole subtree
+  getFolderTree: async (projectId, path = '.') => {
+    const response = await api.get(`/projects/${projectId}/tree/`, {
+      params: { path }
+    });
     return response.data;
   },
   
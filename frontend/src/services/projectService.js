@@ -29,6 +29,12 @@ const projectService = {
   
   scanProjectRoot: async (id) => {
     const response = await api.post(`/roots/${id}/scan/`);
+    return projectService.waitForScanJob(response.data.job.id);
+  },
+  
+  // Totals of all projects, kept up to date by the scans
+  getStats: async () => {
+    const response = await api.get('/stats/');
     return response.data;
   },
   
@@ -60,19 +66,48 @@ const projectService = {
   
   scanProject: async (id) => {
     const response = await api.post(`/projects/${id}/scan/`);
-    return response.data;
+    return projectService.waitForScanJob(response.data.job.id);
   },
   
   scanAll: async () => {
     const response = await api.post('/scan-all/');
+    return projectService.waitForScanJob(response.data.job.id);
+  },
+  
+  // Scan jobs run in a background worker; the scan endpoints return a job id
+  getScanJob: async (id) => {
+    const response = await api.get(`/scan-jobs/${id}/`);
     return response.data;
   },
   
+  // Poll a scan job until it finishes and resolve with its result
+  waitForScanJob: async (id, { interval = 2000, onProgress } = {}) => {
+    for (;;) {
+      const job = await projectService.getScanJob(id);
+      if (onProgress) {
+        onProgress(job);
+      }
+      if (job.status === 'COMPLETED') {
+        return job.result;
+      }
+      if (job.status === 'FAILED') {
+        throw new Error(job.error || 'Scan failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+  },
+  
   getProjectActivity: async (id, params = {}) => {
     const response = await api.get(`/projects/${id}/activity/`, { params });
     return response.data;
   },
   
+  // File changes, newest first; params: start, end, kind, path, page_size
+  getProjectChanges: async (id, params = {}) => {
+    const response = await api.get(`/projects/${id}/changes/`, { params });
+    return response.data;
+  },
+  
   getNewlyDiscoveredProjects: async () => {
     const response = await api.get('/projects/', { params: { is_auto_discovered: true, active: true } });
     return response.data;
@@ -99,6 +134,22 @@ const projectService = {
     return response.data;
   },
   
+  // Lists of tasks in one request; nothing is saved if any task is invalid
+  bulkCreateTasks: async (tasks) => {
+    const response = await api.post('/projects/tasks/bulk_create/', tasks);
+    return response.data;
+  },
+  
+  bulkUpdateTasks: async (tasks) => {
+    const response = await api.patch('/projects/tasks/bulk_update/', tasks);
+    return response.data;
+  },
+  
+  bulkDeleteTasks: async (ids) => {
+    const response = await api.post('/projects/tasks/bulk_delete/', { ids });
+    return response.data;
+  },
+  
   // Task Categories
   getTaskCategories: async () => {
     const response = await api.get('/projects/categories/');